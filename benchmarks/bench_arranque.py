@@ -0,0 +1,75 @@
+"""
+Benchmark del arranque en frío: en un proceso nuevo cada vez, mide cuánto tarda importar el paquete, importar la app asíncrona y crear cada interfaz Flask (con una base temporal y un proveedor local, sin red), y qué módulos pesados quedan cargados en cada caso.
+
+    python benchmarks/bench_arranque.py --repeticiones 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("flask", "requests", "httpx", "sqlite3")
+
+PREPARAR = """
+import os, sys, time
+sys.path.insert(0, {raiz!r})
+os.environ["TUCAMBIO_DB"] = {db!r}
+t0 = time.perf_counter()
+"""
+CASOS = {
+    "import tucambio": "import tucambio",
+    "import tucambio.asgi": "import tucambio.asgi",
+    "crear_app(clasico)": (
+        "from tucambio import proveedor, tasas\n"
+        "tasas.configurar_proveedor(proveedor.ProveedorFalso())\n"
+        "import tucambio\n"
+        "tucambio.crear_app('clasico')"
+    ),
+    "crear_app(web)": (
+        "from tucambio import proveedor, tasas\n"
+        "tasas.configurar_proveedor(proveedor.ProveedorFalso())\n"
+        "import tucambio\n"
+        "tucambio.crear_app('web')"
+    ),
+}
+INFORMAR = """
+import json
+print(json.dumps({{"ms": (time.perf_counter() - t0) * 1000, "cargados": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def medir(codigo, db):
+    """Ejecuta `codigo` en un intérprete nuevo y devuelve (ms, módulos pesados cargados)."""
+    programa = PREPARAR.format(raiz=RAIZ, db=db) + codigo + INFORMAR.format(pesados=PESADOS)
+    salida = subprocess.run([sys.executable, "-c", programa], capture_output=True, text=True, check=True)
+    datos = json.loads(salida.stdout.strip().splitlines()[-1])
+    return datos["ms"], datos["cargados"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        for nombre, codigo in CASOS.items():
+            tiempos = []
+            for _ in range(args.repeticiones):
+                ms, cargados = medir(codigo, db)
+                tiempos.append(ms)
+            resultados[nombre] = {
+                "mediana_ms": round(statistics.median(tiempos), 1),
+                "min_ms": round(min(tiempos), 1),
+                "cargados": cargados,
+            }
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
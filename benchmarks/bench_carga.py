@@ -0,0 +1,188 @@
+"""
+Generador de carga de extremo a extremo: arranca el servidor de producción (python -m tucambio serve) con un proveedor de tasas local, lanza clientes concurrentes con conexiones keep-alive contra cada ruta y da, por ruta, peticiones, errores, req/s y latencias p50/p95/p99.
+
+    python benchmarks/bench_carga.py --duracion 10 --concurrencia 32 --salida carga.json
+    python benchmarks/bench_carga.py --asgi --latencia 2 --proveedor http   # proveedor HTTP local lento
+    python benchmarks/bench_carga.py --url http://127.0.0.1:5000             # contra un servidor ya arrancado
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import comun
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nombre -> (método, ruta, cuerpo)
+RUTAS = {
+    "POST /convertir": ("POST", "/convertir", json.dumps({"cantidad": 100, "moneda_origen": "EUR", "moneda_destino": "JPY"})),
+    "GET /historial": ("GET", "/historial", None),
+    "GET /tasas.json": ("GET", "/tasas.json", None),
+    "GET /matriz": ("GET", "/matriz?cantidad=100&base=EUR", None),
+    "GET /health": ("GET", "/health", None),
+}
+
+PROGRAMA_SERVIDOR = """
+import os, sys
+sys.path.insert(0, {raiz!r})
+os.environ["TUCAMBIO_DB"] = {db!r}
+from tucambio import proveedor, servidor, tasas
+if {url_proveedor!r}:
+    cliente = (proveedor.ProveedorERAsync if {asgi!r} else proveedor.ProveedorER)(api_url={url_proveedor!r})
+else:
+    cliente = proveedor.ProveedorFalso({tasas_usd!r}, latencia={latencia!r}, tasa_fallos={tasa_fallos!r})
+tasas.configurar_proveedor(cliente)
+if {asgi!r}:
+    from tucambio import asgi
+    asgi.configurar_proveedor(cliente)
+servidor.servir(frontend={frontend!r}, workers={workers!r}, hilos={hilos!r}, host="127.0.0.1", puerto={puerto!r}, asgi={asgi!r})
+"""
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(host, puerto, timeout=30):
+    """Espera a que /health responda."""
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            conn = http.client.HTTPConnection(host, puerto, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def cliente(host, puerto, rutas, inicio, hasta, desfase, latencias, errores):
+    """Bucle cerrado de un cliente: recorre `rutas` en orden y anota latencias (ms) a partir de `inicio`."""
+    conn = http.client.HTTPConnection(host, puerto, timeout=30)
+    cabeceras = {"Content-Type": "application/json"}
+    i = desfase
+    while True:
+        ahora = time.perf_counter()
+        if ahora >= hasta:
+            break
+        nombre, (metodo, ruta, cuerpo) = rutas[i % len(rutas)]
+        i += 1
+        try:
+            conn.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status < 400
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, puerto, timeout=30)
+        fin = time.perf_counter()
+        if ahora < inicio:
+            continue  # calentamiento
+        if ok:
+            latencias[nombre].append((fin - ahora) * 1000)
+        else:
+            errores[nombre] += 1
+    conn.close()
+
+
+def cargar(host, puerto, nombres, concurrencia, duracion, calentamiento):
+    """Lanza `concurrencia` clientes durante `calentamiento` + `duracion` segundos y resume las latencias por ruta."""
+    rutas = [(nombre, RUTAS[nombre]) for nombre in nombres]
+    inicio = time.perf_counter() + calentamiento
+    hasta = inicio + duracion
+    por_hilo = [(collections.defaultdict(list), collections.Counter()) for _ in range(concurrencia)]
+    hilos = [
+        threading.Thread(target=cliente, args=(host, puerto, rutas, inicio, hasta, n, latencias, errores))
+        for n, (latencias, errores) in enumerate(por_hilo)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    resultados = {}
+    todas = []
+    for nombre in nombres:
+        latencias = [ms for lat, _ in por_hilo for ms in lat[nombre]]
+        todas.extend(latencias)
+        resultados[nombre] = comun.resumen_latencias(latencias, duracion)
+        resultados[nombre]["errores"] = sum(err[nombre] for _, err in por_hilo)
+    resultados["total"] = comun.resumen_latencias(todas, duracion)
+    resultados["total"]["errores"] = sum(sum(err.values()) for _, err in por_hilo)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="servidor ya arrancado (si no, se arranca uno con un proveedor local)")
+    parser.add_argument("--duracion", type=float, default=10, help="segundos de medida")
+    parser.add_argument("--calentamiento", type=float, default=1, help="segundos descartados al empezar")
+    parser.add_argument("--concurrencia", type=int, default=16, help="clientes simultáneos")
+    parser.add_argument("--rutas", nargs="+", choices=list(RUTAS), help="rutas a medir (por defecto todas)")
+    parser.add_argument("--frontend", default="clasico")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--asgi", action="store_true", help="medir el modo asíncrono")
+    parser.add_argument("--proveedor", choices=("falso", "http"), default="falso",
+                        help="falso: en proceso; http: servidor HTTP local con el formato de open.er-api.com")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de latencia del proveedor")
+    parser.add_argument("--tasa-fallos", type=float, default=0.0, help="fracción de descargas que fallan")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="empeoramiento tolerado al comparar (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    nombres = args.rutas or list(RUTAS)
+    configuracion = {k: v for k, v in vars(args).items() if k not in ("salida", "comparar", "umbral")}
+    configuracion["rutas"] = nombres
+
+    if args.url:
+        partes = urlsplit(args.url)
+        resultados = cargar(partes.hostname, partes.port or 80, nombres, args.concurrencia, args.duracion, args.calentamiento)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            url_proveedor = ""
+            if args.proveedor == "http":
+                _, url_proveedor = comun.iniciar_proveedor_http(args.latencia, args.tasa_fallos)
+            puerto = puerto_libre()
+            programa = PROGRAMA_SERVIDOR.format(
+                raiz=RAIZ, db=os.path.join(tmp, "bench.db"), url_proveedor=url_proveedor, tasas_usd=comun.TASAS_USD,
+                latencia=args.latencia, tasa_fallos=args.tasa_fallos, frontend=args.frontend,
+                workers=args.workers, hilos=args.hilos, puerto=puerto, asgi=args.asgi,
+            )
+            registro = os.path.join(tmp, "servidor.log")
+            with open(registro, "w") as log:
+                proceso = subprocess.Popen([sys.executable, "-c", programa], cwd=tmp, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                if not esperar_servidor("127.0.0.1", puerto):
+                    with open(registro) as f:
+                        sys.exit(f"El servidor no arrancó:\n{f.read()}")
+                resultados = cargar("127.0.0.1", puerto, nombres, args.concurrencia, args.duracion, args.calentamiento)
+            finally:
+                proceso.terminate()
+                proceso.wait(30)
+    comun.emitir(
+        {"configuracion": configuracion, "rutas": resultados},
+        args.salida,
+        args.comparar,
+        claves=("p50_ms", "p95_ms", "p99_ms"),
+        umbral=args.umbral,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark de la exportación del historial: crea (o reutiliza) una base con millones de filas y, en un proceso nuevo por caso, exporta en cada formato con `python -m tucambio exportar`, midiendo tiempo, filas/s, tamaño del resultado y memoria máxima del proceso. Como referencia mide también leer la tabla entera con fetchall (database.obtener_historial).
+
+    python benchmarks/bench_exportar.py --filas 2000000 --salida exportar.json
+    python benchmarks/bench_exportar.py --db /ruta/historial.db
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import comun
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORMATOS = ("csv", "ndjson", "columnar")
+PROGRAMA_FETCHALL = """
+import sys
+sys.path.insert(0, {raiz!r})
+from tucambio import database
+print(len(database.obtener_historial(limite=-1)))
+"""
+
+
+def crear_base(ruta, filas, lote=100000):
+    """Base de prueba con `filas` conversiones repartidas en el último año."""
+    sys.path.insert(0, RAIZ)
+    from tucambio import database
+    from tucambio.conversion import CODIGOS_MONEDAS, a_unidades
+
+    database.DB_PATH = ruta
+    database.init_db()
+    conn = database.obtener_conexion()
+    inicio = time.time() - 365 * 86400
+    paso = 365 * 86400 / filas
+    for desde in range(0, filas, lote):
+        datos = []
+        for i in range(desde, min(desde + lote, filas)):
+            origen, destino = random.choice(CODIGOS_MONEDAS), random.choice(CODIGOS_MONEDAS)
+            tasa = comun.TASAS_USD[destino] / comun.TASAS_USD[origen]
+            cantidad = random.uniform(1, 5000)
+            fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(inicio + i * paso))
+            datos.append((a_unidades(origen, cantidad), origen, destino, a_unidades(destino, cantidad * tasa), tasa, fecha))
+        with conn:
+            conn.executemany(
+                "INSERT INTO historial (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                datos,
+            )
+    database.cerrar_conexion()
+
+
+def medir(argumentos, db, salida=None):
+    """Ejecuta `argumentos` en un intérprete nuevo y devuelve (segundos, MB de memoria máxima, stdout)."""
+    entorno = dict(os.environ, TUCAMBIO_DB=db, PYTHONPATH=RAIZ)
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, *argumentos], env=entorno, stdout=subprocess.PIPE)
+    stdout = proceso.stdout.read()
+    _, estado, uso = os.wait4(proceso.pid, 0)
+    segundos = time.perf_counter() - inicio
+    if os.waitstatus_to_exitcode(estado) != 0:
+        sys.exit(f"Falló: {' '.join(argumentos)}")
+    return segundos, uso.ru_maxrss / 1024, stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=2000000, help="filas de la base de prueba")
+    parser.add_argument("--db", help="exportar esta base en lugar de crear una")
+    parser.add_argument("--sin-fetchall", action="store_true", help="no medir la referencia con fetchall")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="empeoramiento tolerado al comparar (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.db
+        if db is None:
+            db = os.path.join(tmp, "bench.db")
+            inicio = time.perf_counter()
+            crear_base(db, args.filas)
+            print(f"Base de {args.filas} filas creada en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
+        import sqlite3
+
+        with sqlite3.connect(db) as conn:
+            filas = conn.execute("SELECT COUNT(*) FROM historial").fetchone()[0]
+
+        resultados = {"filas": filas, "db_mb": round(os.path.getsize(db) / 1e6, 1)}
+        for formato in FORMATOS:
+            fichero = os.path.join(tmp, f"historial.{formato}")
+            segundos, memoria, _ = medir(["-m", "tucambio", "exportar", "--formato", formato, "--salida", fichero], db)
+            resultados[formato] = {
+                "segundos": round(segundos, 2),
+                "filas_s": round(filas / segundos),
+                "mb": round(os.path.getsize(fichero) / 1e6, 1),
+                "maxrss_mb": round(memoria, 1),
+            }
+            os.remove(fichero)
+        if not args.sin_fetchall:
+            segundos, memoria, _ = medir(["-c", PROGRAMA_FETCHALL.format(raiz=RAIZ)], db)
+            resultados["fetchall"] = {"segundos": round(segundos, 2), "maxrss_mb": round(memoria, 1)}
+    comun.emitir(resultados, args.salida, args.comparar, claves=("segundos", "maxrss_mb"), umbral=args.umbral)
+
+
+if __name__ == "__main__":
+    main()
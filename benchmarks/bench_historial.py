@@ -0,0 +1,73 @@
+"""
+Benchmark de la paginación del historial: llena una base temporal con muchas filas y mide cuánto tarda una página al principio, en medio y al final del historial (con y sin filtro por par).
+
+    python benchmarks/bench_historial.py --filas 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tucambio import database
+from tucambio.conversion import a_unidades
+
+CODIGOS = ["EUR", "USD", "VES", "PYG", "ARS", "MXN", "CLP", "COP", "BRL", "GBP", "JPY", "CAD", "AUD", "CHF", "CNY", "SEK"]
+
+
+def poblar(filas, lote=50000):
+    """Inserta `filas` conversiones aleatorias con fechas crecientes."""
+    conn = database.obtener_conexion()
+    inicio = time.time() - filas
+    for desde in range(0, filas, lote):
+        datos = []
+        for i in range(desde, min(desde + lote, filas)):
+            origen, destino = random.sample(CODIGOS, 2)
+            fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(inicio + i))
+            datos.append((a_unidades(origen, 1 + i % 1000), origen, destino, a_unidades(destino, 1), 1.0, fecha))
+        with conn:
+            conn.executemany(
+                "INSERT INTO historial (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                datos,
+            )
+
+
+def medir(repeticiones, **kwargs):
+    """Mediana en milisegundos de `obtener_pagina_historial(**kwargs)`."""
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        database.obtener_pagina_historial(**kwargs)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return round(tiempos[len(tiempos) // 2], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, default=1000000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        t0 = time.time()
+        poblar(args.filas)
+        resultados = {"filas": args.filas, "poblar_s": round(time.time() - t0, 2), "pagina_ms": {}}
+        for nombre, before_id in (("inicio", None), ("mitad", args.filas // 2), ("final", 100)):
+            resultados["pagina_ms"][nombre] = medir(args.repeticiones, limite=20, before_id=before_id)
+            resultados["pagina_ms"][f"{nombre}_par"] = medir(
+                args.repeticiones, limite=20, before_id=before_id, moneda_origen="EUR", moneda_destino="USD"
+            )
+        database.cerrar_conexion()
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmarks del camino caliente sin red: tasa desde memoria, formato de un importe, conversión completa, escritura de una conversión y lectura del historial reciente con banderas.
+
+    python benchmarks/bench_micro.py --numero 20000 --salida micro.json
+    python benchmarks/bench_micro.py --comparar micro.json   # sale con 1 si algo empeora más del umbral
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import comun
+from tucambio import conversion, database, escritor_historial, proveedor, tasas
+
+
+def medir(funcion, numero, repeticiones):
+    """Mediana, entre `repeticiones` tandas de `numero` llamadas, de los microsegundos por llamada."""
+    tiempos = sorted(timeit.Timer(funcion).repeat(repeat=repeticiones, number=numero))
+    por_llamada = tiempos[len(tiempos) // 2] / numero
+    return {"us": round(por_llamada * 1e6, 3), "ops_s": round(1 / por_llamada)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--numero", type=int, default=20000, help="llamadas por tanda")
+    parser.add_argument("--repeticiones", type=int, default=5, help="tandas (se toma la mediana)")
+    parser.add_argument("--salida", help="guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=0.2, help="empeoramiento tolerado al comparar (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        tasas.configurar_proveedor(proveedor.ProveedorFalso(comun.TASAS_USD))
+        codigos = conversion.CODIGOS_MONEDAS
+        tabla = tasas.obtener_tabla(codigos)
+        from tucambio import wsgi
+
+        # Llenar el historial para que la lectura reciente tenga algo que devolver
+        database.guardar_conversiones([(1000, "USD", "EUR", 920, 0.92)] * 100)
+        numero_db = max(1, args.numero // 20)  # cada escritura directa es un commit: menos llamadas
+
+        resultados = {
+            "obtener_tasa": medir(lambda: tasas.obtener_tasa("EUR", "JPY", codigos), args.numero, args.repeticiones),
+            "tasa_cruzada": medir(lambda: tasas.tasa_cruzada(tabla, "EUR", "JPY"), args.numero, args.repeticiones),
+            "formatear_importe": medir(
+                lambda: conversion.formatear_importe("EUR", conversion.a_unidades("EUR", 1234567.891)),
+                args.numero,
+                args.repeticiones,
+            ),
+            "convertir": medir(
+                lambda: conversion.convertir(100.0, "EUR", "JPY", tabla), args.numero, args.repeticiones
+            ),
+            "validar_conversion": medir(
+                lambda: conversion.validar_conversion({"cantidad": "100", "moneda_origen": "EUR", "moneda_destino": "JPY"}),
+                args.numero,
+                args.repeticiones,
+            ),
+            "guardar_conversion": medir(
+                lambda: database.guardar_conversion(1000, "USD", "EUR", 920, 0.92), numero_db, args.repeticiones
+            ),
+            "obtener_historial_con_banderas": medir(
+                lambda: wsgi._obtener_historial_con_banderas(), args.numero, args.repeticiones
+            ),
+            # Al final: deja trabajo en la cola del escritor que no debe afectar a las demás medidas
+            "encolar_conversion": medir(
+                lambda: escritor_historial.encolar_conversion(1000, "USD", "EUR", 920, 0.92),
+                args.numero,
+                args.repeticiones,
+            ),
+        }
+        escritor_historial.detener()
+        database.cerrar_conexion()
+    comun.emitir(resultados, args.salida, args.comparar, claves=("us",), umbral=args.umbral)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Utilidades compartidas por los benchmarks: tasas de ejemplo, percentiles, salida JSON y un proveedor HTTP local."""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Unidades de cada moneda por 1 USD (valores aproximados, solo para medir)
+TASAS_USD = {
+    "USD": 1.0, "EUR": 0.92, "VES": 36.5, "PYG": 7300.0, "ARS": 870.0, "MXN": 17.0, "CLP": 940.0, "COP": 3900.0,
+    "BRL": 5.0, "GBP": 0.79, "JPY": 150.0, "CAD": 1.36, "AUD": 1.52, "CHF": 0.88, "CNY": 7.2, "SEK": 10.4,
+}
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) por rango más cercano de una lista ya ordenada."""
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumen_latencias(latencias_ms, segundos):
+    """Peticiones, req/s y p50/p95/p99 (ms) de una lista de latencias."""
+    ordenadas = sorted(latencias_ms)
+    return {
+        "peticiones": len(ordenadas),
+        "rps": round(len(ordenadas) / segundos, 1) if segundos else None,
+        "p50_ms": round(percentil(ordenadas, 50), 3) if ordenadas else None,
+        "p95_ms": round(percentil(ordenadas, 95), 3) if ordenadas else None,
+        "p99_ms": round(percentil(ordenadas, 99), 3) if ordenadas else None,
+    }
+
+
+def comparar(actual, anterior, claves, umbral):
+    """
+    Compara dos resultados con la misma forma: para cada métrica de `claves` (más bajo es mejor) devuelve las que empeoran más de `umbral` (0.2 = un 20 %) como {ruta: (antes, ahora)}.
+    """
+    regresiones = {}
+
+    def recorrer(a, b, ruta):
+        if isinstance(a, dict) and isinstance(b, dict):
+            for clave in a:
+                if clave in b:
+                    recorrer(a[clave], b[clave], f"{ruta}.{clave}" if ruta else clave)
+        elif ruta.rsplit(".", 1)[-1] in claves and isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if b > 0 and a > b * (1 + umbral):
+                regresiones[ruta] = (b, a)
+
+    recorrer(actual, anterior, "")
+    return regresiones
+
+
+def emitir(resultados, salida=None, anterior=None, claves=(), umbral=0.2):
+    """Imprime los resultados en JSON, opcionalmente los guarda y, si se da `anterior`, sale con 1 ante regresiones."""
+    texto = json.dumps(resultados, indent=2)
+    print(texto)
+    if salida:
+        with open(salida, "w") as f:
+            f.write(texto + "\n")
+    if anterior:
+        with open(anterior) as f:
+            regresiones = comparar(resultados, json.load(f), claves, umbral)
+        for ruta, (antes, ahora) in sorted(regresiones.items()):
+            print(f"Regresión en {ruta}: {antes} -> {ahora}", file=sys.stderr)
+        if regresiones:
+            sys.exit(1)
+
+
+class _ManejadorProveedor(BaseHTTPRequestHandler):
+    def do_GET(self):
+        servidor = self.server
+        servidor.peticiones += 1
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        if random.random() < servidor.tasa_fallos:
+            self.send_response(503)
+            self.end_headers()
+            return
+        base = self.path.rstrip("/").rsplit("/", 1)[-1]
+        if base not in TASAS_USD:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{base}-{servidor.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        por_base = TASAS_USD[base]
+        cuerpo = json.dumps({
+            "result": "success",
+            "base_code": base,
+            "time_next_update_unix": 0,
+            "rates": {codigo: valor / por_base for codigo, valor in TASAS_USD.items()},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_proveedor_http(latencia=0.0, tasa_fallos=0.0, puerto=0):
+    """
+    Servidor HTTP local con el mismo formato que open.er-api.com (ETag y 304 incluidos), con latencia y tasa de fallos configurables. Devuelve (servidor, plantilla de URL para proveedor.ProveedorER).
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _ManejadorProveedor)
+    servidor.daemon_threads = True
+    servidor.latencia = latencia
+    servidor.tasa_fallos = tasa_fallos
+    servidor.version = 1
+    servidor.peticiones = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/v6/latest/{{}}"
@@ -0,0 +1,41 @@
+"""
+Fixtures compartidas: una base de datos temporal con el estado en memoria de cada módulo
+vacío, y la app Flask sobre ella con un proveedor de tasas local (sin red).
+"""
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+import comun
+from tucambio import database, escritor_historial, eventos, historial_reciente, proveedor, tasas, wsgi
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Base de datos temporal ya creada, sin tablas de tasas en memoria ni historial reciente."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "historial.db"))
+    monkeypatch.setattr(tasas, "TASAS_CACHE", {})
+    monkeypatch.setattr(tasas, "PROVEEDOR", proveedor.ProveedorFalso(dict(comun.TASAS_USD)))
+    monkeypatch.setattr(historial_reciente, "_recientes", historial_reciente.collections.deque(maxlen=historial_reciente.MAX_RECIENTES))
+    monkeypatch.setattr(historial_reciente, "_ultimo_id", 0)
+    monkeypatch.setattr(historial_reciente, "_hidratado", False)
+    monkeypatch.setattr(wsgi, "_MATRIZ_TASAS", {})
+    monkeypatch.setattr(wsgi, "_MATRIZ_FILAS", {})
+    monkeypatch.setattr(escritor_historial, "SINCRONIZACION", 0.05)  # que el escritor se pare enseguida al final
+    monkeypatch.setattr(eventos, "_DIFFS", {})
+    database.init_db()
+    yield tmp_path
+    # Parar el escritor (lo encolado se escribe antes): si no, seguiría leyendo la base por defecto
+    escritor_historial.detener()
+    database.cerrar_conexion()
+
+
+@pytest.fixture
+def cliente(base):
+    """Cliente de pruebas de la app Flask (sin sus hilos de fondo)."""
+    return wsgi.crear_app("clasico", servicios=False).test_client()
@@ -0,0 +1,70 @@
+"""
+Escritor del historial en segundo plano: al detenerlo escribe todo lo encolado, y con la
+cola llena las peticiones no se pierden (intentar_encolar avisa y encolar_conversion la
+escribe en el acto) mientras la memoria sigue acotada.
+
+    python -m pytest tests
+"""
+import queue
+import threading
+
+from tucambio import database, escritor_historial, historial_reciente
+
+N = 500
+
+
+def _contar():
+    return database.obtener_conexion().execute('SELECT COUNT(*) FROM historial').fetchone()[0]
+
+
+def test_detener_vacia_la_cola(base, monkeypatch):
+    lotes = []
+    guardar = database.guardar_conversiones
+
+    def contar_lotes(filas, fechas=None):
+        lotes.append(len(filas))
+        return guardar(filas, fechas)
+
+    monkeypatch.setattr(database, "guardar_conversiones", contar_lotes)
+    for i in range(N):
+        escritor_historial.encolar_conversion(100 + i, "USD", "EUR", 92, 0.92)
+    escritor_historial.detener()
+
+    assert escritor_historial.pendientes() == 0
+    assert _contar() == N
+    assert sum(lotes) == N and max(lotes) <= escritor_historial.TAMANO_LOTE
+
+
+def test_cola_llena(base, monkeypatch):
+    cola = queue.Queue(maxsize=2)
+    monkeypatch.setattr(escritor_historial, "_cola", cola)
+    monkeypatch.setattr(escritor_historial, "ESPERA_COLA_LLENA", 0.01)
+    escribiendo = threading.Event()
+    seguir = threading.Event()
+    guardar = database.guardar_conversiones
+
+    def guardar_lento(filas, fechas=None):
+        escribiendo.set()
+        assert seguir.wait(5)
+        return guardar(filas, fechas)
+
+    monkeypatch.setattr(database, "guardar_conversiones", guardar_lento)
+
+    # El escritor se queda con la primera y se bloquea; las dos siguientes llenan la cola
+    escritor_historial.encolar_conversion(100, "USD", "EUR", 92, 0.92)
+    assert escribiendo.wait(5)
+    assert escritor_historial.intentar_encolar(200, "USD", "EUR", 184, 0.92)
+    assert escritor_historial.intentar_encolar(300, "USD", "EUR", 276, 0.92)
+
+    assert not escritor_historial.intentar_encolar(400, "USD", "EUR", 368, 0.92)
+    assert [item[1] for item in historial_reciente.obtener(10)] == [3.0, 2.0, 1.0]
+    escritor_historial.encolar_conversion(500, "USD", "EUR", 460, 0.92)
+    assert _contar() == 1  # escrita en el acto, con el escritor aún bloqueado
+    assert cola.qsize() == 2
+
+    seguir.set()
+    assert escritor_historial.esperar_vaciado(5)
+    filas = database.obtener_conexion().execute('SELECT cantidad_unidades FROM historial ORDER BY id').fetchall()
+    assert sorted(f[0] for f in filas) == [100, 200, 300, 500]
+    assert sorted(item[1] for item in historial_reciente.obtener(10)) == [1.0, 2.0, 3.0, 5.0]
+    assert None not in [item[0] for item in historial_reciente.obtener(10)]
@@ -0,0 +1,97 @@
+"""
+Acumulados de volumen: tras rellenarlos con el historial anterior a su creación, coinciden
+con un GROUP BY sobre `historial` por par y hora/día, sumen las conversiones nuevas en el
+acto o por lotes; y /estadisticas responde desde ellos.
+
+    python -m pytest tests
+"""
+import pytest
+
+from tucambio import database, estadisticas
+
+MONEDAS = ["USD", "EUR", "JPY", "PYG", "MXN"]
+
+
+def _filas(n, desplazamiento=0):
+    """`n` conversiones repartidas en varios días y horas (con fecha 'AAAA-MM-DD HH:MM:SS')."""
+    filas = []
+    for i in range(desplazamiento, desplazamiento + n):
+        fecha = f"2024-06-{1 + i % 9:02d} {i * 7 % 24:02d}:{i % 60:02d}:{i * 13 % 60:02d}"
+        filas.append(((i * 37 % 1000 + 1, MONEDAS[i % 5], MONEDAS[(i * 3 + 1) % 5], i * 11 + 3, 0.5 + i % 7 / 10), fecha))
+    return filas
+
+
+def _agrupado(periodo):
+    segundos = database.PERIODOS_VOLUMEN[periodo]
+    return sorted(database.obtener_conexion().execute(f'''
+        SELECT CAST(strftime('%s', fecha) AS INTEGER) / {segundos} * {segundos} AS inicio, moneda_origen, moneda_destino,
+               COUNT(*), SUM(cantidad_unidades), SUM(resultado_unidades), ROUND(SUM(tasa), 9)
+        FROM historial GROUP BY inicio, moneda_origen, moneda_destino
+    ''').fetchall())
+
+
+def _acumulados(periodo):
+    return sorted(database.obtener_conexion().execute('''
+        SELECT inicio, moneda_origen, moneda_destino, conversiones, suma_cantidad, suma_resultado, ROUND(suma_tasa, 9)
+        FROM volumen WHERE periodo = ?
+    ''', (periodo,)).fetchall())
+
+
+@pytest.fixture
+def base_previa(tmp_path, monkeypatch):
+    """Base con historial anterior a los acumulados: sus filas quedan pendientes de rellenar."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "historial.db"))
+    database.init_db()
+    conn = database.obtener_conexion()
+    with conn:
+        conn.executemany(database.SQL_INSERTAR_CONVERSION_CON_FECHA, [fila + (fecha,) for fila, fecha in _filas(500)])
+        conn.execute('DROP TABLE volumen')
+        conn.execute('DROP TABLE volumen_estado')
+    database.init_volumen()
+    yield
+    database.cerrar_conexion()
+
+
+def test_relleno_coincide_con_group_by(base_previa):
+    assert database.estado_volumen() == (500, 0)
+    while database.rellenar_volumen(77)[0] < 500:
+        pass
+    # Las nuevas, después de crear los acumulados: una a una y en lote
+    nuevas = _filas(60, desplazamiento=500)
+    for fila, fecha in nuevas[:20]:
+        database.guardar_conversion(*fila, fecha=fecha)
+    database.guardar_conversiones([fila for fila, _ in nuevas[20:]], [fecha for _, fecha in nuevas[20:]])
+    # Otra pasada de relleno no suma nada dos veces
+    database.rellenar_volumen(77)
+
+    for periodo in database.PERIODOS_VOLUMEN:
+        assert _acumulados(periodo) == _agrupado(periodo)
+
+
+def test_relleno_interrumpido_sigue_donde_se_quedo(base_previa):
+    database.rellenar_volumen(100)
+    database.cerrar_conexion()  # como si el proceso terminara
+    estadisticas.rellenar(lote=150, pausa=0)
+    assert database.estado_volumen() == (500, 500)
+    assert _acumulados("dia") == _agrupado("dia")
+
+
+def test_estadisticas_desde_los_acumulados(base_previa):
+    estadisticas.rellenar(lote=1000, pausa=0)
+    desde, hasta = 1717200000, 1717977600  # 2024-06-01 .. 2024-06-10
+    datos = estadisticas.consultar(desde, hasta, periodo="dia", limite=100)
+    assert datos["completo"]
+    assert datos["conversiones"] == 500
+    grupos = database.obtener_conexion().execute(
+        'SELECT moneda_origen || "-" || moneda_destino, COUNT(*) FROM historial GROUP BY 1'
+    ).fetchall()
+    assert sorted((p["par"], p["conversiones"]) for p in datos["pares"]) == sorted(grupos)
+    # Sin pasar por `historial`: el coste no depende de su tamaño
+    conn = database.obtener_conexion()
+    trazas = []
+    conn.set_trace_callback(trazas.append)
+    try:
+        estadisticas.consultar(desde, hasta, periodo="hora")
+    finally:
+        conn.set_trace_callback(None)
+    assert trazas and not any("historial" in sql for sql in trazas)
@@ -0,0 +1,69 @@
+"""
+Exportación del historial: el formato columnar se lee de vuelta con leer_columnar y da
+exactamente las filas de la base (también con varios grupos y con filtros), igual que el
+CSV y el NDJSON.
+
+    python -m pytest tests
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from tucambio import database, exportar
+
+N_FILAS = 1234
+
+
+@pytest.fixture
+def filas(base):
+    """N_FILAS conversiones repartidas en varios días, como salen de la base (fecha unix)."""
+    monedas = ["USD", "EUR", "JPY", "PYG", "MXN"]
+    database.guardar_conversiones(
+        [(i * 7 + 1, monedas[i % 5], monedas[(i + 1) % 5], i * 13 + 5, 0.5 + i / 1000) for i in range(N_FILAS)],
+        [f"2024-05-{1 + i // 100:02d} {i % 24:02d}:00:00" for i in range(N_FILAS)],
+    )
+    return [
+        tuple(fila) for fila in database.obtener_conexion().execute('''
+            SELECT id, cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, CAST(strftime('%s', fecha) AS INTEGER)
+            FROM historial ORDER BY id
+        ''').fetchall()
+    ]
+
+
+def _leer(datos):
+    return [tuple(fila[c] for c in exportar.COLUMNAS) for fila in exportar.leer_columnar(io.BytesIO(datos))]
+
+
+def test_columnar_ida_y_vuelta(cliente, filas, monkeypatch):
+    monkeypatch.setattr(exportar, "TAMANO_BLOQUE", 100)  # varios grupos
+    resp = cliente.get("/historial/export?formato=columnar")
+    assert resp.status_code == 200
+    assert _leer(resp.data) == filas
+
+    # El mismo formato por escrito, con bloques que no dividen el total
+    salida = io.BytesIO()
+    total = exportar.escribir(salida, "columnar", tamano=333)
+    assert total == len(salida.getvalue())
+    assert _leer(salida.getvalue()) == filas
+
+
+def test_columnar_con_filtros(cliente, filas):
+    desde, hasta = filas[300][6], filas[900][6]
+    resp = cliente.get(f"/historial/export?formato=columnar&origen=USD&destino=EUR&desde={desde}&hasta={hasta}")
+    assert _leer(resp.data) == [f for f in filas if f[2:4] == ("USD", "EUR") and desde <= f[6] <= hasta]
+
+
+def test_csv_y_ndjson_tienen_las_mismas_filas(cliente, filas):
+    texto = cliente.get("/historial/export?formato=csv").data.decode()
+    lineas = list(csv.reader(io.StringIO(texto)))
+    assert tuple(lineas[0]) == exportar.COLUMNAS
+    assert [int(fila[0]) for fila in lineas[1:]] == [f[0] for f in filas]
+    objetos = [json.loads(linea) for linea in cliente.get("/historial/export?formato=ndjson").data.decode().splitlines()]
+    assert [(o["id"], o["cantidad_unidades"], o["resultado_unidades"], o["tasa"]) for o in objetos] == [(f[0], f[1], f[4], f[5]) for f in filas]
+
+
+def test_fichero_no_columnar():
+    with pytest.raises(ValueError):
+        list(exportar.leer_columnar(io.BytesIO(b"id,cantidad\n")))
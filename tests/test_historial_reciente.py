@@ -0,0 +1,66 @@
+"""
+Búfer del historial reciente: sirve las mismas filas y en el mismo orden (fecha, id) que
+el historial de la base, con las conversiones sueltas, las de un lote y las de otros
+procesos, y no conserva las que no se pudieron guardar.
+
+    python -m pytest tests
+"""
+import pytest
+
+from tucambio import database, escritor_historial, historial_reciente
+
+
+def _ids_base(limite):
+    filas, _ = database.obtener_pagina_historial(limite=limite, columnas=("id",))
+    return [fila["id"] for fila in filas]
+
+
+def _ids_bufer(limite):
+    return [item[0] for item in historial_reciente.obtener(limite)]
+
+
+def test_mismo_orden_que_la_base(cliente):
+    cliente.post("/convertir", json={"cantidad": 10, "moneda_origen": "USD", "moneda_destino": "EUR"})
+    # Otro proceso escribe una fila con una fecha posterior a las que aún están por llegar
+    database.guardar_conversion(100, "USD", "JPY", 15000, 150.0, fecha="2999-01-01 00:00:00")
+    resp = cliente.post("/convertir/lote", json=[
+        {"cantidad": 1, "moneda_origen": "EUR", "moneda_destino": "USD"},
+        {"cantidad": 2, "moneda_origen": "USD", "moneda_destino": "MXN"},
+    ])
+    assert resp.get_json()["errores"] == 0
+    cliente.post("/convertir", json={"cantidad": 3, "moneda_origen": "GBP", "moneda_destino": "USD"})
+    assert escritor_historial.esperar_vaciado(5)
+
+    assert _ids_base(10) == _ids_bufer(10)
+    assert len(_ids_bufer(10)) == 5
+    # La del futuro va primera aunque no es la de id mayor
+    assert historial_reciente.obtener(1)[0][6] == "2999-01-01 00:00:00"
+
+
+def test_lote_entra_en_el_bufer(cliente):
+    historial_reciente.obtener()  # búfer ya hidratado: el lote no puede llegar leyendo la base
+    cliente.post("/convertir/lote", json=[{"cantidad": 5, "moneda_origen": "USD", "moneda_destino": "EUR"}])
+    assert _ids_bufer(5) == _ids_base(5) != []
+
+
+def test_escritura_fallida_sale_del_bufer(cliente, monkeypatch):
+    cliente.post("/convertir", json={"cantidad": 10, "moneda_origen": "USD", "moneda_destino": "EUR"})
+    assert escritor_historial.esperar_vaciado(5)
+
+    def fallar(filas, fechas=None):
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setattr(database, "guardar_conversiones", fallar)
+    cliente.post("/convertir", json={"cantidad": 20, "moneda_origen": "USD", "moneda_destino": "EUR"})
+    assert escritor_historial.esperar_vaciado(5)
+
+    assert _ids_bufer(10) == _ids_base(10)
+    assert None not in _ids_bufer(10)
+
+
+@pytest.mark.parametrize("limite", [1, historial_reciente.MAX_RECIENTES])
+def test_fecha_guardada_es_la_del_bufer(cliente, limite):
+    cliente.post("/convertir", json={"cantidad": 10, "moneda_origen": "USD", "moneda_destino": "EUR"})
+    assert escritor_historial.esperar_vaciado(5)
+    filas, _ = database.obtener_pagina_historial(limite=limite, columnas=("id", "fecha"))
+    assert [(f["id"], f["fecha"]) for f in filas] == [(item[0], item[6]) for item in historial_reciente.obtener(limite)]
@@ -0,0 +1,32 @@
+"""
+Lectura de los parámetros `desde`/`hasta` (historico.leer_momento) que comparten
+/tasas/historico, /estadisticas y /historial/export.
+
+    python -m pytest tests
+"""
+import pytest
+
+from tucambio import historico
+
+
+def test_lee_timestamps_y_fechas_iso():
+    assert historico.leer_momento("1700000000") == 1700000000.0
+    assert historico.leer_momento("2024-01-01") == 1704067200.0
+    assert historico.leer_momento("2024-01-01T01:00:00+01:00") == 1704067200.0
+    assert historico.leer_momento("") is None
+    assert historico.leer_momento(None) is None
+
+
+@pytest.mark.parametrize("texto", ["inf", "-inf", "nan", "Infinity", "1e400", "1e20", "-1", "mañana"])
+def test_rechaza_momentos_no_validos(texto):
+    with pytest.raises(ValueError):
+        historico.leer_momento(texto)
+
+
+@pytest.mark.parametrize("ruta", ["/tasas/historico?par=USD-EUR", "/estadisticas", "/historial/export"])
+@pytest.mark.parametrize("parametro", ["desde=inf", "desde=nan", "hasta=-inf", "hasta=1e20"])
+def test_las_rutas_responden_400(cliente, ruta, parametro):
+    separador = "&" if "?" in ruta else "?"
+    resp = cliente.get(f"{ruta}{separador}{parametro}")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
@@ -0,0 +1,208 @@
+"""
+Importes en unidades mínimas: las cantidades se redondean a la unidad mínima de su
+moneda, y la migración de una base antigua (cantidad REAL y resultado como texto) no
+cambia ids ni totales, no hace nada la segunda vez y deja que el archivo de un mes
+empezado con las columnas antiguas siga en su fichero .N.tcol.
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from tucambio import conversion, database, escritor_historial, exportar, retencion
+
+# (id, cantidad, origen, destino, resultado como se mostraba, tasa, fecha): con huecos en
+# los ids, separadores de miles y monedas sin decimales
+FILAS_ANTIGUAS = [
+    (1, 1000.0, "USD", "EUR", "920.00 Euro", 0.92, "2020-01-05 10:00:00"),
+    (2, 1234.5, "USD", "JPY", "185,175 Yen japonés", 150.0, "2020-01-05 11:00:00"),
+    (4, 7500.0, "PYG", "USD", "1.00 Dólar estadounidense", 0.000133, "2020-01-06 09:30:00"),
+    (5, 12.5, "VES", "EUR", "0.34 Euro", 0.0275, "2020-01-20 18:00:00"),
+    (7, 1000000.0, "EUR", "USD", "1,086,956.52 Dólar estadounidense", 1.0869565, "2020-02-01 00:00:00"),
+    (8, 0.1, "USD", "MXN", "1.71 Peso mexicano", 17.1, "2020-02-02 00:00:00"),
+]
+SECUENCIA = 9  # el id 9 se usó y se borró: los nuevos tienen que seguir después
+
+
+def _unidades(fila):
+    _, cantidad, origen, destino, resultado, _, _ = fila
+    return conversion.a_unidades(origen, cantidad), conversion.a_unidades(destino, resultado.split(" ")[0].replace(",", ""))
+
+
+def _base_antigua(ruta, volumen=False):
+    """Base con el esquema de la versión original (y, si `volumen`, los acumulados en REAL de antes de la migración)."""
+    conn = sqlite3.connect(ruta)
+    with conn:
+        conn.execute('''
+            CREATE TABLE historial (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cantidad REAL NOT NULL,
+                moneda_origen TEXT NOT NULL,
+                moneda_destino TEXT NOT NULL,
+                resultado TEXT NOT NULL,
+                tasa REAL NOT NULL,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.executemany('INSERT INTO historial VALUES (?, ?, ?, ?, ?, ?, ?)', FILAS_ANTIGUAS)
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'historial'", (SECUENCIA,))
+        if volumen:
+            conn.execute(database.SQL_CREAR_VOLUMEN.format(tabla="volumen").replace("INTEGER NOT NULL,\n        suma_resultado INTEGER", "REAL NOT NULL,\n        suma_resultado REAL"))
+            conn.executemany(
+                "INSERT INTO volumen VALUES ('dia', 0, ?, ?, 1, ?, ?, ?)",
+                [(o, d, c, float(r.split(" ")[0].replace(",", "")), t) for _, c, o, d, r, t, _ in FILAS_ANTIGUAS],
+            )
+    conn.close()
+
+
+@pytest.fixture
+def ruta(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "historial.db")
+    monkeypatch.setattr(database, "DB_PATH", ruta)
+    yield ruta
+    database.cerrar_conexion()
+
+
+def _totales_volumen(periodo="dia"):
+    return database.obtener_conexion().execute('''
+        SELECT moneda_origen, moneda_destino, SUM(conversiones), SUM(suma_cantidad), SUM(suma_resultado)
+        FROM volumen WHERE periodo = ? GROUP BY moneda_origen, moneda_destino ORDER BY 1, 2
+    ''', (periodo,)).fetchall()
+
+
+def _totales_esperados():
+    totales = {}
+    for fila in FILAS_ANTIGUAS:
+        cantidad, resultado = _unidades(fila)
+        n, c, r = totales.get((fila[2], fila[3]), (0, 0, 0))
+        totales[(fila[2], fila[3])] = (n + 1, c + cantidad, r + resultado)
+    return [par + total for par, total in sorted(totales.items())]
+
+
+def _volcado():
+    conn = database.obtener_conexion()
+    return {
+        tabla: conn.execute(f'SELECT * FROM {tabla} ORDER BY 1, 2').fetchall()
+        for tabla in ("historial", "volumen", "volumen_estado", "sqlite_sequence")
+    }
+
+
+@pytest.mark.parametrize("cantidad, moneda, esperada", [
+    ("1.005", "USD", Decimal("1.01")),
+    ("2.675", "EUR", Decimal("2.68")),
+    ("12.5", "JPY", Decimal("13")),
+    (" 1000 ", "PYG", Decimal("1000")),
+    (7, "USD", Decimal("7.00")),
+])
+def test_cantidad_redondeada_a_la_unidad_minima(cantidad, moneda, esperada):
+    assert conversion.leer_cantidad(cantidad, moneda) == (esperada, None)
+
+
+@pytest.mark.parametrize("cantidad, moneda", [("0.004", "USD"), ("0.4", "JPY"), ("0", "EUR"), ("-1", "EUR"), ("nan", "USD"), ("inf", "USD"), ("1e13", "USD"), ("abc", "USD")])
+def test_cantidad_no_valida(cantidad, moneda):
+    valor, error = conversion.leer_cantidad(cantidad, moneda)
+    assert valor is None and error
+
+
+def test_se_guarda_lo_que_se_convirtio(cliente):
+    resp = cliente.post("/convertir", json={"cantidad": "1.005", "moneda_origen": "USD", "moneda_destino": "JPY"})
+    assert resp.status_code == 200
+    datos = resp.get_json()
+    assert datos["cantidad"] == 1.01
+    resp = cliente.post("/convertir/lote", json=[{"cantidad": 12.5, "moneda_origen": "JPY", "moneda_destino": "USD"}])
+    assert resp.get_json()["resultados"][0]["cantidad"] == 13
+    assert escritor_historial.esperar_vaciado(5)
+    filas = database.obtener_conexion().execute('SELECT cantidad_unidades, moneda_origen FROM historial').fetchall()
+    assert sorted(filas) == [(13, "JPY"), (101, "USD")]
+    assert cliente.get("/matriz?base=USD&cantidad=1.005").get_json()["cantidad"] == 1.01
+
+
+def test_migra_esquema_original(ruta):
+    _base_antigua(ruta)
+    database.init_db()
+    conn = database.obtener_conexion()
+
+    filas = conn.execute('SELECT id, cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha FROM historial ORDER BY id').fetchall()
+    assert [f[0] for f in filas] == [f[0] for f in FILAS_ANTIGUAS]
+    assert [(f[1], f[4]) for f in filas] == [_unidades(f) for f in FILAS_ANTIGUAS]
+    assert filas[2][1] == 7500 and filas[3][1] == 13  # PYG y VES, sin decimales (12.5 VES se redondea)
+    assert filas[4][4] == 108695652  # "1,086,956.52"
+    assert [f[6] for f in filas] == [f[6] for f in FILAS_ANTIGUAS]
+
+    # Los acumulados de una base sin ellos salen del historial migrado
+    while database.rellenar_volumen(2)[0] < database.estado_volumen()[0]:
+        pass
+    assert _totales_volumen("dia") == _totales_volumen("hora") == _totales_esperados()
+
+    database.guardar_conversion(100, "USD", "EUR", 92, 0.92)
+    assert conn.execute('SELECT MAX(id) FROM historial').fetchone()[0] == SECUENCIA + 1
+
+
+def test_migra_acumulados_en_real(ruta):
+    _base_antigua(ruta, volumen=True)
+    database.init_db()
+    assert _totales_volumen("dia") == _totales_esperados()
+
+
+def test_segunda_migracion_no_hace_nada(ruta):
+    _base_antigua(ruta, volumen=True)
+    database.init_db()
+    antes = _volcado()
+    assert database.migrar_importes() == 0
+    database.init_db()
+    assert _volcado() == antes
+
+
+ESQUEMA_ANTIGUO = (
+    ("id", "i64delta"),
+    ("cantidad", "f64"),
+    ("moneda_origen", "texto"),
+    ("moneda_destino", "texto"),
+    ("resultado", "texto"),
+    ("tasa", "f64"),
+    ("fecha", "i64delta"),
+)
+
+
+def test_archivo_antiguo_sigue_en_fichero_nuevo(ruta, tmp_path, monkeypatch):
+    """Un mes archivado con las columnas antiguas sigue, tras migrar, en historial-AAAA-MM.1.tcol sin tocar el antiguo."""
+    _base_antigua(ruta)
+    # Una pasada de retención anterior a la migración ya archivó el id 1 de enero de 2020
+    carpeta = str(tmp_path / "archivo")
+    os.makedirs(carpeta)
+    antigua = FILAS_ANTIGUAS[0]
+    with monkeypatch.context() as m:
+        m.setattr(exportar, "ESQUEMA", ESQUEMA_ANTIGUO)
+        datos_antiguos = exportar.cabecera_columnar() + exportar.grupo_columnar([antigua[:6] + (1578218400,)])
+    with open(os.path.join(carpeta, "historial-2020-01.tcol"), "wb") as f:
+        f.write(datos_antiguos)
+    conn = sqlite3.connect(ruta)
+    with conn:
+        conn.execute('DELETE FROM historial WHERE id = 1')
+    conn.close()
+    database.init_db()
+    database.confirmar_archivado(1, 1, {"historial-2020-01.tcol": (len(datos_antiguos), 1)})
+    while database.rellenar_volumen()[0] < database.estado_volumen()[0]:
+        pass
+    totales = _totales_volumen()
+
+    resumen = retencion.aplicar(dias=1, carpeta=carpeta)
+
+    assert resumen["archivadas"] == len(FILAS_ANTIGUAS) - 1
+    assert resumen["ficheros"] == ["historial-2020-01.1.tcol", "historial-2020-02.tcol"]
+    with open(os.path.join(carpeta, "historial-2020-01.tcol"), "rb") as f:
+        assert f.read() == datos_antiguos
+    with open(os.path.join(carpeta, "historial-2020-01.tcol"), "rb") as f:
+        assert [fila["cantidad"] for fila in exportar.leer_columnar(f)] == [antigua[1]]
+    ids = []
+    for nombre in resumen["ficheros"]:
+        with open(os.path.join(carpeta, nombre), "rb") as f:
+            filas = list(exportar.leer_columnar(f))
+        assert all(fila["cantidad_unidades"] == _unidades(FILAS_ANTIGUAS[[a[0] for a in FILAS_ANTIGUAS].index(fila["id"])])[0] for fila in filas)
+        ids += [fila["id"] for fila in filas]
+    assert sorted(ids) == [f[0] for f in FILAS_ANTIGUAS[1:]]
+    assert database.obtener_conexion().execute('SELECT COUNT(*) FROM historial').fetchone()[0] == 0
+    assert _totales_volumen() == totales
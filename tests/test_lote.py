@@ -0,0 +1,52 @@
+"""
+/convertir/lote: un resultado o un error por elemento y en el mismo orden que la
+petición, aunque se agrupen por par; cada resultado igual al de /convertir; solo se
+guardan los válidos.
+
+    python -m pytest tests
+"""
+from tucambio import database, wsgi
+
+ITEMS = [
+    {"cantidad": 10, "moneda_origen": "USD", "moneda_destino": "EUR"},
+    {"cantidad": 5, "moneda_origen": "EUR", "moneda_destino": "JPY"},
+    {"cantidad": "abc", "moneda_origen": "USD", "moneda_destino": "EUR"},
+    {"cantidad": 20, "moneda_origen": "USD", "moneda_destino": "EUR"},
+    {"cantidad": 1, "moneda_origen": "XXX", "moneda_destino": "EUR"},
+    "no es un objeto",
+    {"cantidad": -3, "moneda_origen": "GBP", "moneda_destino": "USD"},
+    {"moneda_origen": "USD", "moneda_destino": "EUR"},
+    {"cantidad": 7.5, "moneda_origen": "EUR", "moneda_destino": "JPY"},
+    {"cantidad": 1000, "moneda_origen": "PYG", "moneda_destino": "USD"},
+]
+VALIDOS = [0, 1, 3, 8, 9]
+
+
+def test_orden_y_errores_por_elemento(cliente):
+    resp = cliente.post("/convertir/lote", json=ITEMS)
+    assert resp.status_code == 200
+    datos = resp.get_json()
+    resultados = datos["resultados"]
+    assert len(resultados) == len(ITEMS)
+    assert datos["errores"] == len(ITEMS) - len(VALIDOS)
+    assert [i for i, r in enumerate(resultados) if "error" not in r] == VALIDOS
+    assert resultados[4]["error"] == "Moneda no válida."
+    assert resultados[6]["error"] == "La cantidad debe ser mayor que cero."
+
+    for i in VALIDOS:
+        suelta = cliente.post("/convertir", json=ITEMS[i]).get_json()
+        assert {k: suelta[k] for k in ("cantidad", "resultado", "tasa")} == resultados[i]
+
+
+def test_solo_se_guardan_los_validos(cliente):
+    cliente.post("/convertir/lote", json=ITEMS)
+    filas = database.obtener_conexion().execute(
+        'SELECT cantidad_unidades, moneda_origen, moneda_destino FROM historial ORDER BY id'
+    ).fetchall()
+    assert sorted(filas) == sorted([(1000, "USD", "EUR"), (500, "EUR", "JPY"), (2000, "USD", "EUR"), (750, "EUR", "JPY"), (1000, "PYG", "USD")])
+
+
+def test_peticion_no_valida(cliente):
+    assert cliente.post("/convertir/lote", json={"cantidad": 1}).status_code == 400
+    assert cliente.post("/convertir/lote", json=[ITEMS[0]] * (wsgi.MAX_LOTE + 1)).status_code == 400
+    assert cliente.post("/convertir/lote", json=[]).get_json() == {"resultados": [], "errores": 0, "edad_tasa": None}
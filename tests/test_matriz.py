@@ -0,0 +1,58 @@
+"""
+/matriz: con la fila de cada base preparada una vez por versión de la tabla, el cuerpo es
+el mismo que convertir celda a celda, y una cantidad ya servida no se vuelve a calcular.
+
+    python -m pytest tests
+"""
+import json
+
+import pytest
+
+from tucambio import conversion, tasas, wsgi
+from tucambio.conversion import CODIGOS_MONEDAS
+
+
+def _esperado(base, cantidad):
+    """El cuerpo de /matriz calculado celda a celda, como sin caché."""
+    cantidad, _ = conversion.leer_cantidad(cantidad, base)
+    tabla = tasas.obtener_tabla(CODIGOS_MONEDAS)
+    return json.dumps({
+        "base": base,
+        "cantidad": float(cantidad),
+        "version": tabla["version"],
+        "conversiones": [
+            {
+                "codigo": codigo,
+                "valor": float(cantidad) * tasa,
+                "resultado": conversion.formatear_importe(codigo, conversion.resultado_unidades(codigo, cantidad, tasa)),
+                "tasa": f"{tasa:,.6f}",
+            }
+            for codigo, tasa in zip(tabla["codigos"], tabla["filas"][base])
+            if tasa is not None
+        ],
+    })
+
+
+@pytest.mark.parametrize("moneda, cantidad", [("USD", "1"), ("EUR", "1234.567"), ("JPY", "12.5"), ("PYG", "99999999"), ("VES", "0.6"), ("GBP", "1000000000000")])
+def test_mismo_cuerpo_que_celda_a_celda(cliente, moneda, cantidad):
+    resp = cliente.get(f"/matriz?base={moneda}&cantidad={cantidad}")
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True) == _esperado(moneda, cantidad)
+
+
+def test_cantidad_ya_servida_no_se_recalcula(cliente, monkeypatch):
+    primera = cliente.get("/matriz?base=EUR&cantidad=10").get_data(as_text=True)
+    llamadas = []
+    monkeypatch.setattr(wsgi, "formatear_importe", lambda *args: llamadas.append(args))
+    # Misma cantidad escrita de otra forma: el mismo importe redondeado
+    assert cliente.get("/matriz?base=EUR&cantidad=10.001").get_data(as_text=True) == primera
+    assert llamadas == []
+
+
+def test_cuerpos_acotados(cliente, monkeypatch):
+    monkeypatch.setattr(wsgi, "MAX_CUERPOS_MATRIZ", 3)
+    for cantidad in range(1, 8):
+        cliente.get(f"/matriz?base=USD&cantidad={cantidad}")
+    (filas, cuerpos), = wsgi._MATRIZ_FILAS.values()
+    assert len(cuerpos) <= 3 and list(filas) == ["USD"]
+    assert cliente.get("/matriz?base=USD&cantidad=2").get_data(as_text=True) == _esperado("USD", "2")
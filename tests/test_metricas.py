@@ -0,0 +1,90 @@
+"""
+Agregación de /metrics entre workers: contadores e histogramas se suman con los volcados
+de los demás procesos (también de los que ya terminaron) y los indicadores solo con los
+de los que siguen vivos, sumados o por máximo según se registraron.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import time
+
+import pytest
+
+from tucambio import metricas
+
+
+@pytest.fixture
+def registro(tmp_path, monkeypatch):
+    """Registro de métricas vacío que vuelca en un directorio temporal."""
+    monkeypatch.setattr(metricas, "_familias", {})
+    monkeypatch.setattr(metricas, "_indicadores", {})
+    monkeypatch.setattr(metricas, "DIRECTORIO", str(tmp_path))
+    return tmp_path
+
+
+def _worker(directorio, pid, vivo=True):
+    """Convierte el volcado de este proceso en el de otro worker `pid` (vivo o que ya terminó)."""
+    metricas._volcar()
+    ruta = os.path.join(directorio, f"{pid}.json")
+    shutil.move(os.path.join(directorio, f"{os.getpid()}.json"), ruta)
+    if not vivo:
+        antes = time.time() - 10 * metricas.INTERVALO_VOLCADO
+        os.utime(ruta, (antes, antes))
+
+
+def _valores(texto):
+    return dict(linea.rsplit(" ", 1) for linea in texto.splitlines() if not linea.startswith("#"))
+
+
+def test_suma_entre_workers(registro):
+    contador = metricas.contador("prueba_total", "Prueba.", ruta="/convertir")
+    histograma = metricas.histograma("prueba_segundos", "Prueba.", cubetas=(0.1, 1))
+    abiertos = [3]
+    metricas.indicador("prueba_abiertos", "Prueba.", lambda: abiertos[0])
+    metricas.indicador("prueba_edad", "Prueba.", lambda: abiertos[0] * 10, agregacion="maximo")
+
+    # Worker 1 (vivo): 5 peticiones, una lenta; 3 abiertos
+    contador.inc(5)
+    histograma.observar(0.05)
+    histograma.observar(2)
+    _worker(registro, 1)
+    # Worker 2 (ya terminado): 2 peticiones
+    metricas._familias.clear()
+    contador = metricas.contador("prueba_total", "Prueba.", ruta="/convertir")
+    histograma = metricas.histograma("prueba_segundos", "Prueba.", cubetas=(0.1, 1))
+    contador.inc(2)
+    abiertos[0] = 100
+    _worker(registro, 2, vivo=False)
+    # Este proceso: 1 petición de 0.5 s; 4 abiertos
+    metricas._familias.clear()
+    contador = metricas.contador("prueba_total", "Prueba.", ruta="/convertir")
+    histograma = metricas.histograma("prueba_segundos", "Prueba.", cubetas=(0.1, 1))
+    contador.inc()
+    histograma.observar(0.5)
+    abiertos[0] = 4
+
+    valores = _valores(metricas.exponer())
+    assert valores['prueba_total{ruta="/convertir"}'] == "8"
+    assert valores['prueba_segundos_bucket{le="0.1"}'] == "1"
+    assert valores['prueba_segundos_bucket{le="1.0"}'] == "2"
+    assert valores['prueba_segundos_bucket{le="+Inf"}'] == "3"
+    assert valores["prueba_segundos_count"] == "3"
+    assert float(valores["prueba_segundos_sum"]) == pytest.approx(2.55)
+    assert valores["prueba_abiertos"] == "7"  # 3 + 4: el del worker terminado no cuenta
+    assert valores["prueba_edad"] == "40"
+
+
+def test_volcado_ilegible(registro, capsys):
+    metricas.contador("prueba_total", "Prueba.").inc(2)
+    (registro / "9.json").write_text("{roto")
+    assert _valores(metricas.exponer())["prueba_total"] == "2"
+    assert "Error leyendo métricas de 9.json" in capsys.readouterr().out
+
+
+def test_sin_directorio_solo_este_proceso(registro, monkeypatch):
+    metricas.contador("prueba_total", "Prueba.").inc(2)
+    _worker(registro, 1)
+    monkeypatch.setattr(metricas, "DIRECTORIO", None)
+    metricas.contador("prueba_total", "Prueba.").inc()
+    assert _valores(metricas.exponer())["prueba_total"] == "3"  # sin los 2 del volcado del worker 1
@@ -0,0 +1,57 @@
+"""
+Paginación por cursor de /historial: recorrer las páginas con `before_id` da todas las
+filas una sola vez y en el orden del historial (fecha y luego id, de la más reciente a la
+más antigua), también con fechas repetidas o que no crecen con el id.
+
+    python -m pytest tests
+"""
+from tucambio import database
+
+# Fechas repetidas (varias conversiones en el mismo segundo) y una escrita tarde con una
+# fecha anterior a la de ids más bajos
+FECHAS = ["2024-03-01 10:00:00"] * 5 + ["2024-03-01 10:00:01"] * 7 + ["2024-02-29 23:59:59"] + ["2024-03-01 10:00:02"] * 6
+
+
+def _sembrar():
+    filas = [(100 + i, "USD" if i % 3 else "EUR", "EUR" if i % 3 else "USD", 92 + i, 0.92) for i in range(len(FECHAS))]
+    database.guardar_conversiones(filas, FECHAS)
+    return [
+        fila[0] for fila in database.obtener_conexion().execute(
+            'SELECT id FROM historial ORDER BY fecha DESC, id DESC'
+        ).fetchall()
+    ]
+
+
+def _recorrer(cliente, consulta):
+    ids = []
+    before_id = None
+    for _ in range(len(FECHAS) + 1):
+        url = f"/historial?{consulta}" + (f"&before_id={before_id}" if before_id else "")
+        datos = cliente.get(url).get_json()
+        ids += [fila["id"] for fila in datos["historial"]]
+        before_id = datos["before_id"]
+        if before_id is None:
+            return ids
+    raise AssertionError("La paginación no termina")
+
+
+def test_recorre_todo_en_orden(cliente):
+    esperados = _sembrar()
+    for limite in (1, 4, 5, 7, len(FECHAS), 100):
+        assert _recorrer(cliente, f"limite={limite}") == esperados
+
+
+def test_filtro_por_par(cliente):
+    esperados = _sembrar()
+    filas = dict(database.obtener_conexion().execute('SELECT id, moneda_origen FROM historial').fetchall())
+    assert _recorrer(cliente, "limite=3&origen=EUR") == [i for i in esperados if filas[i] == "EUR"]
+
+
+def test_campos_y_errores(cliente):
+    _sembrar()
+    datos = cliente.get("/historial?limite=2&campos=id,resultado").get_json()
+    assert [set(fila) for fila in datos["historial"]] == [{"id", "resultado"}] * 2
+    assert datos["historial"][0]["resultado"].endswith(" Euro") or datos["historial"][0]["resultado"].endswith(" Dólar estadounidense")
+    assert cliente.get("/historial?campos=id,contraseña").status_code == 400
+    assert cliente.get("/historial?before_id=abc").status_code == 400
+    assert cliente.get("/historial?origen=XXX").status_code == 400
@@ -0,0 +1,93 @@
+"""
+Retención: si el proceso muere entre escribir el fichero de archivo y confirmarlo, la
+siguiente pasada recorta el fichero a lo confirmado y ninguna fila se pierde ni se
+archiva dos veces; y si falta un fichero ya confirmado, el mes sigue en el siguiente.
+
+    python -m pytest tests
+"""
+import os
+
+import pytest
+
+from tucambio import database, exportar, retencion
+
+N_FILAS = 7
+
+
+@pytest.fixture
+def carpeta(base, monkeypatch):
+    """Carpeta de archivo y N_FILAS conversiones de enero de 2020, archivadas de 2 en 2."""
+    monkeypatch.setattr(retencion, "LOTE", 2)
+    monkeypatch.setattr(retencion, "PAUSA", 0)
+    database.guardar_conversiones(
+        [(100 * i, "USD", "EUR", 92 * i, 0.92) for i in range(1, N_FILAS + 1)],
+        [f"2020-01-{i:02d} 12:00:00" for i in range(1, N_FILAS + 1)],
+    )
+    return str(base / "archivo")
+
+
+def _ids_archivados(carpeta):
+    ids = []
+    for nombre in sorted(os.listdir(carpeta)):
+        with open(os.path.join(carpeta, nombre), "rb") as f:
+            ids += [fila["id"] for fila in exportar.leer_columnar(f)]
+    return ids
+
+
+def _fallar_en(monkeypatch, llamada):
+    """Hace que la `llamada`-ésima confirmación falle después de escribir el fichero, como si el proceso muriera ahí."""
+    confirmar = database.confirmar_archivado
+    llamadas = [0]
+
+    def confirmar_o_morir(*args):
+        llamadas[0] += 1
+        if llamadas[0] == llamada:
+            raise RuntimeError("proceso muerto")
+        return confirmar(*args)
+
+    monkeypatch.setattr(database, "confirmar_archivado", confirmar_o_morir)
+
+
+@pytest.mark.parametrize("llamada", [1, 3])
+def test_recupera_tras_caida_sin_perder_ni_duplicar(carpeta, monkeypatch, llamada):
+    with monkeypatch.context() as m:
+        _fallar_en(m, llamada)
+        with pytest.raises(RuntimeError):
+            retencion.aplicar(dias=1, carpeta=carpeta)
+    ruta = os.path.join(carpeta, "historial-2020-01.tcol")
+    confirmado, filas = database.archivo_confirmado("historial-2020-01.tcol")
+    assert filas == 2 * (llamada - 1)
+    assert os.path.getsize(ruta) > confirmado  # el grupo sin confirmar sigue en el fichero
+
+    resumen = retencion.aplicar(dias=1, carpeta=carpeta)
+
+    assert resumen["archivadas"] == N_FILAS - filas
+    assert _ids_archivados(carpeta) == list(range(1, N_FILAS + 1))
+    assert os.path.getsize(ruta) == database.archivo_confirmado("historial-2020-01.tcol")[0]
+    assert database.archivo_confirmado("historial-2020-01.tcol")[1] == N_FILAS
+    assert database.obtener_conexion().execute('SELECT COUNT(*) FROM historial').fetchone()[0] == 0
+
+
+def test_fichero_confirmado_que_falta(carpeta, capsys):
+    retencion.aplicar(dias=None, max_filas=2, carpeta=carpeta)
+    os.remove(os.path.join(carpeta, "historial-2020-01.tcol"))
+
+    resumen = retencion.aplicar(dias=1, carpeta=carpeta)
+
+    assert "Aviso: falta" in capsys.readouterr().out
+    assert resumen["ficheros"] == ["historial-2020-01.1.tcol"]
+    assert _ids_archivados(carpeta) == [N_FILAS - 1, N_FILAS]
+
+
+def test_fichero_confirmado_recortado(carpeta, capsys):
+    retencion.aplicar(dias=None, max_filas=2, carpeta=carpeta)
+    ruta = os.path.join(carpeta, "historial-2020-01.tcol")
+    with open(ruta, "r+b") as f:
+        f.truncate(os.path.getsize(ruta) - 1)
+
+    resumen = retencion.aplicar(dias=1, carpeta=carpeta)
+
+    assert "menos de los" in capsys.readouterr().out
+    assert resumen["ficheros"] == ["historial-2020-01.1.tcol"]
+    with open(os.path.join(carpeta, "historial-2020-01.1.tcol"), "rb") as f:
+        assert [fila["id"] for fila in exportar.leer_columnar(f)] == [N_FILAS - 1, N_FILAS]
@@ -0,0 +1,69 @@
+"""
+Single-flight del refresco de tasas: con la caché vacía y un proveedor lento, muchas
+lecturas concurrentes comparten una sola petición al proveedor.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+import comun
+from tucambio import database, proveedor, tasas
+from tucambio.conversion import CODIGOS_MONEDAS
+
+LECTORES = 32
+LATENCIA = 0.5  # segundos de cada respuesta del proveedor (menos que tasas.ESPERA_MAXIMA)
+
+
+@pytest.fixture
+def proveedor_lento(tmp_path, monkeypatch):
+    """Base de datos temporal, caché de tasas vacía y un proveedor HTTP local lento."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "historial.db"))
+    monkeypatch.setattr(tasas, "TASAS_CACHE", {})
+    database.init_db()
+    servidor, url = comun.iniciar_proveedor_http(latencia=LATENCIA)
+    monkeypatch.setattr(tasas, "PROVEEDOR", proveedor.ProveedorER(url))
+    yield servidor
+    servidor.shutdown()
+    database.cerrar_conexion()
+
+
+def _leer_en_paralelo(n):
+    """Lanza `n` hilos que piden la tabla a la vez y devuelve lo que obtuvo cada uno."""
+    barrera = threading.Barrier(n)
+    tablas = [None] * n
+
+    def leer(i):
+        barrera.wait()
+        tablas[i] = tasas.obtener_tabla(CODIGOS_MONEDAS)
+        database.cerrar_conexion()
+
+    hilos = [threading.Thread(target=leer, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=30)
+    return tablas
+
+
+def test_lecturas_en_frio_comparten_una_descarga(proveedor_lento):
+    tablas = _leer_en_paralelo(LECTORES)
+
+    assert proveedor_lento.peticiones == 1
+    assert all(tabla is not None for tabla in tablas)
+    assert len({tabla["version"] for tabla in tablas}) == 1
+
+
+def test_con_tabla_en_memoria_no_se_vuelve_al_proveedor(proveedor_lento):
+    _leer_en_paralelo(LECTORES)
+    tablas = _leer_en_paralelo(LECTORES)
+
+    assert proveedor_lento.peticiones == 1
+    assert all(tabla is tablas[0] for tabla in tablas)
@@ -0,0 +1,17 @@
+"""
+Tu Cambio: conversor de monedas.
+
+    from tucambio import crear_app
+    app = crear_app("web")
+
+Importar el paquete no carga Flask, requests ni sqlite3 ni toca la base de datos: cada
+cosa se carga o se prepara cuando se usa (crear_app, la primera descarga de tasas,
+la primera consulta).
+"""
+
+
+def crear_app(frontend="clasico"):
+    """App WSGI (Flask) con la interfaz `frontend`; ver tucambio.wsgi.crear_app."""
+    from .wsgi import crear_app
+
+    return crear_app(frontend)
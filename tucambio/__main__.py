@@ -0,0 +1,91 @@
+"""
+    python -m tucambio serve [--workers N] [--hilos N] [--host H] [--puerto P] [--frontend clasico|web] [--asgi | --gthread]
+    python -m tucambio rellenar-estadisticas [--lote N]
+    python -m tucambio exportar [--formato csv|ndjson|columnar] [--salida F] [--origen M] [--destino M] [--desde D] [--hasta D]
+    python -m tucambio retencion [--dias N] [--filas N] [--directorio D] [--vacuum-completo]
+"""
+import argparse
+
+from tucambio.frontends import FRONTENDS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tucambio", description="Conversor de monedas Tu Cambio.")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+    serve = ordenes.add_parser("serve", help="Servidor de producción (gunicorn con la app precargada).")
+    serve.add_argument("--workers", type=int, default=None, help="procesos (por defecto WEB_CONCURRENCY o 2 × núcleos + 1)")
+    serve.add_argument("--hilos", type=int, default=None, help="hilos por worker para las rutas de Flask (por defecto TUCAMBIO_HILOS o 4)")
+    serve.add_argument("--host", default=None, help="por defecto HOST o 0.0.0.0")
+    serve.add_argument("--puerto", type=int, default=None, help="por defecto PORT o 5000")
+    serve.add_argument("--frontend", default="clasico", choices=FRONTENDS, help="interfaz a servir")
+    modo = serve.add_mutually_exclusive_group()
+    modo.add_argument("--asgi", dest="asgi", action="store_true", default=True,
+                      help="workers de uvicorn con tucambio.asgi (por defecto)")
+    modo.add_argument("--gthread", dest="asgi", action="store_false", help="workers de hilos con tucambio.wsgi")
+    rellenar = ordenes.add_parser(
+        "rellenar-estadisticas", help="Construye los acumulados de /estadisticas a partir del historial existente."
+    )
+    rellenar.add_argument("--lote", type=int, default=None, help="ids de historial por transacción (por defecto 50000)")
+    exportar = ordenes.add_parser("exportar", help="Exporta el historial en streaming (a la salida estándar por defecto).")
+    exportar.add_argument("--formato", default="csv", choices=("csv", "ndjson", "columnar"))
+    exportar.add_argument("--salida", default=None, help="fichero de destino (por defecto la salida estándar)")
+    exportar.add_argument("--origen", default=None, help="solo conversiones desde esta moneda")
+    exportar.add_argument("--destino", default=None, help="solo conversiones a esta moneda")
+    exportar.add_argument("--desde", default=None, help="timestamp unix o fecha ISO (UTC)")
+    exportar.add_argument("--hasta", default=None, help="timestamp unix o fecha ISO (UTC)")
+    retencion = ordenes.add_parser("retencion", help="Archiva y borra el historial antiguo según las políticas de retención.")
+    retencion.add_argument("--dias", type=int, default=None, help="archivar lo que tenga más días (por defecto TUCAMBIO_RETENCION_DIAS)")
+    retencion.add_argument("--filas", type=int, default=None, help="dejar como mucho estas filas (por defecto TUCAMBIO_RETENCION_FILAS)")
+    retencion.add_argument("--directorio", default=None, help="directorio de los ficheros de archivo")
+    retencion.add_argument(
+        "--vacuum-completo", action="store_true", help="activar auto_vacuum incremental y compactar la base (bloquea a los escritores)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.orden == "serve":
+        from tucambio import servidor
+
+        servidor.servir(
+            frontend=args.frontend,
+            workers=args.workers,
+            hilos=args.hilos or servidor.HILOS,
+            host=args.host or servidor.HOST,
+            puerto=args.puerto or servidor.PORT,
+            asgi=args.asgi,
+        )
+    elif args.orden == "rellenar-estadisticas":
+        from tucambio import estadisticas
+
+        estadisticas.rellenar(args.lote or estadisticas.LOTE_RELLENO)
+    elif args.orden == "retencion":
+        import json
+
+        from tucambio import database, retencion
+
+        database.init_db()
+        if args.vacuum_completo:
+            database.vacuum_completo()
+        dias = args.dias if args.dias is not None else retencion.DIAS
+        max_filas = args.filas if args.filas is not None else retencion.MAX_FILAS
+        if dias is not None or max_filas is not None:
+            print(json.dumps(retencion.aplicar(dias, max_filas, args.directorio)))
+    elif args.orden == "exportar":
+        import sys
+
+        from tucambio import exportar, historico
+
+        filtros = {
+            "moneda_origen": args.origen,
+            "moneda_destino": args.destino,
+            "desde": historico.leer_momento(args.desde),
+            "hasta": historico.leer_momento(args.hasta),
+        }
+        if args.salida:
+            with open(args.salida, "wb") as salida:
+                exportar.escribir(salida, args.formato, **filtros)
+        else:
+            exportar.escribir(sys.stdout.buffer, args.formato, **filtros)
+
+
+if __name__ == "__main__":
+    main()
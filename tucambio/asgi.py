@@ -0,0 +1,470 @@
+"""
+Modo de servicio asíncrono (ASGI) del conversor.
+
+    python -m tucambio.asgi              # uvicorn con WEB_CONCURRENCY procesos en $PORT
+    python -m tucambio serve --asgi      # gunicorn con workers de uvicorn y la app precargada
+    uvicorn tucambio.asgi:app --port 8000
+
+Sirve /convertir, /historial, /health, /metrics y /tasas/stream desde un bucle de eventos, así que
+un solo núcleo sostiene muchas peticiones a la vez aunque el proveedor vaya lento: las
+peticiones solo leen la tabla de tasas en memoria; la tabla la refresca una tarea que usa
+el cliente HTTP asíncrono del proveedor; y SQLite se usa desde hilos (asyncio.to_thread)
+o a través de la cola del escritor del historial, nunca desde el propio bucle. Cada flujo
+de /tasas/stream es una corrutina dormida, así que miles de ellos no ocupan ningún hilo.
+
+El resto de la aplicación (la página de la interfaz TUCAMBIO_FRONTEND, /activos/, /sw.js,
+/tasas.json, /convertir/lote, /matriz, /estadisticas, /tasas/historico, /historial/export...)
+lo atiende la misma app Flask de wsgi.py en un pool de HILOS_WSGI hilos.
+"""
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from . import conversion, database, escritor_historial, eventos, historial_reciente, metricas, proveedor, retencion, tasas
+from .conversion import MONEDAS, MONEDA_IDX, CODIGOS_MONEDAS, MONEDAS_SIN_DECIMALES, validar_conversion
+
+MAX_CUERPO = 64 * 1024  # bytes como máximo en el cuerpo de /convertir
+MAX_CUERPO_WSGI = 16 * 1024 * 1024  # bytes como máximo en el cuerpo de las rutas de Flask (/convertir/lote)
+HILOS_WSGI = int(os.environ.get("TUCAMBIO_HILOS", 4))  # hilos por proceso para las rutas de Flask
+FRONTEND = os.environ.get("TUCAMBIO_FRONTEND", "clasico")
+
+# Cliente del proveedor usado por la tarea de refresco (httpx.AsyncClient); sustituible en pruebas
+PROVEEDOR = None
+
+_bucle = None
+_cambio = None  # asyncio.Event que se dispara (y se sustituye) en cada publicación de tasas
+_arranque = None
+_tarea_refresco = None
+_app_wsgi = None  # app Flask (wsgi.crear_app) de las rutas que no son nativas
+_pool_wsgi = None
+
+
+def configurar_proveedor(nuevo):
+    """Sustituye el proveedor asíncrono de tasas (p. ej. por un proveedor.ProveedorFalso)."""
+    global PROVEEDOR
+    PROVEEDOR = nuevo
+
+
+def _tabla():
+    return tasas.TASAS_CACHE.get(tasas.MONEDA_PIVOTE)
+
+
+# --- AVISOS DE CAMBIO DE TASAS ---
+def _avisar():
+    global _cambio
+    anterior, _cambio = _cambio, asyncio.Event()
+    anterior.set()
+
+
+def _al_publicar():
+    """Llamado por tasas._publicar desde cualquier hilo: despierta a las corrutinas que esperan tasas."""
+    if _bucle is not None and not _bucle.is_closed():
+        _bucle.call_soon_threadsafe(_avisar)
+
+
+async def _esperar_cambio(version, timeout):
+    """Espera sin bloquear el bucle a que la tabla tenga una versión distinta de `version`; devuelve la vigente."""
+    limite = _bucle.time() + timeout
+    while True:
+        tabla = _tabla()
+        resto = limite - _bucle.time()
+        if (tabla is not None and tabla["version"] != version) or resto <= 0:
+            return tabla
+        try:
+            await asyncio.wait_for(_cambio.wait(), resto)
+        except asyncio.TimeoutError:
+            pass
+
+
+# --- REFRESCO DE TASAS ---
+async def _sincronizar(base=tasas.MONEDA_PIVOTE):
+    """
+    Versión asíncrona de tasas._sincronizar: adopta la tabla fresca del almacén compartido o, con el turno de escritor, la descarga con el cliente asíncrono y la publica. Devuelve True si la memoria queda con una tabla fresca.
+    """
+    escritor = str(os.getpid())
+    try:
+        adoptada, _ = await asyncio.to_thread(tasas.adoptar_si_fresca, CODIGOS_MONEDAS, base)
+        if adoptada:
+            return True
+        turno = await asyncio.to_thread(database.tomar_turno_tasas, base, escritor, tasas.TURNO_ESCRITOR)
+    except database.Error as e:
+        print(f"Error del almacén de tasas: {e}")
+        turno = True
+
+    if not turno:
+        # Otro proceso está descargando: esperar (acotado) a que publique
+        limite = _bucle.time() + tasas.ESPERA_MAXIMA
+        while _bucle.time() < limite:
+            await asyncio.sleep(0.2)
+            adoptada, _ = await asyncio.to_thread(tasas.adoptar_si_fresca, CODIGOS_MONEDAS, base)
+            if adoptada:
+                return True
+        return False
+
+    inicio = time.perf_counter()
+    try:
+        rates = await PROVEEDOR.descargar_async(base)
+    except Exception:
+        tasas.registrar_descarga(base, inicio, error=True)
+        await asyncio.to_thread(database.liberar_turno_tasas, base, escritor)
+        raise
+    tasas.registrar_descarga(base, inicio)
+    await asyncio.to_thread(tasas.publicar_descarga, CODIGOS_MONEDAS, base, rates, escritor)
+    return True
+
+
+async def _bucle_refresco():
+    """Mantiene fresca la tabla de tasas, refrescándola antes de que caduque (como tasas._bucle_refresco)."""
+    while True:
+        tabla = _tabla()
+        if tabla is None or tasas.edad_tabla(tabla) >= tasas.CACHE_TTL - tasas.REFRESCO_ANTICIPADO:
+            try:
+                ok = await _sincronizar()
+            except Exception as e:
+                print(f"Error de API: {e}")
+                ok = False
+            if not ok:
+                await asyncio.sleep(tasas.REINTENTO_ERROR)
+                continue
+            tabla = _tabla()
+        await asyncio.sleep(max(1, tasas.CACHE_TTL - tasas.REFRESCO_ANTICIPADO - tasas.edad_tabla(tabla)))
+
+
+# --- ARRANQUE Y PARADA ---
+async def _arrancar():
+    """Prepara la base de datos, la última tabla conocida, el escritor del historial y la tarea de refresco."""
+    global _bucle, _cambio, _tarea_refresco, _pool_wsgi, PROVEEDOR
+    _bucle = asyncio.get_running_loop()
+    _cambio = asyncio.Event()
+    tasas.al_publicar(_al_publicar)
+    if _app_wsgi is None:
+        await asyncio.to_thread(montar_frontend)
+    await asyncio.to_thread(database.init_db)
+    _pool_wsgi = concurrent.futures.ThreadPoolExecutor(HILOS_WSGI, thread_name_prefix="wsgi")
+    escritor_historial.iniciar()
+    retencion.iniciar()
+    await asyncio.to_thread(tasas.calentar, CODIGOS_MONEDAS)
+    if PROVEEDOR is None:
+        PROVEEDOR = proveedor.ProveedorERAsync()
+    _tarea_refresco = asyncio.create_task(_bucle_refresco())
+
+
+async def _parar():
+    if _tarea_refresco is not None:
+        _tarea_refresco.cancel()
+    if PROVEEDOR is not None:
+        await PROVEEDOR.cerrar()
+    retencion.detener()
+    await asyncio.to_thread(escritor_historial.detener)
+    if _pool_wsgi is not None:
+        _pool_wsgi.shutdown(wait=False)
+
+
+async def _asegurar_arranque():
+    """Arranca una sola vez aunque el servidor no envíe el evento lifespan."""
+    global _arranque
+    if _arranque is None:
+        _arranque = asyncio.ensure_future(_arrancar())
+    await _arranque
+
+
+# --- RESPUESTAS ---
+async def _responder(send, estado, cuerpo, tipo="application/json", cabeceras=()):
+    await send({
+        "type": "http.response.start",
+        "status": estado,
+        "headers": [(b"content-type", tipo.encode()), (b"content-length", str(len(cuerpo)).encode()), *cabeceras],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def _json(send, datos, estado=200):
+    await _responder(send, estado, json.dumps(datos).encode())
+
+
+async def _leer_cuerpo(receive, limite=MAX_CUERPO):
+    """Cuerpo completo de la petición, o None si supera `limite` bytes."""
+    partes, tamano = [], 0
+    while True:
+        mensaje = await receive()
+        parte = mensaje.get("body", b"")
+        tamano += len(parte)
+        if tamano > limite:
+            return None
+        partes.append(parte)
+        if not mensaje.get("more_body"):
+            return b"".join(partes)
+
+
+# --- RUTAS ---
+async def convertir(scope, receive, send):
+    cuerpo = await _leer_cuerpo(receive)
+    if cuerpo is None:
+        return await _json(send, {"error": "Petición demasiado grande."}, 413)
+    try:
+        data = json.loads(cuerpo)
+    except ValueError:
+        data = None
+    cantidad, moneda_origen, moneda_destino, error = validar_conversion(data)
+    if error:
+        return await _json(send, {"error": error}, 400)
+
+    tabla = _tabla()
+    tasas.contar_lectura(tabla)
+    if tabla is None:
+        # Arranque en frío: esperar (acotado) a la primera descarga de la tarea de refresco
+        tabla = await _esperar_cambio(None, tasas.ESPERA_MAXIMA)
+    respuesta, fila = conversion.convertir(cantidad, moneda_origen, moneda_destino, tabla) if tabla else (None, None)
+    if respuesta is None:
+        return await _json(send, {"error": "No se pudo obtener la tasa de cambio."}, 500)
+
+    try:
+        if not escritor_historial.intentar_encolar(*fila):
+            # Cola llena: que espere (o escriba en el acto) un hilo, no el bucle
+            await asyncio.to_thread(escritor_historial.encolar_conversion, *fila)
+    except Exception as e:
+        print(f"Error guardando historial: {e}")
+    await _json(send, respuesta)
+
+
+def _historial_reciente(limite=5):
+    """Las conversiones recientes con banderas (desde memoria, con lo recién encolado incluido)."""
+    return historial_reciente.obtener(limite)
+
+
+def _pagina_historial(args):
+    campos = args.get("campos")
+    return database.obtener_pagina_historial(
+        limite=args.get("limite", 20),
+        before_id=args.get("before_id"),
+        moneda_origen=args.get("origen"),
+        moneda_destino=args.get("destino"),
+        columnas=campos.split(",") if campos else database.COLUMNAS_HISTORIAL,
+        presentar=conversion.presentar_fila,
+    )
+
+
+async def historial(scope, receive, send):
+    """Mismo contrato que /historial en web.py: sin parámetros, lo reciente con banderas; con ellos, una página por cursor."""
+    args = {clave: valores[0] for clave, valores in parse_qs(scope["query_string"].decode()).items()}
+    if not args:
+        return await _json(send, await asyncio.to_thread(_historial_reciente))
+    if any(m and m not in MONEDA_IDX for m in (args.get("origen"), args.get("destino"))):
+        return await _json(send, {"error": "Moneda no válida."}, 400)
+    try:
+        filas, siguiente = await asyncio.to_thread(_pagina_historial, args)
+    except ValueError:
+        return await _json(send, {"error": "Parámetros no válidos."}, 400)
+    await _json(send, {"historial": filas, "before_id": siguiente})
+
+
+async def _flujo_tasas(send):
+    """Como eventos.flujo_tasas, pero cada conexión es una corrutina que espera el aviso de cambio."""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+    })
+
+    async def enviar(texto):
+        await send({"type": "http.response.body", "body": texto.encode(), "more_body": True})
+
+    await enviar(f"retry: {eventos.REINTENTO_MS}\n\n")
+    tabla = _tabla()
+    while tabla is None:
+        await enviar(": esperando tasas\n\n")
+        tabla = await _esperar_cambio(None, eventos.LATIDO)
+    await enviar(eventos.evento("tasas", tasas.instantanea_json(tabla, MONEDAS, MONEDAS_SIN_DECIMALES)))
+    while True:
+        nueva = await _esperar_cambio(tabla["version"], eventos.LATIDO)
+        if nueva["version"] == tabla["version"]:
+            await enviar(": latido\n\n")
+            continue
+        await enviar(eventos.evento_diff(tabla, nueva, CODIGOS_MONEDAS))
+        tabla = nueva
+
+
+async def tasas_stream(scope, receive, send):
+    """Mantiene el flujo SSE hasta que el cliente se desconecta."""
+    eventos.anotar_flujo(1)
+    flujo = asyncio.ensure_future(_flujo_tasas(send))
+
+    async def vigilar():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    vigia = asyncio.ensure_future(vigilar())
+    try:
+        await asyncio.wait({flujo, vigia}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        flujo.cancel()
+        vigia.cancel()
+        eventos.anotar_flujo(-1)
+
+
+# --- RESTO DE RUTAS: LA APP FLASK EN HILOS ---
+# Cada trozo de la respuesta se entrega al bucle y el hilo espera a que se haya enviado,
+# así que una exportación larga avanza al ritmo del cliente en lugar de acumularse en
+# memoria; y el iterable de la respuesta se cierra siempre, como en un servidor WSGI.
+def montar_frontend(frontend=None):
+    """
+    Crea la app Flask de la interfaz `frontend` (por defecto TUCAMBIO_FRONTEND) que atiende las rutas que no son nativas. servidor.servir la monta en el maestro antes del fork; si no, se monta al arrancar.
+    """
+    global _app_wsgi
+    from .wsgi import crear_app
+
+    # Sin sus hilos de fondo: el refresco de tasas, el escritor y la retención los arranca _arrancar
+    _app_wsgi = crear_app(frontend or FRONTEND, servicios=False)
+    return _app_wsgi
+
+
+def _entorno_wsgi(scope, cuerpo):
+    """Entorno WSGI de una petición ASGI con su cuerpo ya leído."""
+    servidor = scope.get("server") or ("localhost", 80)
+    entorno = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(cuerpo),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        entorno["REMOTE_ADDR"] = scope["client"][0]
+    for nombre, valor in scope.get("headers", []):
+        clave = nombre.decode("latin-1").upper().replace("-", "_")
+        if clave not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            clave = "HTTP_" + clave
+        valor = valor.decode("latin-1")
+        entorno[clave] = f"{entorno[clave]},{valor}" if clave in entorno else valor
+    return entorno
+
+
+def _servir_wsgi(entorno, send, bucle):
+    """Atiende en un hilo del pool una petición con la app Flask, enviando cada trozo por el bucle."""
+    inicio = {}
+
+    def enviar(mensaje):
+        asyncio.run_coroutine_threadsafe(send(mensaje), bucle).result()
+
+    def start_response(estado, cabeceras, exc_info=None):
+        inicio["mensaje"] = {
+            "type": "http.response.start",
+            "status": int(estado.split(" ", 1)[0]),
+            "headers": [(nombre.lower().encode("latin-1"), valor.encode("latin-1")) for nombre, valor in cabeceras],
+        }
+
+    def empezar():
+        if "mensaje" in inicio:
+            enviar(inicio.pop("mensaje"))
+
+    respuesta = _app_wsgi(entorno, start_response)
+    try:
+        for trozo in respuesta:
+            if trozo:
+                empezar()
+                enviar({"type": "http.response.body", "body": trozo, "more_body": True})
+        empezar()
+        enviar({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        if hasattr(respuesta, "close"):
+            respuesta.close()
+
+
+async def servir_wsgi(scope, receive, send):
+    """Pasa la petición a la app Flask en el pool de hilos, sin bloquear el bucle."""
+    cuerpo = await _leer_cuerpo(receive, MAX_CUERPO_WSGI)
+    if cuerpo is None:
+        return await _json(send, {"error": "Petición demasiado grande."}, 413)
+    await _bucle.run_in_executor(_pool_wsgi, _servir_wsgi, _entorno_wsgi(scope, cuerpo), send, _bucle)
+
+
+async def _lifespan(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje["type"] == "lifespan.startup":
+            try:
+                await _asegurar_arranque()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif mensaje["type"] == "lifespan.shutdown":
+            await _parar()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def health(scope, receive, send):
+    await _responder(send, 200, b"OK", "text/html; charset=utf-8")
+
+
+async def metrics(scope, receive, send):
+    await _responder(send, 200, metricas.exponer().encode(), metricas.TIPO_CONTENIDO)
+
+
+# Rutas nativas (método, ruta): el resto va a la app Flask, que también mide las suyas
+RUTAS = {
+    ("POST", "/convertir"): convertir,
+    ("GET", "/historial"): historial,
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): metrics,
+    ("GET", "/tasas/stream"): tasas_stream,
+}
+
+
+async def app(scope, receive, send):
+    """Aplicación ASGI."""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    await _asegurar_arranque()
+    ruta, metodo = scope["path"], scope["method"]
+    atender = RUTAS.get((metodo, ruta))
+    if atender is None:
+        return await servir_wsgi(scope, receive, send)
+    inicio = time.perf_counter()
+    estado = 500
+
+    async def enviar(mensaje):
+        nonlocal estado
+        if mensaje["type"] == "http.response.start":
+            estado = mensaje["status"]
+            if ruta == "/tasas/stream":
+                # Como en wsgi.py, en el flujo SSE se mide hasta que empieza
+                metricas.observar_peticion(ruta, metodo, estado, inicio)
+        await send(mensaje)
+
+    try:
+        await atender(scope, receive, enviar)
+    except Exception as e:
+        print(f"Error en {ruta}: {e}")
+        await _json(enviar, {"error": "Error interno del servidor."}, 500)
+    if ruta != "/tasas/stream":
+        metricas.observar_peticion(ruta, metodo, estado, inicio)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "tucambio.asgi:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 5000)),
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        lifespan="on",
+        proxy_headers=True,
+    )
@@ -0,0 +1,150 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from . import tasas
+
+# --- MONEDAS Y CONVERSIÓN ---
+# Registro de monedas y cálculo de una conversión sin depender del framework web,
+# compartido por la app Flask (wsgi.py), la asíncrona (asgi.py) y todas las interfaces.
+MONEDAS = [
+    {"codigo": "EUR", "nombre": "Euro", "bandera": "https://flagcdn.com/eu.svg"},
+    {"codigo": "USD", "nombre": "Dólar estadounidense", "bandera": "https://flagcdn.com/us.svg"},
+    {"codigo": "VES", "nombre": "Bolívar venezolano", "bandera": "https://flagcdn.com/ve.svg"},
+    {"codigo": "PYG", "nombre": "Guaraní paraguayo", "bandera": "https://flagcdn.com/py.svg"},
+    {"codigo": "ARS", "nombre": "Peso argentino", "bandera": "https://flagcdn.com/ar.svg"},
+    {"codigo": "MXN", "nombre": "Peso mexicano", "bandera": "https://flagcdn.com/mx.svg"},
+    {"codigo": "CLP", "nombre": "Peso chileno", "bandera": "https://flagcdn.com/cl.svg"},
+    {"codigo": "COP", "nombre": "Peso colombiano", "bandera": "https://flagcdn.com/co.svg"},
+    {"codigo": "BRL", "nombre": "Real brasileño", "bandera": "https://flagcdn.com/br.svg"},
+    {"codigo": "GBP", "nombre": "Libra esterlina", "bandera": "https://flagcdn.com/gb.svg"},
+    {"codigo": "JPY", "nombre": "Yen japonés", "bandera": "https://flagcdn.com/jp.svg"},
+    {"codigo": "CAD", "nombre": "Dólar canadiense", "bandera": "https://flagcdn.com/ca.svg"},
+    {"codigo": "AUD", "nombre": "Dólar australiano", "bandera": "https://flagcdn.com/au.svg"},
+    {"codigo": "CHF", "nombre": "Franco suizo", "bandera": "https://flagcdn.com/ch.svg"},
+    {"codigo": "CNY", "nombre": "Yuan chino", "bandera": "https://flagcdn.com/cn.svg"},
+    {"codigo": "SEK", "nombre": "Corona sueca", "bandera": "https://flagcdn.com/se.svg"},
+]
+
+MONEDA_IDX = {m["codigo"]: m for m in MONEDAS}
+
+CODIGOS_MONEDAS = [m["codigo"] for m in MONEDAS]
+
+MONEDAS_SIN_DECIMALES = ("PYG", "VES", "JPY")
+
+
+# Decimales de cada moneda. Los importes del historial se guardan como enteros en
+# unidades mínimas (céntimos, o unidades enteras en las monedas sin decimales) y solo se
+# formatean al mostrarlos, con un formateador por moneda creado una sola vez.
+# Las cantidades que entran se redondean a la unidad mínima de su moneda (1.005 USD ->
+# 1.01, 12.5 JPY -> 13) y se convierten ya redondeadas, así que lo guardado es
+# exactamente lo que se convirtió; todo se redondea en decimal y siempre con REDONDEO
+# (también al migrar las bases antiguas, ver database.migrar_importes, y en el
+# navegador, ver static/conversor.js).
+DECIMALES = {m["codigo"]: 0 if m["codigo"] in MONEDAS_SIN_DECIMALES else 2 for m in MONEDAS}
+_FACTORES = {codigo: 10 ** decimales for codigo, decimales in DECIMALES.items()}
+REDONDEO = ROUND_HALF_UP
+CANTIDAD_MAXIMA = 10 ** 12  # así los importes en unidades mínimas caben de sobra en un INTEGER de SQLite
+
+
+def _formateador(decimales, nombre):
+    """Función que formatea un entero no negativo de unidades mínimas como "1,234.56 Euro" (exacto, sin pasar por float)."""
+    if decimales == 0:
+        return lambda unidades: f"{unidades:,} {nombre}"
+    factor = 10 ** decimales
+    return lambda unidades: f"{unidades // factor:,}.{unidades % factor:0{decimales}d} {nombre}"
+
+
+FORMATEADORES = {m["codigo"]: _formateador(DECIMALES[m["codigo"]], m["nombre"]) for m in MONEDAS}
+
+
+def _decimal(valor):
+    """`valor` (Decimal, texto o número) como Decimal; un float, por su representación más corta."""
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def a_unidades(moneda_codigo, valor):
+    """`valor` en unidades mínimas de la moneda, como entero (redondeado con REDONDEO)."""
+    return int((_decimal(valor) * _FACTORES.get(moneda_codigo, 100)).to_integral_value(rounding=REDONDEO))
+
+
+def resultado_unidades(moneda_destino, cantidad, tasa):
+    """`cantidad` × `tasa` en unidades mínimas de `moneda_destino`, multiplicado en decimal."""
+    return a_unidades(moneda_destino, _decimal(cantidad) * _decimal(tasa))
+
+
+def desde_unidades(moneda_codigo, unidades):
+    """El número (float) que representan `unidades` mínimas de la moneda."""
+    return unidades / _FACTORES.get(moneda_codigo, 100)
+
+
+def formatear_importe(moneda_codigo, unidades):
+    """Texto para mostrar de un importe en unidades mínimas, con el nombre de la moneda."""
+    formateador = FORMATEADORES.get(moneda_codigo)
+    if formateador is None:
+        formateador = FORMATEADORES[moneda_codigo] = _formateador(2, moneda_codigo)
+    return formateador(unidades)
+
+
+def presentar_fila(fila):
+    """
+    Fila del historial tal como se guarda (id, cantidad en unidades mínimas, origen, destino, resultado en unidades mínimas, tasa, fecha) a como se muestra: la cantidad como número y el resultado como texto, p. ej. "1,234.56 Euro".
+    """
+    id_, cantidad, moneda_origen, moneda_destino, resultado, tasa, fecha = fila
+    return (
+        id_, desde_unidades(moneda_origen, cantidad), moneda_origen, moneda_destino,
+        formatear_importe(moneda_destino, resultado), tasa, fecha,
+    )
+
+
+def validar_conversion(data):
+    """Valida una petición de conversión. Devuelve (cantidad, moneda_origen, moneda_destino, error)."""
+    if not isinstance(data, dict):
+        return None, None, None, "Faltan parámetros."
+    cantidad_raw = data.get("cantidad")
+    moneda_origen = data.get("moneda_origen")
+    moneda_destino = data.get("moneda_destino")
+
+    if not all([cantidad_raw, moneda_origen, moneda_destino]):
+        return None, None, None, "Faltan parámetros."
+    if moneda_origen not in MONEDA_IDX or moneda_destino not in MONEDA_IDX:
+        return None, None, None, "Moneda no válida."
+    cantidad, error = leer_cantidad(cantidad_raw, moneda_origen)
+    if error:
+        return None, None, None, error
+    return cantidad, moneda_origen, moneda_destino, None
+
+
+def leer_cantidad(cantidad_raw, moneda):
+    """
+    Valida una cantidad de `moneda`: un número finito, no mayor que CANTIDAD_MAXIMA y mayor que cero una vez redondeado a la unidad mínima de la moneda. Devuelve (cantidad redondeada como Decimal, error).
+    """
+    try:
+        valor = Decimal(str(cantidad_raw).strip())
+    except (TypeError, ValueError, InvalidOperation):
+        return None, "Cantidad no válida."
+    if not valor.is_finite():
+        return None, "Cantidad no válida."
+    if valor > CANTIDAD_MAXIMA:
+        return None, f"La cantidad no puede ser mayor que {CANTIDAD_MAXIMA:,}."
+    valor = valor.quantize(Decimal(1).scaleb(-DECIMALES.get(moneda, 2)), rounding=REDONDEO)
+    if valor <= 0:
+        return None, "La cantidad debe ser mayor que cero."
+    return valor, None
+
+
+def convertir(cantidad, moneda_origen, moneda_destino, tabla):
+    """
+    Convierte con una tabla de tasas ya en memoria. Devuelve (respuesta para el cliente, fila para el historial con los importes en unidades mínimas), o (None, None) si la tabla no tiene tasa para el par.
+    """
+    tasa = tasas.tasa_cruzada(tabla, moneda_origen, moneda_destino)
+    if tasa is None:
+        return None, None
+    edad_tasa = tasas.edad_tabla(tabla)
+    resultado = resultado_unidades(moneda_destino, cantidad, tasa)
+    respuesta = {
+        "cantidad": float(cantidad),
+        "resultado": formatear_importe(moneda_destino, resultado),
+        "tasa": f"{float(tasa):,.6f}",
+        "edad_tasa": int(edad_tasa),
+        "tasa_antigua": edad_tasa >= tasas.CACHE_TTL,
+    }
+    return respuesta, (a_unidades(moneda_origen, cantidad), moneda_origen, moneda_destino, resultado, float(tasa))
@@ -0,0 +1,659 @@
+import calendar
+import itertools
+import json
+import os
+import threading
+import time
+
+from . import metricas
+
+DB_PATH = os.environ.get('TUCAMBIO_DB', 'historial.db')
+
+# --- CONEXIONES ---
+# Una conexión por hilo (y por proceso, para sobrevivir a un fork) que se reutiliza
+# entre peticiones. WAL permite lectores concurrentes con un escritor, y con
+# synchronous=NORMAL el commit no hace fsync salvo en los checkpoints.
+PRAGMAS = (
+    # Antes que WAL, que escribe la cabecera: solo tiene efecto en una base nueva; en una
+    # existente hace falta un VACUUM completo (python -m tucambio retencion --vacuum-completo)
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",  # 8 MB de caché de páginas
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+_local = threading.local()
+# Conexiones abiertas antes de un fork: el hijo no debe usarlas ni cerrarlas, así que se guardan aquí
+_heredadas = []
+
+def obtener_conexion():
+    """Devuelve la conexión del hilo actual, creándola con los pragmas ajustados si hace falta."""
+    clave = (os.getpid(), DB_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.clave != clave:
+        import sqlite3
+
+        # sqlite3 guarda las sentencias ya compiladas por conexión (cached_statements)
+        conn = sqlite3.connect(DB_PATH, timeout=5, cached_statements=64)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        _local.clave = clave
+    return conn
+
+def _tras_fork():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _heredadas.append(conn)
+        _local.conn = None
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+def __getattr__(nombre):
+    """`database.Error` es sqlite3.Error, sin importar sqlite3 hasta que se use."""
+    if nombre == "Error":
+        import sqlite3
+
+        return sqlite3.Error
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+def cerrar_conexion():
+    """Cierra la conexión del hilo actual (p. ej. al terminar un hilo de trabajo)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+# --- HISTORIAL ---
+# Los importes se guardan como enteros en unidades mínimas de su moneda (cantidad en la de
+# origen, resultado en la de destino): las sumas son exactas y el texto para mostrar lo
+# genera conversion.presentar_fila al leer.
+SQL_CREAR_HISTORIAL = '''
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cantidad_unidades INTEGER NOT NULL,
+        moneda_origen TEXT NOT NULL,
+        moneda_destino TEXT NOT NULL,
+        resultado_unidades INTEGER NOT NULL,
+        tasa REAL NOT NULL,
+        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+SQL_INSERTAR_CONVERSION = '''
+    INSERT INTO historial (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa)
+    VALUES (?, ?, ?, ?, ?)
+'''
+# Con la fecha que ya muestra el búfer de recientes, para que coincida con la guardada
+SQL_INSERTAR_CONVERSION_CON_FECHA = '''
+    INSERT INTO historial (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_HISTORIAL = 'SELECT * FROM historial ORDER BY fecha DESC, id DESC LIMIT ?'
+# Columnas de las páginas de /historial, ya presentadas (cantidad como número, resultado como texto)
+COLUMNAS_HISTORIAL = ("id", "cantidad", "moneda_origen", "moneda_destino", "resultado", "tasa", "fecha")
+MAX_PAGINA = 100
+# Periodos de los acumulados de volumen: nombre -> segundos (UTC)
+PERIODOS_VOLUMEN = {"hora": 3600, "dia": 86400}
+_SUMAR_VOLUMEN = '''
+    ON CONFLICT(periodo, inicio, moneda_origen, moneda_destino) DO UPDATE SET
+        conversiones = conversiones + excluded.conversiones,
+        suma_cantidad = suma_cantidad + excluded.suma_cantidad,
+        suma_resultado = suma_resultado + excluded.suma_resultado,
+        suma_tasa = suma_tasa + excluded.suma_tasa
+'''
+SQL_ACUMULAR_VOLUMEN = '''
+    INSERT INTO volumen (periodo, inicio, moneda_origen, moneda_destino, conversiones, suma_cantidad, suma_resultado, suma_tasa)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+''' + _SUMAR_VOLUMEN
+# Duración de cada operación del historial, para /metrics
+_DURACION = {
+    operacion: metricas.histograma("tucambio_db_segundos", "Duración de las operaciones del historial en SQLite.", operacion=operacion)
+    for operacion in ("insertar", "insertar_lote", "consultar", "consultar_nuevas", "consultar_pagina", "consultar_serie", "consultar_volumen")
+}
+
+def _crear_indices_historial(conn):
+    # Índices para ordenar por fecha y filtrar por par sin recorrer toda la tabla
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial (fecha)')
+    conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_historial_par_fecha ON historial (moneda_origen, moneda_destino, fecha)'
+    )
+
+def init_db():
+    """Inicializa la base de datos de historial."""
+    migrar_importes()
+    conn = obtener_conexion()
+    with conn:
+        conn.execute(SQL_CREAR_HISTORIAL.format(tabla="historial"))
+        _crear_indices_historial(conn)
+    init_volumen()
+    init_retencion()
+    init_tasas()
+
+def guardar_conversion(cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha=None):
+    """
+    Guarda una conversión en la base de datos (importes en unidades mínimas), con `fecha` ('AAAA-MM-DD HH:MM:SS' UTC) o la de ahora. Devuelve su id.
+    """
+    inicio = time.perf_counter()
+    fila = (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa)
+    conn = obtener_conexion()
+    with conn:
+        if fecha is None:
+            id_ = conn.execute(SQL_INSERTAR_CONVERSION, fila).lastrowid
+        else:
+            id_ = conn.execute(SQL_INSERTAR_CONVERSION_CON_FECHA, fila + (fecha,)).lastrowid
+        _acumular_volumen(conn, (fila,), None if fecha is None else (fecha,))
+    _DURACION["insertar"].desde(inicio)
+    return id_
+
+def guardar_conversiones(filas, fechas=None):
+    """
+    Guarda varias conversiones (cantidad, origen, destino, resultado, tasa), importes en unidades mínimas, en una sola transacción, con sus `fechas` o la de ahora. Devuelve sus ids, en el mismo orden.
+    """
+    inicio = time.perf_counter()
+    conn = obtener_conexion()
+    with conn:
+        if fechas is None:
+            conn.executemany(SQL_INSERTAR_CONVERSION, filas)
+        else:
+            conn.executemany(SQL_INSERTAR_CONVERSION_CON_FECHA, [tuple(fila) + (fecha,) for fila, fecha in zip(filas, fechas)])
+        # Dentro de la transacción nadie más escribe y AUTOINCREMENT da ids seguidos
+        ultimo = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        _acumular_volumen(conn, filas, fechas)
+    _DURACION["insertar_lote"].desde(inicio)
+    return range(ultimo - len(filas) + 1, ultimo + 1)
+
+def obtener_historial(limite=10):
+    """Obtiene el historial de conversiones."""
+    inicio = time.perf_counter()
+    filas = obtener_conexion().execute(SQL_HISTORIAL, (limite,)).fetchall()
+    _DURACION["consultar"].desde(inicio)
+    return filas
+
+def obtener_historial_desde(ultimo_id, limite):
+    """Las `limite` filas más recientes con id mayor que `ultimo_id`, en orden ascendente de id."""
+    inicio = time.perf_counter()
+    filas = obtener_conexion().execute(
+        'SELECT * FROM (SELECT * FROM historial WHERE id > ? ORDER BY id DESC LIMIT ?) ORDER BY id',
+        (ultimo_id, limite),
+    ).fetchall()
+    _DURACION["consultar_nuevas"].desde(inicio)
+    return filas
+
+def obtener_pagina_historial(
+    limite=20, before_id=None, moneda_origen=None, moneda_destino=None, columnas=COLUMNAS_HISTORIAL, presentar=None
+):
+    """
+    Página del historial (más recientes primero) con paginación por cursor: `before_id` es el id de la última fila de la página anterior, así que cada página cuesta lo mismo esté donde esté. Cada fila pasa por `presentar` (p. ej. conversion.presentar_fila) antes de quedarse con `columnas`. Devuelve (filas como dicts, before_id de la página siguiente o None).
+    """
+    columnas = tuple(columnas)
+    if not columnas or any(c not in COLUMNAS_HISTORIAL for c in columnas):
+        raise ValueError("Columnas no válidas.")
+    limite = max(1, min(int(limite), MAX_PAGINA))
+    condiciones = []
+    parametros = []
+    if moneda_origen:
+        condiciones.append("moneda_origen = ?")
+        parametros.append(moneda_origen)
+    if moneda_destino:
+        condiciones.append("moneda_destino = ?")
+        parametros.append(moneda_destino)
+    if before_id is not None:
+        condiciones.append("(fecha, id) < (SELECT fecha, id FROM historial WHERE id = ?)")
+        parametros.append(int(before_id))
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"SELECT * FROM historial {where} ORDER BY fecha DESC, id DESC LIMIT ?"
+    inicio = time.perf_counter()
+    filas = obtener_conexion().execute(sql, parametros + [limite]).fetchall()
+    _DURACION["consultar_pagina"].desde(inicio)
+    posiciones = [COLUMNAS_HISTORIAL.index(c) for c in columnas]
+    presentadas = map(presentar, filas) if presentar else filas
+    pagina = [dict(zip(columnas, [fila[i] for i in posiciones])) for fila in presentadas]
+    siguiente = filas[-1][0] if len(filas) == limite else None
+    return pagina, siguiente
+
+def iterar_historial(moneda_origen=None, moneda_destino=None, desde=None, hasta=None, tamano=5000, fecha_unix=False):
+    """
+    Recorre el historial en orden de id con una conexión de solo lectura propia y un único cursor leído con fetchmany: genera listas de como mucho `tamano` filas (id, cantidad, origen, destino, resultado, tasa, fecha) con los importes en unidades mínimas, así que la memoria no depende del tamaño de la tabla. `desde` y `hasta` son fechas 'AAAA-MM-DD HH:MM:SS' (UTC); con `fecha_unix` la fecha sale como timestamp entero.
+    """
+    import sqlite3
+    from urllib.parse import quote
+
+    condiciones = []
+    parametros = []
+    if moneda_origen:
+        condiciones.append("moneda_origen = ?")
+        parametros.append(moneda_origen)
+    if moneda_destino:
+        condiciones.append("moneda_destino = ?")
+        parametros.append(moneda_destino)
+    # Las fechas se traducen también a un tramo de ids (con el índice de fecha) para que
+    # SQLite recorra solo ese tramo por rowid, ya en orden y sin ordenar nada en memoria
+    if desde is not None:
+        condiciones.append("id >= (SELECT MIN(id) FROM historial WHERE fecha >= ?) AND fecha >= ?")
+        parametros += [desde, desde]
+    if hasta is not None:
+        condiciones.append("id <= (SELECT MAX(id) FROM historial WHERE fecha <= ?) AND fecha <= ?")
+        parametros += [hasta, hasta]
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    fecha = "CAST(strftime('%s', fecha) AS INTEGER)" if fecha_unix else "fecha"
+    sql = (
+        f"SELECT id, cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, {fecha} "
+        f"FROM historial NOT INDEXED {where} ORDER BY id"
+    )
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(DB_PATH))}?mode=ro", uri=True, timeout=5)
+    try:
+        conn.execute("PRAGMA busy_timeout=5000")
+        cursor = conn.execute(sql, parametros)
+        while True:
+            filas = cursor.fetchmany(tamano)
+            if not filas:
+                return
+            yield filas
+    finally:
+        conn.close()
+
+# --- ACUMULADOS DE VOLUMEN ---
+# Conversiones, cantidad, resultado (en unidades mínimas) y suma de tasas por par y por hora/día, que se
+# actualizan en la misma transacción que inserta las conversiones, cada una en la hora y el
+# día de su fecha (agregadas primero por par y periodo, así que un lote del escritor
+# cuesta dos upserts por par, no por fila, salvo si cruza una hora). Las filas
+# que ya había cuando se crearon los acumulados (hasta `pendiente_hasta`) las suma
+# `rellenar_volumen` por tramos de id, guardando en `relleno_hasta` por dónde va.
+SQL_CREAR_VOLUMEN = '''
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        periodo TEXT NOT NULL,
+        inicio INTEGER NOT NULL,
+        moneda_origen TEXT NOT NULL,
+        moneda_destino TEXT NOT NULL,
+        conversiones INTEGER NOT NULL,
+        suma_cantidad INTEGER NOT NULL,
+        suma_resultado INTEGER NOT NULL,
+        suma_tasa REAL NOT NULL,
+        PRIMARY KEY (periodo, inicio, moneda_origen, moneda_destino)
+    ) WITHOUT ROWID
+'''
+
+def init_volumen():
+    """Crea las tablas de acumulados si no existen y anota qué filas anteriores quedan por sumar."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS volumen_estado (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                pendiente_hasta INTEGER NOT NULL,
+                relleno_hasta INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Primero el estado: quien escriba conversiones después ya las acumula él mismo
+        conn.execute(
+            'INSERT OR IGNORE INTO volumen_estado (id, pendiente_hasta) SELECT 1, IFNULL(MAX(id), 0) FROM historial'
+        )
+        conn.execute(SQL_CREAR_VOLUMEN.format(tabla="volumen"))
+
+def _acumular_volumen(conn, filas, fechas=None):
+    """
+    Suma las conversiones `filas` a los acumulados de la hora y el día de su fecha (de `fechas`, 'AAAA-MM-DD HH:MM:SS' UTC, o la de ahora), dentro de la transacción abierta: los mismos periodos en los que las pondría rellenar_volumen.
+    """
+    ahora = int(time.time())
+    momentos = {}  # fecha -> timestamp, una sola vez por segundo distinto del lote
+    por_clave = {}
+    for fila, fecha in zip(filas, fechas if fechas is not None else itertools.repeat(None)):
+        cantidad, moneda_origen, moneda_destino, resultado, tasa = fila
+        if fecha is None:
+            momento = ahora
+        else:
+            momento = momentos.get(fecha)
+            if momento is None:
+                momento = momentos[fecha] = calendar.timegm(time.strptime(fecha, "%Y-%m-%d %H:%M:%S"))
+        for periodo, segundos in PERIODOS_VOLUMEN.items():
+            clave = (periodo, momento // segundos * segundos, moneda_origen, moneda_destino)
+            acumulado = por_clave.get(clave)
+            if acumulado is None:
+                por_clave[clave] = [1, cantidad, resultado, tasa]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += cantidad
+                acumulado[2] += resultado
+                acumulado[3] += tasa
+    conn.executemany(SQL_ACUMULAR_VOLUMEN, [clave + tuple(acumulado) for clave, acumulado in por_clave.items()])
+
+def estado_volumen():
+    """(pendiente_hasta, relleno_hasta): los acumulados están completos cuando relleno_hasta >= pendiente_hasta."""
+    return obtener_conexion().execute('SELECT pendiente_hasta, relleno_hasta FROM volumen_estado').fetchone()
+
+def rellenar_volumen(lote=50000):
+    """
+    Suma a los acumulados el siguiente tramo de como mucho `lote` ids de las filas anteriores a su creación, agregado en SQLite y en una sola transacción (corta, para no bloquear a los escritores). Devuelve (relleno_hasta, pendiente_hasta).
+    """
+    conn = obtener_conexion()
+    with conn:
+        pendiente_hasta, relleno_hasta = conn.execute(
+            'SELECT pendiente_hasta, relleno_hasta FROM volumen_estado'
+        ).fetchone()
+        if relleno_hasta >= pendiente_hasta:
+            return relleno_hasta, pendiente_hasta
+        hasta = min(relleno_hasta + lote, pendiente_hasta)
+        for periodo, segundos in PERIODOS_VOLUMEN.items():
+            conn.execute(f'''
+                INSERT INTO volumen (periodo, inicio, moneda_origen, moneda_destino, conversiones, suma_cantidad, suma_resultado, suma_tasa)
+                SELECT ?, CAST(strftime('%s', fecha) AS INTEGER) / {segundos} * {segundos} AS inicio,
+                       moneda_origen, moneda_destino, COUNT(*), SUM(cantidad_unidades), SUM(resultado_unidades), SUM(tasa)
+                FROM historial WHERE id > ? AND id <= ?
+                GROUP BY inicio, moneda_origen, moneda_destino
+            ''' + _SUMAR_VOLUMEN, (periodo, relleno_hasta, hasta))
+        conn.execute('UPDATE volumen_estado SET relleno_hasta = ?', (hasta,))
+    return hasta, pendiente_hasta
+
+def consultar_volumen(periodo, desde, hasta, limite, moneda_origen=None, moneda_destino=None):
+    """
+    Desde los acumulados de `periodo`, entre `desde` y `hasta`: los `limite` pares con más conversiones como (origen, destino, conversiones, suma_cantidad, suma_resultado, suma_tasa), importes en unidades mínimas, y la serie (inicio, conversiones, suma_cantidad) de cada periodo, opcionalmente de un solo par.
+    """
+    inicio = time.perf_counter()
+    conn = obtener_conexion()
+    pares = conn.execute('''
+        SELECT moneda_origen, moneda_destino, SUM(conversiones), SUM(suma_cantidad), SUM(suma_resultado), SUM(suma_tasa)
+        FROM volumen WHERE periodo = ? AND inicio BETWEEN ? AND ?
+        GROUP BY moneda_origen, moneda_destino ORDER BY 3 DESC LIMIT ?
+    ''', (periodo, desde, hasta, limite)).fetchall()
+    condiciones = ""
+    parametros = [periodo, desde, hasta]
+    if moneda_origen and moneda_destino:
+        condiciones = " AND moneda_origen = ? AND moneda_destino = ?"
+        parametros += [moneda_origen, moneda_destino]
+    serie = conn.execute(f'''
+        SELECT inicio, SUM(conversiones), SUM(suma_cantidad)
+        FROM volumen WHERE periodo = ? AND inicio BETWEEN ? AND ?{condiciones}
+        GROUP BY inicio ORDER BY inicio
+    ''', parametros).fetchall()
+    _DURACION["consultar_volumen"].desde(inicio)
+    return pares, serie
+
+# --- MIGRACIÓN DE IMPORTES ---
+# Las bases anteriores guardaban la cantidad como REAL y el resultado como texto para
+# mostrar ("1,234.56 Euro"), y los acumulados de volumen como REAL. La migración reescribe
+# cada tabla en bloque con INSERT ... SELECT y la sustituye, todo en una transacción: o
+# queda migrada o no cambia. Los importes los pasa a unidades mínimas la misma
+# conversion.a_unidades de las conversiones nuevas (registrada como función de SQLite),
+# así que se redondean en decimal y con la misma regla.
+def _funcion_unidades(redondeados):
+    """
+    conversion.a_unidades para usar dentro de SQLite: 0 si el valor no es un número (como hacía CAST) y cuenta en `redondeados[0]` los importes con más decimales de los que admite su moneda.
+    """
+    from decimal import Decimal
+
+    from .conversion import DECIMALES, a_unidades
+
+    def unidades(moneda, valor):
+        try:
+            resultado = a_unidades(moneda, valor)
+            if resultado != Decimal(str(valor)).scaleb(DECIMALES.get(moneda, 2)):
+                redondeados[0] += 1
+            return resultado
+        except (ArithmeticError, TypeError, ValueError):
+            return 0
+    return unidades
+
+def _columnas(conn, tabla):
+    return {fila[1]: fila[2] for fila in conn.execute(f'PRAGMA table_info({tabla})')}
+
+def migrar_importes():
+    """Pasa el historial y los acumulados de un esquema antiguo a importes en unidades mínimas. Devuelve las filas migradas."""
+    conn = obtener_conexion()
+    if "resultado" not in _columnas(conn, "historial") and _columnas(conn, "volumen").get("suma_cantidad") != "REAL":
+        return 0
+    redondeados = [0]
+    conn.create_function("a_unidades", 2, _funcion_unidades(redondeados), deterministic=True)
+    migradas = 0
+    inicio = time.perf_counter()
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        # Otro proceso puede haber migrado mientras se esperaba el bloqueo
+        if "resultado" in _columnas(conn, "historial"):
+            secuencia = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'historial'").fetchone()[0]
+            conn.execute(SQL_CREAR_HISTORIAL.format(tabla="historial_nuevo"))
+            # El resultado se lee del texto (exacto, sin pasar por REAL): el número antes del
+            # nombre de la moneda, sin separadores de miles
+            numero = "REPLACE(substr(resultado, 1, instr(resultado, ' ') - 1), ',', '')"
+            migradas = conn.execute(f'''
+                INSERT INTO historial_nuevo (id, cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, fecha)
+                SELECT id, a_unidades(moneda_origen, cantidad), moneda_origen, moneda_destino,
+                       a_unidades(moneda_destino, {numero}), tasa, fecha
+                FROM historial ORDER BY id
+            ''').rowcount
+            redondeados_historial = redondeados[0]
+            conn.execute('DROP TABLE historial')
+            conn.execute('ALTER TABLE historial_nuevo RENAME TO historial')
+            _crear_indices_historial(conn)
+            # Que los ids nuevos sigan después de los que ya se usaron (aunque se borraran)
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'historial'", (secuencia,))
+        if _columnas(conn, "volumen").get("suma_cantidad") == "REAL":
+            conn.execute(SQL_CREAR_VOLUMEN.format(tabla="volumen_nuevo"))
+            conn.execute('''
+                INSERT INTO volumen_nuevo
+                SELECT periodo, inicio, moneda_origen, moneda_destino, conversiones,
+                       a_unidades(moneda_origen, suma_cantidad), a_unidades(moneda_destino, suma_resultado), suma_tasa
+                FROM volumen
+            ''')
+            conn.execute('DROP TABLE volumen')
+            conn.execute('ALTER TABLE volumen_nuevo RENAME TO volumen')
+    if migradas:
+        print(f"Historial migrado a importes en unidades mínimas: {migradas} filas en {time.perf_counter() - inicio:.1f} s")
+        if redondeados_historial:
+            print(f"Aviso: {redondeados_historial} importes del historial tenían más decimales de los que admite su moneda y se redondearon")
+    return migradas
+
+# --- RETENCIÓN Y ARCHIVO ---
+# `archivos` guarda, por fichero de archivo mensual, hasta qué byte y cuántas filas están
+# confirmados: se actualiza en la misma transacción que borra esas filas de `historial`,
+# así que si el proceso muere entre escribir el fichero y confirmar, la siguiente pasada
+# recorta el fichero a lo confirmado y no quedan filas duplicadas ni perdidas.
+# `trabajos` reparte entre procesos los trabajos periódicos: un turno con caducidad y la
+# hora de la última ejecución.
+def init_retencion():
+    """Crea las tablas de archivos y de turnos de trabajos si no existen."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archivos (
+                nombre TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                filas INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS trabajos (
+                nombre TEXT PRIMARY KEY,
+                dueno TEXT,
+                turno_hasta REAL NOT NULL DEFAULT 0,
+                ultima REAL NOT NULL DEFAULT 0
+            )
+        ''')
+
+def tomar_turno_trabajo(nombre, dueno, duracion, intervalo):
+    """Turno de `duracion` segundos para el trabajo `nombre` si nadie lo tiene y no se ejecutó en los últimos `intervalo`."""
+    ahora = time.time()
+    conn = obtener_conexion()
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO trabajos (nombre, dueno, turno_hasta) VALUES (?, ?, ?)
+            ON CONFLICT(nombre) DO UPDATE SET dueno = excluded.dueno, turno_hasta = excluded.turno_hasta
+            WHERE trabajos.turno_hasta < ? AND trabajos.ultima <= ?
+        ''', (nombre, dueno, ahora + duracion, ahora, ahora - intervalo))
+    return cursor.rowcount == 1
+
+def renovar_turno_trabajo(nombre, dueno, duracion):
+    conn = obtener_conexion()
+    with conn:
+        conn.execute(
+            'UPDATE trabajos SET turno_hasta = ? WHERE nombre = ? AND dueno = ?', (time.time() + duracion, nombre, dueno)
+        )
+
+def terminar_turno_trabajo(nombre, dueno):
+    """Libera el turno y anota la ejecución."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute(
+            'UPDATE trabajos SET turno_hasta = 0, ultima = ? WHERE nombre = ? AND dueno = ?', (time.time(), nombre, dueno)
+        )
+
+def limite_retencion(antes_de=None, max_filas=None):
+    """
+    Id más alto que hay que sacar de `historial` para cumplir las políticas: filas con fecha anterior a `antes_de` ('AAAA-MM-DD HH:MM:SS') y las más antiguas que sobren de `max_filas`. Los ids crecen con la fecha, así que basta con un límite de id. Nunca pasa de lo que ya esté sumado en los acumulados de volumen. 0 si no hay nada que archivar.
+    """
+    conn = obtener_conexion()
+    limite = 0
+    if antes_de is not None:
+        limite = conn.execute('SELECT IFNULL(MAX(id), 0) FROM historial WHERE fecha < ?', (antes_de,)).fetchone()[0]
+    if max_filas is not None:
+        sobran = conn.execute('SELECT COUNT(*) FROM historial').fetchone()[0] - max_filas
+        if sobran > 0:
+            fila = conn.execute('SELECT id FROM historial ORDER BY id LIMIT 1 OFFSET ?', (sobran - 1,)).fetchone()
+            limite = max(limite, fila[0])
+    pendiente_hasta, relleno_hasta = estado_volumen()
+    if relleno_hasta < pendiente_hasta and limite > relleno_hasta:
+        print(f"Aviso: retención limitada al id {relleno_hasta} (de {limite}) hasta completar los acumulados de volumen")
+        limite = relleno_hasta
+    return limite
+
+def filas_para_archivar(limite_id, lote):
+    """Las `lote` filas más antiguas con id hasta `limite_id`, con la fecha como timestamp unix."""
+    return obtener_conexion().execute('''
+        SELECT id, cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa, CAST(strftime('%s', fecha) AS INTEGER)
+        FROM historial WHERE id <= ? ORDER BY id LIMIT ?
+    ''', (limite_id, lote)).fetchall()
+
+def archivo_confirmado(nombre):
+    """(bytes, filas) confirmados del fichero de archivo `nombre`; (0, 0) si aún no existe."""
+    fila = obtener_conexion().execute('SELECT bytes, filas FROM archivos WHERE nombre = ?', (nombre,)).fetchone()
+    return fila or (0, 0)
+
+def confirmar_archivado(primer_id, ultimo_id, archivos):
+    """En una transacción: borra de `historial` los ids archivados y anota {nombre: (bytes, filas)} de los ficheros."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('DELETE FROM historial WHERE id BETWEEN ? AND ?', (primer_id, ultimo_id))
+        conn.executemany(
+            'INSERT INTO archivos (nombre, bytes, filas) VALUES (?, ?, ?) '
+            'ON CONFLICT(nombre) DO UPDATE SET bytes = excluded.bytes, filas = excluded.filas',
+            [(nombre, tamano, filas) for nombre, (tamano, filas) in archivos.items()],
+        )
+
+def vacuum_incremental(paginas):
+    """Devuelve al sistema como mucho `paginas` páginas libres (si la base usa auto_vacuum incremental). Devuelve las liberadas."""
+    conn = obtener_conexion()
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        return 0
+    antes = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    # Con execute() sqlite3 da un solo paso, que libera una sola página; executescript lo ejecuta entero
+    conn.executescript(f'PRAGMA incremental_vacuum({int(paginas)});')
+    return antes - conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+def vacuum_completo():
+    """Pasa la base a auto_vacuum incremental y la compacta entera (bloquea a los escritores mientras dura)."""
+    conn = obtener_conexion()
+    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    conn.execute('VACUUM')
+
+# --- ALMACÉN COMPARTIDO DE TASAS ---
+# Una fila por moneda base con el último diccionario de tasas. Todos los procesos
+# leen de aquí; solo el que tiene el turno de escritor descarga y publica.
+def init_tasas():
+    """Crea la tabla de tasas compartida si no existe."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasas (
+                base TEXT PRIMARY KEY,
+                rates TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                escritor TEXT,
+                turno_hasta REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        # Serie histórica: una instantánea por base y momento, con las tasas empaquetadas
+        # en un blob de float64 en el orden de monedas guardado en tasas_orden
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasas_orden (
+                id INTEGER PRIMARY KEY,
+                codigos TEXT NOT NULL UNIQUE
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasas_historico (
+                base TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                orden INTEGER NOT NULL,
+                rates BLOB NOT NULL,
+                PRIMARY KEY (base, timestamp)
+            ) WITHOUT ROWID
+        ''')
+
+def cargar_tasas(base):
+    """Devuelve (rates, timestamp) de la última tabla publicada para `base`, o None."""
+    fila = obtener_conexion().execute(
+        'SELECT rates, timestamp FROM tasas WHERE base = ? AND timestamp > 0', (base,)
+    ).fetchone()
+    if fila is None:
+        return None
+    return json.loads(fila[0]), fila[1]
+
+def tomar_turno_tasas(base, escritor, duracion):
+    """Intenta ser el único proceso que descarga `base` durante `duracion` segundos. Devuelve True si lo consigue."""
+    ahora = time.time()
+    conn = obtener_conexion()
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO tasas (base, rates, timestamp, escritor, turno_hasta) VALUES (?, '{}', 0, ?, ?)
+            ON CONFLICT(base) DO UPDATE SET escritor = excluded.escritor, turno_hasta = excluded.turno_hasta
+            WHERE tasas.turno_hasta < ? OR tasas.escritor = excluded.escritor
+        ''', (base, escritor, ahora + duracion, ahora))
+    return cursor.rowcount == 1
+
+def guardar_tasas(base, rates, timestamp, escritor):
+    """Publica una tabla de tasas recién descargada y libera el turno de escritor."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('''
+            INSERT INTO tasas (base, rates, timestamp, escritor, turno_hasta) VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT(base) DO UPDATE SET rates = excluded.rates, timestamp = excluded.timestamp, turno_hasta = 0
+            WHERE tasas.escritor = excluded.escritor OR tasas.turno_hasta < excluded.timestamp
+        ''', (base, json.dumps(rates), timestamp, escritor))
+
+def liberar_turno_tasas(base, escritor):
+    """Libera el turno de escritor sin publicar nada (p. ej. si la descarga falló)."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('UPDATE tasas SET turno_hasta = 0 WHERE base = ? AND escritor = ?', (base, escritor))
+
+# --- SERIE HISTÓRICA DE TASAS ---
+def registrar_orden_tasas(codigos):
+    """Id del orden de monedas `codigos` (texto separado por comas) de la serie histórica, creándolo si no existe."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute('INSERT OR IGNORE INTO tasas_orden (codigos) VALUES (?)', (codigos,))
+    return conn.execute('SELECT id FROM tasas_orden WHERE codigos = ?', (codigos,)).fetchone()[0]
+
+def ordenes_tasas():
+    """{id: códigos separados por comas} de todos los órdenes de monedas de la serie histórica."""
+    return dict(obtener_conexion().execute('SELECT id, codigos FROM tasas_orden'))
+
+def guardar_instantanea(base, timestamp, orden, blob):
+    """Añade a la serie histórica la instantánea de tasas de `base` en `timestamp`."""
+    conn = obtener_conexion()
+    with conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO tasas_historico (base, timestamp, orden, rates) VALUES (?, ?, ?, ?)',
+            (base, timestamp, orden, blob),
+        )
+
+def cargar_instantaneas(base, desde, hasta, limite=-1):
+    """(timestamp, orden, blob) de las instantáneas de `base` entre `desde` y `hasta`, en orden cronológico."""
+    inicio = time.perf_counter()
+    filas = obtener_conexion().execute(
+        'SELECT timestamp, orden, rates FROM tasas_historico WHERE base = ? AND timestamp BETWEEN ? AND ? '
+        'ORDER BY timestamp LIMIT ?',
+        (base, desde, hasta, limite),
+    ).fetchall()
+    _DURACION["consultar_serie"].desde(inicio)
+    return filas
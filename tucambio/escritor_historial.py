@@ -0,0 +1,162 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from . import database, historial_reciente, metricas
+
+# --- ESCRITURA DIFERIDA DEL HISTORIAL ---
+# Las peticiones solo encolan la conversión (y la anotan ya en el búfer de recientes);
+# un hilo la escribe en lotes con executemany dentro de una única transacción (cada
+# TAMANO_LOTE filas o cada INTERVALO_FLUSH segundos, lo que ocurra antes).
+TAMANO_LOTE = 200
+INTERVALO_FLUSH = 0.05  # 50 ms
+SINCRONIZACION = 1.0  # segundos entre lecturas de filas escritas por otros procesos
+MAX_PENDIENTES = 10000  # memoria acotada: filas como máximo en la cola
+ESPERA_COLA_LLENA = 0.5  # segundos que espera una petición si la cola está llena
+
+_cola = queue.Queue(maxsize=MAX_PENDIENTES)
+_detener = threading.Event()
+_hilo_lock = threading.Lock()
+_hilo = None
+_hilo_pid = None
+
+
+def _escribir(lote):
+    """
+    Escribe un lote de (fila, entrada del búfer de recientes) en una sola transacción, con la fecha de cada entrada, y pone a cada entrada su id. Si la escritura falla, las entradas salen del búfer: no se sirve lo que no está guardado.
+    """
+    entradas = [entrada for _, entrada in lote]
+    try:
+        ids = database.guardar_conversiones([fila for fila, _ in lote], [historial_reciente.fecha(e) for e in entradas])
+    except Exception as e:
+        print(f"Error guardando historial: {e}")
+        historial_reciente.descartar(entradas)
+    else:
+        historial_reciente.confirmar(entradas, ids)
+        try:
+            historial_reciente.sincronizar()
+        except Exception as e:
+            print(f"Error leyendo historial: {e}")
+    finally:
+        for _ in lote:
+            _cola.task_done()
+
+
+def _bucle():
+    """
+    Saca filas de la cola y las agrupa en lotes hasta que se pide detener y la cola queda vacía. Cuando no hay nada que escribir, trae al búfer de recientes lo que hayan escrito otros procesos.
+    """
+    while not (_detener.is_set() and _cola.empty()):
+        try:
+            lote = [_cola.get(timeout=SINCRONIZACION)]
+        except queue.Empty:
+            try:
+                historial_reciente.sincronizar()
+            except Exception as e:
+                print(f"Error leyendo historial: {e}")
+            continue
+        limite = time.monotonic() + INTERVALO_FLUSH
+        while len(lote) < TAMANO_LOTE:
+            resto = limite - time.monotonic()
+            try:
+                lote.append(_cola.get(timeout=resto) if resto > 0 else _cola.get_nowait())
+            except queue.Empty:
+                break
+        _escribir(lote)
+    database.cerrar_conexion()
+
+
+def iniciar():
+    """Arranca el hilo escritor en este proceso si aún no existe (también tras un fork)."""
+    global _hilo, _hilo_pid
+    if _hilo is not None and _hilo_pid == os.getpid() and _hilo.is_alive():
+        return
+    with _hilo_lock:
+        if _hilo is None or _hilo_pid != os.getpid() or not _hilo.is_alive():
+            _detener.clear()
+            _hilo = threading.Thread(target=_bucle, name="escritor-historial", daemon=True)
+            _hilo_pid = os.getpid()
+            _hilo.start()
+
+
+def _tras_fork():
+    """
+    En el proceso hijo de un fork: cola y cerrojos nuevos (lo que quedara encolado lo escribe el padre) y, si el padre tenía el hilo escritor en marcha, uno propio.
+    """
+    global _cola, _detener, _hilo_lock, _hilo
+    activo = _hilo is not None
+    _cola = queue.Queue(maxsize=MAX_PENDIENTES)
+    _detener = threading.Event()
+    _hilo_lock = threading.Lock()
+    _hilo = None
+    if activo:
+        iniciar()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def encolar_conversion(cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa):
+    """Encola una conversión (importes en unidades mínimas) para guardarla en segundo plano; si la cola sigue llena, la guarda en el acto."""
+    iniciar()
+    fila = (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa)
+    entrada = historial_reciente.entrada(fila)
+    # Al búfer antes que a la cola, para que el escritor no pueda confirmarla o descartarla antes de que esté
+    historial_reciente.anotar(entrada)
+    try:
+        _cola.put((fila, entrada), timeout=ESPERA_COLA_LLENA)
+    except queue.Full:
+        # Escrita en el acto, con la misma fecha que ya tiene en el búfer
+        try:
+            id_ = database.guardar_conversion(*fila, fecha=historial_reciente.fecha(entrada))
+        except Exception:
+            historial_reciente.descartar([entrada])
+            raise
+        historial_reciente.confirmar([entrada], [id_])
+
+
+def intentar_encolar(cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa):
+    """Encola sin esperar nunca (para el bucle de eventos de asgi.py). Devuelve False si la cola está llena."""
+    iniciar()
+    fila = (cantidad_unidades, moneda_origen, moneda_destino, resultado_unidades, tasa)
+    entrada = historial_reciente.entrada(fila)
+    historial_reciente.anotar(entrada)
+    try:
+        _cola.put_nowait((fila, entrada))
+    except queue.Full:
+        historial_reciente.descartar([entrada])
+        return False
+    return True
+
+
+def pendientes():
+    """Número de conversiones encoladas que aún no se han escrito."""
+    return _cola.unfinished_tasks
+
+
+metricas.indicador("tucambio_historial_pendientes", "Conversiones encoladas que aún no se han escrito.", pendientes)
+
+
+def esperar_vaciado(timeout=1.0):
+    """Espera (como mucho `timeout` segundos) a que todo lo encolado esté escrito. Devuelve True si se vació."""
+    limite = time.monotonic() + timeout
+    with _cola.all_tasks_done:
+        while _cola.unfinished_tasks:
+            resto = limite - time.monotonic()
+            if resto <= 0:
+                return False
+            _cola.all_tasks_done.wait(resto)
+    return True
+
+
+def detener(timeout=5.0):
+    """Vacía la cola y para el hilo escritor (se llama también al salir del proceso)."""
+    _detener.set()
+    hilo = _hilo
+    if hilo is not None and _hilo_pid == os.getpid():
+        hilo.join(timeout)
+
+
+atexit.register(detener)
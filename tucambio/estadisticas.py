@@ -0,0 +1,65 @@
+import time
+
+from . import database
+from .conversion import desde_unidades
+
+# --- ESTADÍSTICAS DE CONVERSIONES ---
+# /estadisticas lee solo los acumulados de volumen por par y hora/día (database.volumen),
+# que se mantienen al escribir cada lote del historial, así que su coste depende del
+# número de periodos y pares de la ventana, no del tamaño de `historial`.
+PERIODOS = database.PERIODOS_VOLUMEN
+RANGO_POR_DEFECTO = 7 * 86400  # segundos hacia atrás si no se indica `desde`
+RANGO_HORARIO = 2 * 86400  # ventanas de hasta 2 días se agregan por hora; las mayores, por día
+MAX_PARES = 100
+LOTE_RELLENO = 50000  # ids de historial por transacción al rellenar
+PAUSA_RELLENO = 0.05  # segundos entre tramos, para que entren los escritores
+
+
+def consultar(desde, hasta, periodo=None, limite=10, moneda_origen=None, moneda_destino=None):
+    """
+    Respuesta de /estadisticas para la ventana [desde, hasta] (alineada al inicio del periodo): los `limite` pares con más conversiones con su volumen y tasa media, y la serie de conversiones por periodo (de todos los pares, o del par indicado y entonces con su volumen).
+    """
+    if periodo is None:
+        periodo = "hora" if hasta - desde <= RANGO_HORARIO else "dia"
+    segundos = PERIODOS[periodo]
+    desde = int(desde // segundos * segundos)
+    pares, serie = database.consultar_volumen(periodo, desde, hasta, limite, moneda_origen, moneda_destino)
+    pendiente_hasta, relleno_hasta = database.estado_volumen()
+    un_par = bool(moneda_origen and moneda_destino)
+    # Los acumulados están en unidades mínimas; aquí se pasan a unidades de cada moneda
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "periodo": periodo,
+        "conversiones": sum(fila[1] for fila in serie),
+        "pares": [
+            {
+                "par": f"{origen}-{destino}",
+                "conversiones": conversiones,
+                "volumen": desde_unidades(origen, suma_cantidad),
+                "volumen_destino": desde_unidades(destino, suma_resultado),
+                "tasa_media": suma_tasa / conversiones,
+            }
+            for origen, destino, conversiones, suma_cantidad, suma_resultado, suma_tasa in pares
+        ],
+        "serie": [
+            {"inicio": inicio, "conversiones": conversiones, "volumen": desde_unidades(moneda_origen, suma_cantidad)} if un_par
+            else {"inicio": inicio, "conversiones": conversiones}
+            for inicio, conversiones, suma_cantidad in serie
+        ],
+        # False mientras falte rellenar los acumulados con el historial anterior a su creación
+        "completo": relleno_hasta >= pendiente_hasta,
+    }
+
+
+def rellenar(lote=LOTE_RELLENO, pausa=PAUSA_RELLENO):
+    """
+    Construye los acumulados a partir del historial que ya existía, por tramos de `lote` ids en transacciones cortas: la memoria no depende del tamaño de la tabla y, si se interrumpe, la siguiente ejecución sigue donde se quedó.
+    """
+    database.init_db()
+    while True:
+        relleno_hasta, pendiente_hasta = database.rellenar_volumen(lote)
+        print(f"Acumulados: id {relleno_hasta} de {pendiente_hasta}")
+        if relleno_hasta >= pendiente_hasta:
+            return
+        time.sleep(pausa)
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+
+from . import metricas, tasas
+from .conversion import MONEDAS, CODIGOS_MONEDAS, MONEDAS_SIN_DECIMALES
+
+# --- FLUJO DE TASAS POR SERVER-SENT EVENTS ---
+# /tasas/stream envía la instantánea completa al conectar y después solo las tasas
+# que cambian en cada refresco, para que la página convierta en local sin sondear.
+# Cada conexión pasa casi todo el tiempo esperando en tasas.esperar_cambio(), pero con
+# gthread lo hace ocupando un hilo del worker (de ahí MAX_FLUJOS); en asgi.py el mismo
+# flujo es una corrutina que espera al aviso de tasas.al_publicar.
+LATIDO = 20  # segundos entre comentarios de keep-alive para proxies y balanceadores
+REINTENTO_MS = 5000  # cuánto espera el navegador antes de reconectar
+# Con el servidor de hilos (serve --gthread) cada flujo ocupa un hilo del worker mientras
+# dura, así que servidor.servir limita los flujos por worker a la mitad de los hilos para
+# que /health y /convertir sigan teniendo dónde atenderse. Por encima del límite se
+# responde un flujo vacío que solo pide reconectar al cabo de REINTENTO_MS (un 503 haría
+# que EventSource no volviera a intentarlo). Si el cliente se va, la plaza se libera
+# cuando falla la escritura de un latido. None: sin límite (el servidor de desarrollo
+# abre un hilo por petición; en asgi.py, el modo por defecto de serve, un flujo es una
+# corrutina y no ocupa ningún hilo).
+MAX_FLUJOS = int(os.environ["TUCAMBIO_MAX_FLUJOS"]) if os.environ.get("TUCAMBIO_MAX_FLUJOS") else None
+
+_flujos_abiertos = 0
+_flujos_lock = threading.Lock()
+
+# (versión anterior, versión nueva) -> evento "diff" ya serializado, compartido por todas las conexiones
+_DIFFS = {}
+
+
+def evento(nombre, datos):
+    """Un evento SSE ya serializado."""
+    return f"event: {nombre}\ndata: {datos}\n\n"
+
+
+def diferencias(anterior, nueva, codigos):
+    """Tasas (respecto a la moneda pivote) de `codigos` que cambian de `anterior` a `nueva`."""
+    viejas = anterior["rates"]
+    return {
+        codigo: nueva["rates"][codigo]
+        for codigo in codigos
+        if nueva["rates"].get(codigo) and nueva["rates"][codigo] != viejas.get(codigo)
+    }
+
+
+def evento_diff(anterior, nueva, codigos):
+    """Evento "diff" de `anterior` a `nueva`, serializado una sola vez para todas las conexiones."""
+    clave = (anterior["version"], nueva["version"])
+    texto = _DIFFS.get(clave)
+    if texto is None:
+        texto = evento("diff", json.dumps({
+            "version": nueva["version"],
+            "timestamp": int(nueva["timestamp"]),
+            "tasas": diferencias(anterior, nueva, codigos),
+        }))
+        if len(_DIFFS) > 64:
+            _DIFFS.clear()
+        _DIFFS[clave] = texto
+    return texto
+
+
+def reservar_flujo():
+    """Cuenta un flujo abierto en este worker. Devuelve False si ya se ha llegado a MAX_FLUJOS."""
+    global _flujos_abiertos
+    with _flujos_lock:
+        if MAX_FLUJOS is not None and _flujos_abiertos >= MAX_FLUJOS:
+            return False
+        _flujos_abiertos += 1
+        return True
+
+
+def anotar_flujo(cambio):
+    """Suma `cambio` a los flujos abiertos sin mirar el límite (los de asgi.py, que no ocupan hilos)."""
+    global _flujos_abiertos
+    with _flujos_lock:
+        _flujos_abiertos += cambio
+
+
+def liberar_flujo():
+    """Descuenta un flujo al cerrarse la respuesta."""
+    anotar_flujo(-1)
+
+
+def flujos_abiertos():
+    """Flujos SSE abiertos ahora mismo en este worker."""
+    return _flujos_abiertos
+
+
+metricas.indicador("tucambio_flujos_abiertos", "Flujos SSE de /tasas/stream abiertos.", flujos_abiertos)
+_RECHAZADOS = metricas.contador("tucambio_flujos_rechazados_total", "Conexiones a /tasas/stream aplazadas por llegar a MAX_FLUJOS.")
+
+
+def flujo_tasas(base=tasas.MONEDA_PIVOTE):
+    """Generador del flujo SSE: evento "tasas" con la instantánea y un evento "diff" por cada cambio."""
+    yield f"retry: {REINTENTO_MS}\n\n"
+    tabla = tasas.obtener_tabla(CODIGOS_MONEDAS, base)
+    while tabla is None:
+        yield ": esperando tasas\n\n"
+        tabla = tasas.esperar_cambio(None, base, timeout=LATIDO)
+    yield evento("tasas", tasas.instantanea_json(tabla, MONEDAS, MONEDAS_SIN_DECIMALES))
+    while True:
+        nueva = tasas.esperar_cambio(tabla["version"], base, timeout=LATIDO)
+        if nueva["version"] == tabla["version"]:
+            yield ": latido\n\n"
+            continue
+        yield evento_diff(tabla, nueva, CODIGOS_MONEDAS)
+        tabla = nueva
+
+
+def registrar_rutas(app):
+    """Añade a `app` la ruta /tasas/stream."""
+    from flask import Response
+
+    @app.route("/tasas/stream")
+    def tasas_stream():
+        if reservar_flujo():
+            resp = Response(flujo_tasas(), mimetype="text/event-stream")
+            resp.call_on_close(liberar_flujo)
+        else:
+            _RECHAZADOS.inc()
+            resp = Response(f"retry: {REINTENTO_MS}\n: demasiados flujos abiertos\n\n", mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"  # que nginx no acumule los eventos
+        return resp
@@ -0,0 +1,178 @@
+"""
+Exportación del historial en streaming.
+
+    python -m tucambio exportar --formato csv > historial.csv
+    python -m tucambio exportar --formato columnar --desde 2024-01-01 --salida historial.tcol
+
+Las filas salen de un único cursor leído por bloques (database.iterar_historial) y cada
+bloque se serializa y se entrega antes de leer el siguiente, así que la memoria es la de
+un bloque sea cual sea el tamaño de la tabla. Formatos: CSV, NDJSON y uno columnar
+binario (ver `generar_columnar`). Los importes salen tal como se guardan: enteros en
+unidades mínimas de su moneda (cantidad en la de origen, resultado en la de destino).
+"""
+import csv
+import io
+import itertools
+import json
+import operator
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from . import database
+
+TAMANO_BLOQUE = 5000  # filas por bloque (y por grupo de filas en el formato columnar)
+COLUMNAS = ("id", "cantidad_unidades", "moneda_origen", "moneda_destino", "resultado_unidades", "tasa", "fecha")
+
+# --- FORMATO COLUMNAR ---
+# Cabecera: MAGIA, longitud (uint32) y JSON con las columnas y su codificación. Después,
+# un grupo por bloque de filas: número de filas (uint32) y, por columna, longitud (uint32)
+# y los datos comprimidos con zlib. Todo en little-endian.
+#   i64       int64
+#   i64delta  int64, el primero tal cual y el resto como diferencia con el anterior
+#   f64       float64
+#   texto     n+1 offsets int32 y los textos en UTF-8 seguidos
+# Las columnas comprimen mucho mejor que las filas (ids consecutivos, pocos códigos de
+# moneda distintos) y leer una sola columna no obliga a interpretar las demás.
+MAGIA = b"TUCOL1\n"
+ESQUEMA = (
+    ("id", "i64delta"),
+    ("cantidad_unidades", "i64"),
+    ("moneda_origen", "texto"),
+    ("moneda_destino", "texto"),
+    ("resultado_unidades", "i64"),
+    ("tasa", "f64"),
+    ("fecha", "i64delta"),  # timestamp unix (UTC)
+)
+NIVEL_ZLIB = 1  # rápido: el grueso de la compresión lo dan las columnas, no el nivel
+_LITTLE = sys.byteorder == "little"
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "columnar": ("application/octet-stream", "tcol"),
+}
+
+
+def _numeros(tipo, valores):
+    datos = array(tipo, valores)
+    if not _LITTLE:
+        datos.byteswap()
+    return datos.tobytes()
+
+
+def _codificar(codificacion, valores):
+    if codificacion == "i64delta":
+        return _numeros("q", map(operator.sub, valores, itertools.chain((0,), valores)))
+    if codificacion == "i64":
+        return _numeros("q", valores)
+    if codificacion == "f64":
+        return _numeros("d", valores)
+    textos = list(map(str.encode, valores))
+    return _numeros("i", itertools.accumulate(map(len, textos), initial=0)) + b"".join(textos)
+
+
+def _decodificar(codificacion, datos, n):
+    if codificacion == "texto":
+        offsets = array("i")
+        offsets.frombytes(datos[:4 * (n + 1)])
+        if not _LITTLE:
+            offsets.byteswap()
+        textos = datos[4 * (n + 1):]
+        return [textos[offsets[i]:offsets[i + 1]].decode() for i in range(n)]
+    valores = array("d" if codificacion == "f64" else "q")
+    valores.frombytes(datos)
+    if not _LITTLE:
+        valores.byteswap()
+    if codificacion == "i64delta":
+        return list(itertools.accumulate(valores))
+    return valores.tolist()
+
+
+def cabecera_columnar():
+    """Cabecera del formato columnar: va una sola vez al principio; después se pueden añadir grupos cuando se quiera."""
+    cabecera = json.dumps({"columnas": [{"nombre": n, "codificacion": c} for n, c in ESQUEMA]}).encode()
+    return MAGIA + struct.pack("<I", len(cabecera)) + cabecera
+
+
+def grupo_columnar(filas):
+    """Un grupo de filas (id, cantidad, origen, destino, resultado, tasa, fecha unix), importes en unidades mínimas, codificado por columnas."""
+    partes = [struct.pack("<I", len(filas))]
+    for (_, codificacion), valores in zip(ESQUEMA, zip(*filas)):
+        datos = zlib.compress(_codificar(codificacion, valores), NIVEL_ZLIB)
+        partes.append(struct.pack("<I", len(datos)))
+        partes.append(datos)
+    return b"".join(partes)
+
+
+def generar_columnar(bloques):
+    """Genera el formato columnar (bytes) a partir de bloques de filas con la fecha como timestamp unix."""
+    yield cabecera_columnar()
+    for filas in bloques:
+        yield grupo_columnar(filas)
+
+
+def leer_columnar(fichero):
+    """Lee un fichero abierto en binario con el formato columnar y genera las filas como dicts, grupo a grupo."""
+    if fichero.read(len(MAGIA)) != MAGIA:
+        raise ValueError("No es un fichero columnar de Tu Cambio.")
+    (longitud,) = struct.unpack("<I", fichero.read(4))
+    columnas = json.loads(fichero.read(longitud))["columnas"]
+    while True:
+        cabecera = fichero.read(4)
+        if not cabecera:
+            return
+        (n,) = struct.unpack("<I", cabecera)
+        valores = []
+        for columna in columnas:
+            (longitud,) = struct.unpack("<I", fichero.read(4))
+            valores.append(_decodificar(columna["codificacion"], zlib.decompress(fichero.read(longitud)), n))
+        nombres = [columna["nombre"] for columna in columnas]
+        for fila in zip(*valores):
+            yield dict(zip(nombres, fila))
+
+
+# --- CSV Y NDJSON ---
+def generar_csv(bloques):
+    """Genera CSV (bytes UTF-8) con cabecera, un trozo por bloque de filas."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(COLUMNAS)
+    for filas in bloques:
+        escritor.writerows(filas)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def generar_ndjson(bloques):
+    """Genera NDJSON (un objeto por línea), un trozo por bloque de filas."""
+    for filas in bloques:
+        yield "".join(json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + "\n" for fila in filas).encode()
+
+
+def _fecha_sql(timestamp):
+    return None if timestamp is None else time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(timestamp))
+
+
+def exportar(formato, moneda_origen=None, moneda_destino=None, desde=None, hasta=None, tamano=TAMANO_BLOQUE):
+    """Generador de bytes con el historial en `formato` ("csv", "ndjson" o "columnar"); `desde`/`hasta` son timestamps unix."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no válido: {formato}")
+    bloques = database.iterar_historial(
+        moneda_origen, moneda_destino, _fecha_sql(desde), _fecha_sql(hasta), tamano, fecha_unix=formato == "columnar"
+    )
+    return {"csv": generar_csv, "ndjson": generar_ndjson, "columnar": generar_columnar}[formato](bloques)
+
+
+def escribir(salida, formato, **filtros):
+    """Escribe la exportación en el fichero binario `salida`. Devuelve los bytes escritos."""
+    total = 0
+    for trozo in exportar(formato, **filtros):
+        salida.write(trozo)
+        total += len(trozo)
+    return total
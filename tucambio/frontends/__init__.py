@@ -0,0 +1,11 @@
+"""Interfaces web seleccionables: cada módulo define TEMPLATE, la plantilla Jinja de su página principal."""
+import importlib
+
+FRONTENDS = ("clasico", "web")
+
+
+def plantilla(nombre):
+    """Plantilla de la página principal de la interfaz `nombre`."""
+    if nombre not in FRONTENDS:
+        raise ValueError(f"Interfaz desconocida: {nombre} (disponibles: {', '.join(FRONTENDS)})")
+    return importlib.import_module(f"{__name__}.{nombre}").TEMPLATE
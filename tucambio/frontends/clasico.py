@@ -0,0 +1,297 @@
+# Interfaz clásica (la más simple): formulario, resultado e historial con banderas
+TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Conversor de Monedas</title>
+    <link rel="manifest" href="{{ activo('manifest.webmanifest') }}">
+    <script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client=ca-pub-4347223649983931"
+        crossorigin="anonymous"></script>
+    <style>
+        body {
+            font-family: 'Segoe UI', 'Roboto', Arial, sans-serif;
+            margin: 0;
+            min-height: 100vh;
+            /* Fondo imagen Unsplash */
+            background: url('{{ activo('fondo-app.jpg') }}') center center/cover no-repeat fixed;
+        }
+        /* Capa de oscurecimiento y desenfoque para legibilidad */
+        body:before {
+            content: '';
+            position: fixed;
+            top: 0; left: 0; width: 100vw; height: 100vh;
+            background: rgba(25, 30, 45, 0.48);
+            backdrop-filter: blur(4px);
+            z-index: 0;
+        }
+        .container {
+            position: relative;
+            z-index: 2;
+            max-width: 420px;
+            margin: 48px auto 0 auto;
+            padding: 32px 34px 27px 34px;
+            background: rgba(255,255,255,0.88);
+            border-radius: 20px;
+            box-shadow: 0 8px 32px 0 rgba(74,74,120,0.15), 0 1.5px 8px #cdd0fd;
+            border: 1.5px solid rgba(80,120,250,0.15);
+            backdrop-filter: blur(3px);
+        }
+        h1 {
+            text-align: center;
+            color: #2a53a8;
+            letter-spacing: 1.6px;
+            font-weight: 900;
+            margin-bottom: 8px;
+            font-size: 2rem;
+            text-shadow: 0 2px 6px #cef6f6aa;
+        }
+        label {
+            display: block;
+            margin-top: 15px;
+            font-size: 1rem;
+            color: #2c3046;
+            font-weight: 500;
+            letter-spacing: 0.1em;
+        }
+        input, select {
+            width: 100%;
+            padding: 9px 10px;
+            margin-top: 6px;
+            font-size: 1em;
+            border: 1px solid #e6e6e6;
+            border-radius: 7px;
+            box-sizing: border-box;
+            background: #f4f8fb;
+            margin-bottom: 3px;
+            transition: border 0.2s;
+        }
+        input:focus, select:focus {
+            outline: none;
+            box-shadow: 0 0 0 2px #9ad2fa;
+            border: 1.5px solid #9ad2fa;
+            background: #fff;
+        }
+        #convert-btn {
+            background: linear-gradient(90deg,#1670e9,#ff7c53);
+            color: white;
+            font-weight: 700;
+            padding: 11px 10px;
+            border: none;
+            border-radius: 8px;
+            margin-top: 18px;
+            width: 100%;
+            font-size: 1em;
+            letter-spacing: 1px;
+            cursor: pointer;
+            transition: background .17s, box-shadow .14s;
+            box-shadow: 0px 1px 5px #e6e7fe;
+        }
+        #convert-btn:hover {
+            background: linear-gradient(90deg,#1670e9,#ffac53);
+        }
+        .resultado {
+            margin-top: 22px;
+            padding: 10px;
+            border-radius: 7px;
+            border: 1.5px solid #e5eaff;
+            background-color: #f7f8fc;
+            text-align: center;
+            min-height: 50px;
+        }
+        .resultado h2 {
+            margin: 0 0 5px 0;
+            color: #1670e9;
+            font-size: 1.5em;
+        }
+        .historial {
+            margin-top: 24px;
+        }
+        .historial h3 {
+            border-bottom: 1.5px solid #eae9ff;
+            padding-bottom: 7px;
+            margin-bottom: 11px;
+            font-size: 1.15em;
+            letter-spacing: 0.03em;
+            color: #444;
+        }
+        .historial ul {
+            list-style-type: none;
+            padding: 0;
+            margin: 0;
+        }
+        .historial li {
+            display: flex;
+            align-items: center;
+            gap: 7px;
+            padding: 6px 0;
+            border-bottom: 1px solid #f2eeee;
+            font-size: 1em;
+        }
+        .flag {
+            width: 20px; height: 15px;
+            border: 1px solid #d7d7d7;
+            border-radius: 3px;
+            margin-right: 5px;
+            background: #f7f7f7;
+            object-fit: contain;
+        }
+        @media (max-width: 600px) {
+            .container {
+                margin: 0;
+                border-radius: 0;
+                box-shadow: none;
+                padding: 12px 3vw 16px 3vw;
+            }
+            h1 {
+                font-size: 1.2em;
+            }
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Tu Cambio</h1>
+        <form id="conversion-form">
+            <label for="cantidad">Cantidad:</label>
+            <input type="number" id="cantidad" value="1" step="0.01" required>
+
+            <label for="moneda_origen">De:</label>
+            <select id="moneda_origen">
+                {% for moneda in monedas %}
+                <option value="{{ moneda['codigo'] }}" {% if moneda['codigo'] == 'USD' %}selected{% endif %}>{{ moneda['nombre'] }} ({{ moneda['codigo'] }})</option>
+                {% endfor %}
+            </select>
+
+            <label for="moneda_destino">A:</label>
+            <select id="moneda_destino">
+                {% for moneda in monedas %}
+                <option value="{{ moneda['codigo'] }}" {% if moneda['codigo'] == 'EUR' %}selected{% endif %}>{{ moneda['nombre'] }} ({{ moneda['codigo'] }})</option>
+                {% endfor %}
+            </select>
+            
+            <button type="button" id="convert-btn">Convertir</button>
+        </form>
+
+        <div class="resultado">
+            <h2 id="resultado-texto"></h2>
+            <p id="tasa-texto"></p>
+        </div>
+
+        <!-- Google AdSense (tu código): -->
+        <div style="margin: 16px 0; text-align: center;">
+            <script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client=ca-pub-4347223649983931" crossorigin="anonymous"></script>
+            <ins class="adsbygoogle"
+                 style="display:block; min-height:100px; text-align:center; background:rgba(249,249,249,0.18); border-radius:14px;"
+                 data-ad-client="ca-pub-4347223649983931"
+                 data-ad-slot="1234567890"
+                 data-ad-format="auto"></ins>
+            <script>
+                 (adsbygoogle = window.adsbygoogle || []).push({});
+            </script>
+        </div>
+
+        <div class="historial">
+            <h3>Historial Reciente</h3>
+            <ul id="historial-lista">
+                </ul>
+        </div>
+    </div>
+
+    <script src="{{ activo('conversor.js') }}"></script>
+    <script>
+        document.addEventListener('DOMContentLoaded', function() {
+            const cantidadInput = document.getElementById('cantidad');
+            const origenSelect = document.getElementById('moneda_origen');
+            const destinoSelect = document.getElementById('moneda_destino');
+            const convertBtn = document.getElementById('convert-btn');
+            const resultadoTexto = document.getElementById('resultado-texto');
+            const tasaTexto = document.getElementById('tasa-texto');
+            const historialLista = document.getElementById('historial-lista');
+
+            function actualizarHistorial() {
+                fetch('/historial')
+                    .then(response => response.json())
+                    .then(historial => {
+                        historialLista.innerHTML = '';
+                        historial.forEach(item => {
+                            const li = document.createElement('li');
+                            // item: (id, cantidad, origen, destino, resultado, tasa, fecha, bandera_origen, bandera_destino, nombre_origen, nombre_destino)
+                            li.innerHTML = `
+                                <img class="flag" src="${item[7]}" alt="origen"> <b>${item[1]}</b> ${item[9]}
+                                <span style="font-size:1.3em; margin: 0 0.4em;">→</span>
+                                <img class="flag" src="${item[8]}" alt="destino"> <b>${item[4]}</b>
+                                <span style="font-size:0.85em; color:#778;">${item[6].substring(0, 16).replace('T',' ')}</span>
+                            `;
+                            historialLista.appendChild(li);
+                        });
+                        if(historial.length === 0) {
+                            const li = document.createElement('li');
+                            li.textContent = 'No hay conversiones recientes.';
+                            historialLista.appendChild(li);
+                        }
+                    });
+            }
+
+            function mostrarResultado(data, monedaOrigen, monedaDestino) {
+                resultadoTexto.textContent = data.resultado;
+                tasaTexto.textContent = `Tasa: 1 ${monedaOrigen} = ${data.tasa} ${monedaDestino}`;
+                if (data.tasa_antigua) {
+                    tasaTexto.textContent += ` (tasa de hace ${Math.round(data.edad_tasa / 60)} min)`;
+                }
+            }
+
+            function convertir() {
+                const cantidad = cantidadInput.value;
+                const monedaOrigen = origenSelect.value;
+                const monedaDestino = destinoSelect.value;
+
+                // Resultado inmediato (también sin conexión) con la instantánea de tasas;
+                // el servidor lo confirma y lo guarda en el historial
+                const local = Conversor.convertir(parseFloat(cantidad), monedaOrigen, monedaDestino);
+                if (local) {
+                    mostrarResultado(local, monedaOrigen, monedaDestino);
+                }
+
+                fetch('/convertir', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        cantidad: cantidad,
+                        moneda_origen: monedaOrigen,
+                        moneda_destino: monedaDestino
+                    })
+                })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        if (!local) {
+                            resultadoTexto.textContent = `Error: ${data.error}`;
+                            tasaTexto.textContent = '';
+                        }
+                    } else {
+                        mostrarResultado(data, monedaOrigen, monedaDestino);
+                        actualizarHistorial();
+                    }
+                })
+                .catch(error => {
+                    if (!local) {
+                        resultadoTexto.textContent = 'Error de conexión';
+                        tasaTexto.textContent = '';
+                    }
+                    console.error('Error:', error);
+                });
+            }
+
+            convertBtn.addEventListener('click', convertir);
+            actualizarHistorial();
+            Conversor.cargar().catch(() => {});
+        });
+    </script>
+    <script>
+        if ('serviceWorker' in navigator) {
+            window.addEventListener('load', () => navigator.serviceWorker.register('/sw.js').catch(() => {}));
+        }
+    </script>
+</body>
+</html>
+"""
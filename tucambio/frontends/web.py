@@ -0,0 +1,402 @@
+# Interfaz con selectores de moneda con bandera (Choices.js) y conversión en tiempo real
+TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Conversor de Monedas</title>
+    <script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client=ca-pub-4347223649983931" crossorigin="anonymous"></script>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <link rel="stylesheet" href="{{ activo('choices.min.css') }}"/>
+    <link rel="manifest" href="{{ activo('manifest.webmanifest') }}">
+    <style>
+        body {
+            font-family: 'Segoe UI', Arial, sans-serif;
+            background: url('{{ activo('fondo-web.jpg') }}') no-repeat center center fixed;
+            background-size: cover;
+            margin: 0;
+            padding: 0;
+            transition: background 0.5s;
+        }
+        .container {
+            background: rgba(255,255,255,0.32);
+            max-width: 400px;
+            margin: 60px auto;
+            padding: 30px 30px 20px 30px;
+            border-radius: 24px;
+            box-shadow: 0 8px 32px 0 rgba(31, 38, 135, 0.15), 0 1.5px 8px #bcc2f5;
+            border: 1.5px solid rgba(255,255,255,0.38);
+            backdrop-filter: blur(16px) saturate(180%);
+            -webkit-backdrop-filter: blur(16px) saturate(180%);
+            transition: background 0.5s, color 0.5s;
+            position: relative;
+        }
+        .resultado {
+            background: rgba(255,255,255,0.16);
+            color: #130f40;
+            border-radius: 18px;
+            padding: 20px 14px;
+            margin-top: 22px;
+            text-align: center;
+            font-size: 1.14em;
+            border: 1.5px solid rgba(255,255,255,0.26);
+            box-shadow: 0 4px 18px 0 rgba(31, 38, 135, 0.08);
+            animation: fadein 0.7s;
+            backdrop-filter: blur(16px) saturate(180%);
+            -webkit-backdrop-filter: blur(16px) saturate(180%);
+            /* Para glass: sin doble border ni color sólido extra al fondo */
+        }
+        /* Nunca dejar fondo ni min-height ni padding en #resultado-container si está vacío */
+        #resultado-container:empty { min-height: 0 !important; padding: 0 !important; background: none !important; border: none !important; }
+        
+        /* Elimina el espacio del bloque ads vacío */
+        #adsense, .adsense {
+            display:none !important;
+            height:0 !important;
+        }
+        h2 {
+            color: #273c75;
+            text-align: center;
+            margin-bottom: 30px;
+        }
+        label {
+            font-weight: 500;
+            color: #353b48;
+        }
+        input, select {
+            width: 100%;
+            padding: 10px;
+            margin: 8px 0 18px 0;
+            border: 1px solid #dcdde1;
+            border-radius: 6px;
+            font-size: 1em;
+            box-sizing: border-box;
+            transition: border 0.3s;
+        }
+        .flag {
+            vertical-align: middle;
+            width: 22px;
+            height: 16px;
+            margin-right: 6px;
+            border-radius: 2px;
+            box-shadow: 0 1px 2px #aaa2;
+        }
+        /* Mejoras en el estilo del menú desplegable */
+        .choices__item--choice.is-selected {
+            background-color: #f5f5f5;
+        }
+        .choices__item {
+            font-size: 1.1em;
+        }
+        .choices__item--choice {
+            display: flex;
+            align-items: center;
+            padding: 10px;
+        }
+        .choices__item--choice .flag {
+            margin-right: 12px;
+        }
+        .choices__list--dropdown .choices__item--choice {
+            padding: 10px;
+        }
+        .choices__list--dropdown {
+            border-radius: 6px;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+        }
+        .choices[data-type*="select-one"] .choices__inner {
+            display: flex;
+            align-items: center;
+        }
+        .choices__inner .flag {
+            margin-right: 12px;
+        }
+        .choices__inner .choices__item {
+            margin: 0 !important;
+        }
+
+        button, .invertir-btn {
+            width: 100%;
+            background: #273c75;
+            color: #fff;
+            border: none;
+            padding: 12px;
+            border-radius: 6px;
+            font-size: 1.1em;
+            font-weight: bold;
+            cursor: pointer;
+            transition: background 0.2s, color 0.2s;
+            margin-bottom: 10px;
+        }
+        button:hover, .invertir-btn:hover {
+            background: #40739e;
+        }
+        .invertir-btn {
+            width: 48px;
+            height: 48px;
+            border-radius: 50%;
+            margin: 0 auto 18px auto;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            background: #f5f6fa;
+            color: #273c75;
+            border: 2px solid #273c75;
+            font-size: 1.5em;
+            transition: background 0.2s, color 0.2s;
+        }
+        .invertir-btn:hover {
+            background: #273c75;
+            color: #fff;
+        }
+        .resultado {
+            background: #dff9fb;
+            color: #130f40;
+            border-radius: 6px;
+            padding: 15px;
+            margin-top: 20px;
+            text-align: center;
+            font-size: 1.1em;
+            border: 1px solid #c7ecee;
+            animation: fadein 0.7s;
+        }
+        #loading {
+            display: none;
+            text-align: center;
+            margin-top: 10px;
+            color: #273c75;
+        }
+        @keyframes fadein {
+            from { opacity: 0; transform: translateY(20px);}
+            to { opacity: 1; transform: translateY(0);}
+        }
+        .error {
+            color: #c0392b;
+            background: #fbeee6;
+            border: 1px solid #e17055;
+            border-radius: 6px;
+            padding: 10px;
+            margin-top: 10px;
+            text-align: center;
+            animation: fadein 0.7s;
+        }
+        .historial {
+            margin-top: 30px;
+            background: #f1f2f6;
+            border-radius: 8px;
+            padding: 10px;
+            font-size: 0.98em;
+            color: #636e72;
+            max-height: 120px;
+            overflow-y: auto;
+        }
+        @media (max-width: 500px) {
+            .container { padding: 15px; }
+        }
+    </style>
+</head>
+<body>
+    <div class="container" id="main-container">
+        <h2>Conversor de Monedas</h2>
+        <button type="button" class="invertir-btn" id="invertir" title="Invertir monedas">&#8646;</button>
+        <form id="formulario" onsubmit="return false;">
+            <label>Convertir de:</label>
+            <select id="moneda_origen" name="moneda_origen" required>
+                {% for m in monedas %}
+                <option value="{{m.codigo}}" data-custom-properties='<img src="{{m.bandera}}" class="flag">'
+                    {% if m.codigo == 'EUR' %}selected{% endif %}>
+                    {{m.nombre}}
+                </option>
+                {% endfor %}
+            </select>
+            <label>a:</label>
+            <select id="moneda_destino" name="moneda_destino" required>
+                {% for m in monedas %}
+                <option value="{{m.codigo}}" data-custom-properties='<img src="{{m.bandera}}" class="flag">'
+                    {% if m.codigo == 'USD' %}selected{% endif %}>
+                    {{m.nombre}}
+                </option>
+                {% endfor %}
+            </select>
+            <label>Cantidad:</label>
+            <input type="text" name="cantidad" id="cantidad" value="1" required>
+        </form>
+        <div id="resultado-container" style="min-height:0;"></div>
+        <div id="loading">Cargando...</div>
+        <div class="historial" id="historial" style="display:none;">
+            <strong>Historial de conversiones:</strong>
+            <ul style="padding-left:18px;" id="historial-lista"></ul>
+        </div>
+    </div>
+    <script src="{{ activo('choices.min.js') }}"></script>
+    <script src="{{ activo('conversor.js') }}"></script>
+    <script>
+        // Choices.js para selects con banderas
+        const choices1 = new Choices('#moneda_origen', {
+            searchEnabled: true,
+            itemSelectText: '',
+            allowHTML: true,
+            shouldSort: false,
+        });
+        const choices2 = new Choices('#moneda_destino', {
+            searchEnabled: true,
+            itemSelectText: '',
+            allowHTML: true,
+            shouldSort: false,
+        });
+
+        // Botón invertir monedas
+        document.getElementById('invertir').onclick = function() {
+            let origen = document.getElementById('moneda_origen').value;
+            let destino = document.getElementById('moneda_destino').value;
+            choices1.setChoiceByValue(destino);
+            choices2.setChoiceByValue(origen);
+            actualizarConversion();
+            guardarEnHistorial();
+        };
+
+        // Función para obtener los nombres de las monedas y banderas (JavaScript)
+        function getMonedaData(codigo) {
+            const monedas = {{ monedas | tojson }};
+            return monedas.find(m => m.codigo === codigo);
+        }
+
+        // Historial: la página es estática y la lista se carga aparte desde /historial
+        function actualizarHistorial() {
+            fetch('/historial')
+                .then(response => response.json())
+                .then(historial => {
+                    const lista = document.getElementById('historial-lista');
+                    lista.innerHTML = '';
+                    // h: (id, cantidad, origen, destino, resultado, tasa, fecha, bandera_origen, bandera_destino, nombre_origen, nombre_destino)
+                    historial.forEach(h => {
+                        const li = document.createElement('li');
+                        const flagOrigen = document.createElement('img');
+                        flagOrigen.src = h[7];
+                        flagOrigen.className = 'flag';
+                        const flagDestino = document.createElement('img');
+                        flagDestino.src = h[8];
+                        flagDestino.className = 'flag';
+                        const tasa = document.createElement('span');
+                        tasa.style.cssText = 'font-size:0.9em;color:#888;';
+                        tasa.textContent = `(Tasa: ${Conversor.formatear(h[5], 6)})`;
+                        li.append(flagOrigen, ` ${h[1]} ${h[9]} = `, flagDestino, ` ${h[4]} `, tasa);
+                        lista.appendChild(li);
+                    });
+                    document.getElementById('historial').style.display = historial.length ? '' : 'none';
+                });
+        }
+
+        function mostrarResultado(origen, destino, data) {
+            const m_origen = getMonedaData(origen);
+            const m_destino = getMonedaData(destino);
+            document.getElementById('resultado-container').innerHTML = `
+                <div class="resultado">
+                    <strong>Resultado:</strong><br>
+                    <img src="${m_origen.bandera}" class="flag"> ${data.cantidad} ${m_origen.nombre}
+                    =
+                    <img src="${m_destino.bandera}" class="flag"> ${data.resultado}
+                    <br>
+                    <span style="font-size:0.95em;color:#888;">Tasa: ${data.tasa}</span>
+                </div>
+            `;
+        }
+
+        function leerFormulario() {
+            const cantidad = document.getElementById('cantidad').value;
+            const valida = !(isNaN(cantidad) || parseFloat(cantidad) <= 0 || cantidad.trim() === "");
+            return {
+                cantidad: cantidad,
+                origen: document.getElementById('moneda_origen').value,
+                destino: document.getElementById('moneda_destino').value,
+                valida: valida,
+            };
+        }
+
+        // Pide la conversión al servidor, que además la guarda en el historial
+        function registrarConversion(mostrar) {
+            const f = leerFormulario();
+            if (!f.valida) return;
+            const resultadoDiv = document.getElementById('resultado-container');
+            const loadingDiv = document.getElementById('loading');
+            if (mostrar) loadingDiv.style.display = 'block';
+
+            fetch('/convertir', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    cantidad: f.cantidad,
+                    moneda_origen: f.origen,
+                    moneda_destino: f.destino
+                }),
+            })
+            .then(response => response.json())
+            .then(data => {
+                loadingDiv.style.display = 'none';
+                if (!mostrar) {
+                    actualizarHistorial();
+                } else if (data.error) {
+                    resultadoDiv.innerHTML = `<div class="error">${data.error}</div>`;
+                } else {
+                    mostrarResultado(f.origen, f.destino, data);
+                    actualizarHistorial();
+                }
+            })
+            .catch(error => {
+                loadingDiv.style.display = 'none';
+                if (mostrar) {
+                    resultadoDiv.innerHTML = `<div class="error">Ocurrió un error. Intenta de nuevo más tarde.</div>`;
+                }
+                console.error('Error:', error);
+            });
+        }
+
+        // Conversión en tiempo real: en el navegador con la instantánea de /tasas.json.
+        // Solo si aún no hay instantánea se pregunta al servidor (con 500 ms de espera).
+        let timeout;
+        function actualizarConversion() {
+            clearTimeout(timeout);
+            const f = leerFormulario();
+            const resultadoDiv = document.getElementById('resultado-container');
+
+            if (!f.valida) {
+                resultadoDiv.innerHTML = `<div class="error">Por favor, introduce un número válido y mayor que cero.</div>`;
+                document.getElementById('cantidad').style.border = "2px solid #c0392b";
+                return;
+            } else {
+                document.getElementById('cantidad').style.border = "";
+            }
+
+            const local = Conversor.convertir(parseFloat(f.cantidad), f.origen, f.destino);
+            if (local) {
+                mostrarResultado(f.origen, f.destino, { ...local, cantidad: f.cantidad });
+                return;
+            }
+            timeout = setTimeout(() => registrarConversion(true), 500); // 500 ms de espera
+        }
+
+        // El historial se guarda cuando el usuario confirma la cantidad o cambia de moneda, no en cada tecla
+        function guardarEnHistorial() {
+            if (Conversor.disponible()) registrarConversion(false);
+        }
+
+        document.getElementById('cantidad').addEventListener('input', actualizarConversion);
+        document.getElementById('cantidad').addEventListener('change', guardarEnHistorial);
+        document.getElementById('moneda_origen').addEventListener('change', () => { actualizarConversion(); guardarEnHistorial(); });
+        document.getElementById('moneda_destino').addEventListener('change', () => { actualizarConversion(); guardarEnHistorial(); });
+
+        // Inicia la conversión al cargar la página (en local en cuanto llegue la instantánea)
+        // y se mantiene al día con los cambios de tasas que empuja el servidor
+        Conversor.cargar().then(actualizarConversion).catch(actualizarConversion);
+        Conversor.suscribir(actualizarConversion);
+        actualizarHistorial();
+
+    </script>
+    <script>
+        if ('serviceWorker' in navigator) {
+            window.addEventListener('load', () => navigator.serviceWorker.register('/sw.js').catch(() => {}));
+        }
+    </script>
+</body>
+</html>
+"""
@@ -0,0 +1,132 @@
+import collections
+import itertools
+import os
+import threading
+import time
+
+from . import database
+from .conversion import MONEDAS, presentar_fila
+
+# --- BÚFER CIRCULAR DEL HISTORIAL RECIENTE ---
+# Las últimas conversiones ya unidas con banderas y nombres, para servir `/` y
+# `/historial` sin tocar disco ni esperar al escritor. Las conversiones de este proceso
+# entran al encolarlas (`anotar`), y el hilo escritor les pone su id al guardarlas
+# (`confirmar`) o las quita si no se pudieron guardar (`descartar`); las de un lote, ya
+# escritas, entran con su id (`anotar_escritas`); y las de otros procesos las trae
+# `sincronizar` leyendo solo las filas nuevas por id. Todas se ordenan por (fecha, id),
+# como el historial de la base, aunque lleguen tarde: la fecha es la que se guarda.
+MAX_RECIENTES = 50
+
+_lock = threading.Lock()
+_recientes = collections.deque(maxlen=MAX_RECIENTES)
+_ultimo_id = 0
+_hidratado = False
+# codigo -> (bandera, nombre), precalculado una sola vez
+_metadatos = {m["codigo"]: (m["bandera"], m["nombre"]) for m in MONEDAS}
+
+
+def _tras_fork():
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def _con_banderas(fila):
+    """
+    La fila guardada ya presentada (id, cantidad, origen, destino, resultado como texto, tasa, fecha) + (bandera_origen, bandera_destino, nombre_origen, nombre_destino).
+    """
+    bandera_origen, nombre_origen = _metadatos.get(fila[2], ("", fila[2]))
+    bandera_destino, nombre_destino = _metadatos.get(fila[3], ("", fila[3]))
+    return presentar_fila(fila) + (bandera_origen, bandera_destino, nombre_origen, nombre_destino)
+
+
+def _clave(item):
+    # Las entradas aún sin id van detrás de las ya escritas del mismo segundo: recibirán un id mayor
+    return (item[6], item[0] if item[0] is not None else float("inf"))
+
+
+def _incorporar(nuevas):
+    """Mezcla `nuevas` en el búfer (sin repetir ids) por (fecha, id) y deja las MAX_RECIENTES últimas. Con el cerrojo tomado."""
+    ids = {item[0] for item in _recientes if item[0] is not None}
+    añadir = []
+    for item in nuevas:
+        if item[0] is None or item[0] not in ids:
+            añadir.append(item)
+            ids.add(item[0])
+    if not añadir:
+        return
+    items = sorted(itertools.chain(_recientes, añadir), key=_clave)[-MAX_RECIENTES:]
+    _recientes.clear()
+    _recientes.extend(items)
+
+
+def sincronizar():
+    """Añade al búfer las filas del historial posteriores a la última vista (la primera vez, las más recientes)."""
+    global _ultimo_id, _hidratado
+    filas = database.obtener_historial_desde(_ultimo_id, MAX_RECIENTES)
+    with _lock:
+        _incorporar([list(_con_banderas(fila)) for fila in filas if fila[0] > _ultimo_id])
+        if filas:
+            _ultimo_id = max(_ultimo_id, filas[-1][0])
+        _hidratado = True
+
+
+def entrada(fila):
+    """
+    Entrada del búfer para una conversión (cantidad, origen, destino, resultado, tasa) que aún no se ha escrito: sin id y con la fecha de ahora, que es con la que se guardará (`fecha`). Se añade con `anotar` y recibe su id con `confirmar`.
+    """
+    return list(_con_banderas((None,) + tuple(fila) + (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),)))
+
+
+def fecha(nueva):
+    """Fecha de una entrada, para guardarla con la misma."""
+    return nueva[6]
+
+
+def anotar(nueva):
+    """Añade al búfer una `entrada` recién encolada por este proceso."""
+    if not _hidratado:
+        sincronizar()
+    with _lock:
+        _incorporar([nueva])
+
+
+def confirmar(entradas, ids):
+    """Pone a cada una de `entradas` el id con el que se acaba de escribir."""
+    with _lock:
+        for nueva, id_ in zip(entradas, ids):
+            nueva[0] = id_
+        # Con su id, cada entrada pasa a su sitio entre las del mismo segundo; y si otro
+        # hilo ya trajo esa fila de la base, la entrada sobra
+        items = list(_recientes)
+        _recientes.clear()
+        _incorporar(items)
+
+
+def descartar(entradas):
+    """Quita del búfer las `entradas` que no se pudieron escribir."""
+    quitar = {id(nueva) for nueva in entradas}
+    with _lock:
+        items = [item for item in _recientes if id(item) not in quitar]
+        _recientes.clear()
+        _recientes.extend(items)
+
+
+def anotar_escritas(entradas, ids):
+    """Añade al búfer `entradas` que ya se escribieron con esos `ids` (p. ej. las de /convertir/lote)."""
+    for nueva, id_ in zip(entradas, ids):
+        nueva[0] = id_
+    if not _hidratado:
+        sincronizar()
+    with _lock:
+        _incorporar(entradas)
+
+
+def obtener(limite=5):
+    """Las `limite` conversiones más recientes, de la más nueva a la más antigua, con banderas y nombres."""
+    if not _hidratado:
+        sincronizar()
+    with _lock:
+        return [list(item) for item in itertools.islice(reversed(_recientes), limite)]
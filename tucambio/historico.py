@@ -0,0 +1,127 @@
+import array
+import datetime
+import itertools
+import math
+import sys
+
+from . import database
+
+# --- SERIE HISTÓRICA DE TASAS ---
+# Cada tabla recién descargada se guarda como una instantánea: una fila por base y
+# momento con las tasas empaquetadas en un blob de float64 little-endian (NaN si falta
+# alguna) en un orden de monedas fijo, registrado en tasas_orden. Con 16 monedas son
+# 128 bytes por fila, y una consulta por rango une los blobs y los decodifica de una
+# sola vez con array.frombytes, sin interpretar fila a fila.
+INTERVALOS = {"hora": 3600, "dia": 86400}  # velas OHLC en UTC
+MAX_PUNTOS = 5000  # instantáneas como máximo en una consulta sin agregar
+RANGO_POR_DEFECTO = 7 * 86400  # segundos hacia atrás si no se indica `desde`
+MOMENTO_MAXIMO = 253402300800  # 10000-01-01 UTC: más allá time.gmtime y datetime no llegan
+
+# (DB_PATH, códigos) -> id en tasas_orden; (DB_PATH, id) -> tupla de códigos
+_ordenes = {}
+_codigos = {}
+
+
+def empaquetar(rates, codigos):
+    """Las tasas de `codigos`, en ese orden, como bytes de float64 little-endian."""
+    valores = array.array("d", (float(rates[c]) if rates.get(c) else float("nan") for c in codigos))
+    if sys.byteorder != "little":
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def desempaquetar(blobs):
+    """Un único array de float64 con el contenido de todos los `blobs` seguidos."""
+    valores = array.array("d")
+    valores.frombytes(b"".join(blobs))
+    if sys.byteorder != "little":
+        valores.byteswap()
+    return valores
+
+
+def _orden(codigos):
+    clave = (database.DB_PATH, tuple(codigos))
+    if clave not in _ordenes:
+        _ordenes[clave] = database.registrar_orden_tasas(",".join(codigos))
+    return _ordenes[clave]
+
+
+def _codigos_de(orden):
+    clave = (database.DB_PATH, orden)
+    if clave not in _codigos:
+        for id_, codigos in database.ordenes_tasas().items():
+            _codigos[(database.DB_PATH, id_)] = tuple(codigos.split(","))
+    return _codigos[clave]
+
+
+def guardar(base, rates, timestamp, codigos):
+    """Añade a la serie histórica la tabla de tasas de `base` descargada en `timestamp`."""
+    database.guardar_instantanea(base, timestamp, _orden(codigos), empaquetar(rates, codigos))
+
+
+def serie(origen, destino, desde, hasta, base, limite=-1):
+    """[(timestamp, tasa origen→destino)] de las instantáneas de `base` entre `desde` y `hasta`, en orden cronológico."""
+    puntos = []
+    filas = database.cargar_instantaneas(base, desde, hasta, limite)
+    # Las filas seguidas con el mismo orden de monedas se decodifican juntas
+    for orden, grupo in itertools.groupby(filas, key=lambda fila: fila[1]):
+        grupo = list(grupo)
+        codigos = _codigos_de(orden)
+        if origen not in codigos or destino not in codigos:
+            continue
+        n = len(codigos)
+        valores = desempaquetar(fila[2] for fila in grupo)
+        por_origen = valores[codigos.index(origen)::n]
+        por_destino = valores[codigos.index(destino)::n]
+        for fila, a, b in zip(grupo, por_origen, por_destino):
+            if a and b == b and a == a:  # ni cero ni NaN
+                puntos.append((fila[0], b / a))
+    return puntos
+
+
+def ohlc(puntos, segundos):
+    """Agrupa `puntos` en velas de `segundos`: inicio, apertura, máximo, mínimo, cierre y número de muestras."""
+    velas = []
+    for timestamp, tasa in puntos:
+        inicio = int(timestamp // segundos * segundos)
+        if velas and velas[-1]["inicio"] == inicio:
+            vela = velas[-1]
+            vela["maximo"] = max(vela["maximo"], tasa)
+            vela["minimo"] = min(vela["minimo"], tasa)
+            vela["cierre"] = tasa
+            vela["muestras"] += 1
+        else:
+            velas.append({"inicio": inicio, "apertura": tasa, "maximo": tasa, "minimo": tasa, "cierre": tasa, "muestras": 1})
+    return velas
+
+
+def leer_momento(texto):
+    """
+    Un timestamp unix a partir de un número o de una fecha ISO 8601 (UTC si no lleva zona). None si `texto` está vacío; ValueError si no es una fecha o queda fuera de [0, MOMENTO_MAXIMO) (también "inf" y "nan", que float acepta).
+    """
+    if not texto:
+        return None
+    try:
+        momento = float(texto)
+    except ValueError:
+        fecha = datetime.datetime.fromisoformat(texto)
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=datetime.timezone.utc)
+        momento = fecha.timestamp()
+    if not math.isfinite(momento) or not 0 <= momento < MOMENTO_MAXIMO:
+        raise ValueError(f"Momento fuera de rango: {texto}")
+    return momento
+
+
+def consultar(origen, destino, desde, hasta, intervalo, base):
+    """
+    Respuesta de /tasas/historico: con `intervalo` "hora" o "dia", velas OHLC; con "crudo", las instantáneas tal cual (como mucho MAX_PUNTOS).
+    """
+    respuesta = {"par": f"{origen}-{destino}", "desde": desde, "hasta": hasta, "intervalo": intervalo}
+    if intervalo == "crudo":
+        puntos = serie(origen, destino, desde, hasta, base, MAX_PUNTOS)
+        respuesta["puntos"] = puntos
+        respuesta["truncado"] = len(puntos) == MAX_PUNTOS
+    else:
+        respuesta["velas"] = ohlc(serie(origen, destino, desde, hasta, base), INTERVALOS[intervalo])
+    return respuesta
@@ -0,0 +1,312 @@
+import atexit
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+
+# --- MÉTRICAS (FORMATO DE TEXTO DE PROMETHEUS) ---
+# Contadores e histogramas en memoria, sin dependencias y baratos de anotar: sumar a
+# un contador no toma ningún cerrojo y observar en un histograma es una búsqueda
+# binaria y tres sumas bajo uno, así que se puede hacer en el camino caliente.
+# /metrics los expone en el formato de texto de Prometheus junto con indicadores que
+# se calculan al leerlos (p. ej. la profundidad de la cola del historial).
+# Cada proceso cuenta lo suyo. Con varios workers (python -m tucambio serve) cada uno
+# vuelca sus valores cada INTERVALO_VOLCADO segundos a un fichero en DIRECTORIO y /metrics
+# suma los de todos, así que da igual qué worker atienda al scraper. Los ficheros de los
+# workers que ya terminaron se siguen sumando, para que los contadores no bajen tras una
+# recarga; sus indicadores no. Sin DIRECTORIO, /metrics solo ve el proceso que responde.
+CUBETAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # segundos
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+RUTA_DESCONOCIDA = "sin_ruta"  # etiqueta de las peticiones que no casan con ninguna ruta (cardinalidad acotada)
+DIRECTORIO = os.environ.get("TUCAMBIO_METRICAS_DIR")  # servidor.servir crea uno nuevo en cada arranque
+INTERVALO_VOLCADO = 1.0  # segundos entre volcados de cada worker
+
+_lock = threading.Lock()
+# nombre -> {"tipo": "counter" | "histogram", "ayuda": str, "cubetas": tuple | None, "series": {etiquetas: serie}}
+_familias = {}
+# nombre -> (ayuda, función sin argumentos que devuelve el valor o None, "suma" | "maximo")
+_indicadores = {}
+_pid_volcado = None  # proceso cuyo hilo de volcado está en marcha
+
+
+class Contador:
+    """Contador que solo sube. `inc()` no toma cerrojo: avanzar un itertools.count es atómico."""
+
+    __slots__ = ("_cuenta", "_lecturas")
+
+    def __init__(self):
+        self._cuenta = itertools.count()
+        self._lecturas = 0
+
+    def inc(self, cantidad=1):
+        if cantidad == 1:
+            next(self._cuenta)
+        else:
+            with _lock:
+                self._lecturas -= cantidad
+
+    @property
+    def valor(self):
+        # Leer también avanza la cuenta, así que se descuentan las lecturas anteriores
+        with _lock:
+            valor = next(self._cuenta) - self._lecturas
+            self._lecturas += 1
+        return valor
+
+
+class Histograma:
+    __slots__ = ("cubetas", "cuentas", "suma", "total")
+
+    def __init__(self, cubetas):
+        self.cubetas = cubetas
+        self.cuentas = [0] * (len(cubetas) + 1)  # la última es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        i = bisect.bisect_left(self.cubetas, valor)
+        with _lock:
+            self.cuentas[i] += 1
+            self.suma += valor
+            self.total += 1
+
+    def desde(self, inicio):
+        """Observa los segundos transcurridos desde `inicio` (un time.perf_counter())."""
+        self.observar(time.perf_counter() - inicio)
+
+
+def _serie(nombre, tipo, ayuda, cubetas, etiquetas, crear):
+    familia = _familias.get(nombre)
+    if familia is None:
+        familia = _familias.setdefault(nombre, {"tipo": tipo, "ayuda": ayuda, "cubetas": cubetas, "series": {}})
+    clave = tuple(sorted(etiquetas.items()))
+    serie = familia["series"].get(clave)
+    if serie is None:
+        with _lock:
+            serie = familia["series"].setdefault(clave, crear())
+    return serie
+
+
+def contador(nombre, ayuda, **etiquetas):
+    """El contador `nombre` con esas etiquetas (se crea la primera vez). Guárdalo en un global si está en el camino caliente."""
+    return _serie(nombre, "counter", ayuda, None, etiquetas, Contador)
+
+
+def histograma(nombre, ayuda, cubetas=CUBETAS, **etiquetas):
+    """El histograma `nombre` con esas etiquetas (se crea la primera vez)."""
+    return _serie(nombre, "histogram", ayuda, cubetas, etiquetas, lambda: Histograma(cubetas))
+
+
+def indicador(nombre, ayuda, funcion, agregacion="suma"):
+    """
+    Registra un indicador (gauge) cuyo valor se calcula con `funcion()` cada vez que se lee /metrics. `agregacion` dice cómo se juntan los de varios workers: "suma" o "maximo".
+    """
+    _indicadores[nombre] = (ayuda, funcion, agregacion)
+
+
+def observar_peticion(ruta, metodo, estado, inicio):
+    """Anota la latencia de una petición HTTP atendida desde `inicio` (un time.perf_counter())."""
+    histograma(
+        "tucambio_peticion_segundos", "Latencia de las peticiones HTTP por ruta.",
+        ruta=ruta, metodo=metodo, estado=str(estado),
+    ).desde(inicio)
+
+
+def _tras_fork():
+    """En el proceso hijo: cerrojo nuevo y valores a cero (lo contado por el maestro no es de este worker)."""
+    global _lock
+    _lock = threading.Lock()
+    for familia in _familias.values():
+        for serie in familia["series"].values():
+            if isinstance(serie, Contador):
+                serie._cuenta = itertools.count()
+                serie._lecturas = 0
+            else:
+                serie.cuentas = [0] * len(serie.cuentas)
+                serie.suma = 0.0
+                serie.total = 0
+    if DIRECTORIO:
+        iniciar_volcado()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+# --- AGREGACIÓN ENTRE WORKERS ---
+def _instantanea():
+    """Valores actuales de este proceso: familias con sus series e indicadores ya calculados."""
+    familias = {}
+    for nombre, familia in list(_familias.items()):
+        series = {}
+        for clave, serie in list(familia["series"].items()):
+            if isinstance(serie, Contador):
+                series[clave] = serie.valor
+            else:
+                with _lock:
+                    series[clave] = [list(serie.cuentas), serie.suma, serie.total]
+        familias[nombre] = {"tipo": familia["tipo"], "ayuda": familia["ayuda"], "cubetas": familia["cubetas"], "series": series}
+    indicadores = {}
+    for nombre, (ayuda, funcion, agregacion) in list(_indicadores.items()):
+        try:
+            valor = funcion()
+        except Exception as e:
+            print(f"Error en la métrica {nombre}: {e}")
+            continue
+        if valor is not None:
+            indicadores[nombre] = [ayuda, agregacion, valor]
+    return {"familias": familias, "indicadores": indicadores}
+
+
+def _volcar():
+    """Escribe la instantánea de este proceso en DIRECTORIO (sustituyendo el fichero de golpe)."""
+    instantanea = _instantanea()
+    for familia in instantanea["familias"].values():
+        familia["series"] = [[list(clave), valor] for clave, valor in familia["series"].items()]
+    ruta = os.path.join(DIRECTORIO, f"{os.getpid()}.json")
+    with open(ruta + ".tmp", "w") as f:
+        json.dump(instantanea, f)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _bucle_volcado():
+    while True:
+        time.sleep(INTERVALO_VOLCADO)
+        try:
+            _volcar()
+        except Exception as e:
+            print(f"Error volcando métricas: {e}")
+
+
+def iniciar_volcado():
+    """Arranca en este proceso el hilo que vuelca sus métricas a DIRECTORIO (se llama en cada worker tras el fork)."""
+    global _pid_volcado
+    _pid_volcado = os.getpid()
+    threading.Thread(target=_bucle_volcado, name="volcado-metricas", daemon=True).start()
+
+
+def _volcado_final():
+    """Al salir un worker, deja escrito lo último que contó."""
+    if DIRECTORIO and _pid_volcado == os.getpid():
+        try:
+            _volcar()
+        except Exception as e:
+            print(f"Error volcando métricas: {e}")
+
+
+atexit.register(_volcado_final)
+
+
+def _otros_procesos():
+    """Instantáneas volcadas por los demás procesos, con un indicador de si el proceso sigue vivo."""
+    propio = f"{os.getpid()}.json"
+    for nombre in os.listdir(DIRECTORIO):
+        if not nombre.endswith(".json") or nombre == propio:
+            continue
+        ruta = os.path.join(DIRECTORIO, nombre)
+        try:
+            vivo = time.time() - os.path.getmtime(ruta) <= 3 * INTERVALO_VOLCADO
+            with open(ruta) as f:
+                instantanea = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo métricas de {nombre}: {e}")
+            continue
+        yield instantanea, vivo
+
+
+def _sumar(total, instantanea, vivo):
+    """Acumula en `total` una instantánea leída de fichero."""
+    for nombre, familia in instantanea["familias"].items():
+        destino = total["familias"].setdefault(nombre, {
+            "tipo": familia["tipo"],
+            "ayuda": familia["ayuda"],
+            "cubetas": tuple(familia["cubetas"]) if familia["cubetas"] else None,
+            "series": {},
+        })
+        for clave, valor in familia["series"]:
+            clave = tuple(tuple(par) for par in clave)
+            previo = destino["series"].get(clave)
+            if previo is None:
+                destino["series"][clave] = valor
+            elif familia["tipo"] == "counter":
+                destino["series"][clave] = previo + valor
+            else:
+                cuentas, suma, n = valor
+                destino["series"][clave] = [[a + b for a, b in zip(previo[0], cuentas)], previo[1] + suma, previo[2] + n]
+    if not vivo:
+        return
+    for nombre, (ayuda, agregacion, valor) in instantanea["indicadores"].items():
+        previo = total["indicadores"].get(nombre)
+        if previo is None:
+            total["indicadores"][nombre] = [ayuda, agregacion, valor]
+        else:
+            previo[2] = max(previo[2], valor) if agregacion == "maximo" else previo[2] + valor
+
+
+# --- EXPOSICIÓN ---
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(clave, extra=()):
+    pares = list(clave) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(str(v))}"' for k, v in pares) + "}"
+
+
+def _numero(valor):
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def exponer():
+    """Todas las métricas (de todos los workers si hay DIRECTORIO) en el formato de texto de Prometheus."""
+    total = _instantanea()
+    if DIRECTORIO:
+        for instantanea, vivo in _otros_procesos():
+            _sumar(total, instantanea, vivo)
+    lineas = []
+    for nombre, familia in sorted(total["familias"].items()):
+        tipo, cubetas = familia["tipo"], familia["cubetas"]
+        lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for clave, valor in sorted(familia["series"].items()):
+            if tipo == "counter":
+                lineas.append(f"{nombre}{_etiquetas(clave)} {_numero(valor)}")
+                continue
+            cuentas, suma, n = valor
+            acumulado = 0
+            for limite, cuenta in zip(cubetas + ("+Inf",), cuentas):
+                acumulado += cuenta
+                le = limite if limite == "+Inf" else _numero(float(limite))
+                lineas.append(f"{nombre}_bucket{_etiquetas(clave, [('le', le)])} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas(clave)} {_numero(suma)}")
+            lineas.append(f"{nombre}_count{_etiquetas(clave)} {n}")
+    for nombre, (ayuda, _, valor) in sorted(total["indicadores"].items()):
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} gauge")
+        lineas.append(f"{nombre} {_numero(valor)}")
+    return "\n".join(lineas) + "\n"
+
+
+def registrar_rutas(app):
+    """Añade a `app` la ruta /metrics y la medida de la latencia de todas sus rutas."""
+    from flask import Response, request
+
+    @app.before_request
+    def _empezar_medida():
+        request.environ["tucambio.inicio"] = time.perf_counter()
+
+    @app.after_request
+    def _terminar_medida(resp):
+        # En las respuestas en streaming (/tasas/stream) mide hasta que empieza el flujo
+        inicio = request.environ.get("tucambio.inicio")
+        if inicio is not None:
+            ruta = request.url_rule.rule if request.url_rule is not None else RUTA_DESCONOCIDA
+            observar_peticion(ruta, request.method, resp.status_code, inicio)
+        return resp
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(exponer(), content_type=TIPO_CONTENIDO)
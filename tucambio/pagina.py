@@ -0,0 +1,43 @@
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirven gzip e identidad
+    brotli = None
+
+# --- PÁGINAS PRECALCULADAS ---
+# El HTML estático se renderiza una vez y se guarda ya comprimido; cada petición
+# solo elige la variante según Accept-Encoding y copia bytes de memoria.
+CACHE_CONTROL = "public, max-age=300"
+
+
+def preparar(html):
+    """Devuelve las variantes (identidad, gzip y, si hay brotli, br) de `html` con su ETag fuerte."""
+    cuerpo = html.encode("utf-8")
+    variantes = {"identity": cuerpo, "gzip": gzip.compress(cuerpo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes["br"] = brotli.compress(cuerpo)
+    return {"variantes": variantes, "etag": hashlib.sha256(cuerpo).hexdigest()[:32]}
+
+
+def responder(pagina, request, response_class, mimetype="text/html", cache_control=CACHE_CONTROL):
+    """Respuesta con la mejor variante que acepte el cliente; 304 si ya tiene la versión actual."""
+    codificacion = "identity"
+    for candidata in ("br", "gzip"):
+        if candidata in pagina["variantes"] and candidata in request.accept_encodings:
+            codificacion = candidata
+            break
+    # Un ETag fuerte distinto por codificación: cada variante es una representación diferente
+    etag = f"{pagina['etag']}-{codificacion}"
+    resp = response_class(mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    resp.vary.add("Accept-Encoding")
+    if request.if_none_match.contains(etag):
+        resp.status_code = 304
+        return resp
+    resp.set_data(pagina["variantes"][codificacion])
+    if codificacion != "identity":
+        resp.headers["Content-Encoding"] = codificacion
+    return resp
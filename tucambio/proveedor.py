@@ -0,0 +1,227 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+# --- CLIENTE DEL PROVEEDOR DE TASAS ---
+# Sesión HTTP compartida (keep-alive + pool), peticiones condicionales con ETag,
+# respeto de `time_next_update_unix`, reintentos con jitter y circuit breaker.
+API_URL = "https://open.er-api.com/v6/latest/{}"
+TIMEOUT = 3  # segundos por intento
+REINTENTOS = 2  # intentos extra ante errores de red o 5xx
+BACKOFF_BASE = 0.25  # segundos; se dobla en cada reintento y se le suma jitter
+FALLOS_PARA_ABRIR = 5  # fallos seguidos que abren el circuito
+ENFRIAMIENTO = 60  # segundos con el circuito abierto antes de volver a probar
+POOL_CONEXIONES = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+# Clientes vivos, para darles conexiones propias en cada proceso hijo tras un fork
+_clientes = weakref.WeakSet()
+
+
+def _tras_fork():
+    for cliente in list(_clientes):
+        cliente._tras_fork()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+class ErrorProveedor(Exception):
+    """El proveedor no devolvió tasas válidas."""
+
+
+class CircuitoAbierto(ErrorProveedor):
+    """Demasiados fallos seguidos: no se llama al proveedor hasta que pase el enfriamiento."""
+
+
+class ProveedorER:
+    """Cliente de open.er-api.com que reutiliza conexiones y evita descargas innecesarias."""
+
+    def __init__(self, api_url=API_URL, pool=POOL_CONEXIONES):
+        self.api_url = api_url
+        self.pool = pool
+        self._conectar()
+        self._lock = threading.Lock()
+        # base -> {"rates": {...}, "etag": str | None, "proxima": unix ts de la siguiente actualización}
+        self._respuestas = {}
+        self._fallos_seguidos = 0
+        self._abierto_hasta = 0
+        _clientes.add(self)
+
+    def _conectar(self):
+        """Crea la sesión HTTP (y su pool de conexiones); requests se importa aquí, no al cargar el módulo."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=self.pool, pool_maxsize=self.pool)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+
+    def _tras_fork(self):
+        """En el proceso hijo: conexiones y cerrojo propios (los sockets del padre no se comparten); se conservan ETags y tasas."""
+        self._conectar()
+        self._lock = threading.Lock()
+
+    def _comprobar_circuito(self):
+        with self._lock:
+            if self._fallos_seguidos >= FALLOS_PARA_ABRIR and time.time() < self._abierto_hasta:
+                raise CircuitoAbierto(f"Circuito abierto durante {int(self._abierto_hasta - time.time())} s más")
+
+    def _registrar_resultado(self, ok):
+        with self._lock:
+            if ok:
+                self._fallos_seguidos = 0
+            else:
+                self._fallos_seguidos += 1
+                if self._fallos_seguidos >= FALLOS_PARA_ABRIR:
+                    self._abierto_hasta = time.time() + ENFRIAMIENTO
+
+    def _previa(self, base):
+        """Última respuesta guardada de `base`, o None."""
+        with self._lock:
+            return self._respuestas.get(base)
+
+    def _cabeceras(self, previa):
+        """Cabeceras de una petición condicional (If-None-Match con el ETag de la respuesta previa)."""
+        if previa and previa.get("etag"):
+            return {"If-None-Match": previa["etag"]}
+        return {}
+
+    def _pedir(self, base, timeout, previa):
+        """Una petición HTTP; devuelve la respuesta o lanza si hay que reintentar."""
+        resp = self.sesion.get(self.api_url.format(base), headers=self._cabeceras(previa), timeout=timeout)
+        if resp.status_code >= 500:
+            raise ErrorProveedor(f"HTTP {resp.status_code} del proveedor para {base}")
+        return resp
+
+    def _procesar(self, base, resp, previa):
+        """Extrae las tasas de la respuesta (o reutiliza las previas ante un 304) y actualiza el circuito."""
+        if resp.status_code == 304 and previa:
+            self._registrar_resultado(True)
+            return previa["rates"]
+        try:
+            resp.raise_for_status()
+            datos = resp.json()
+            if datos.get("result") != "success":
+                raise ErrorProveedor(f"Respuesta no válida de la API para {base}")
+            rates = {codigo: float(valor) for codigo, valor in datos["rates"].items()}
+        except Exception:
+            self._registrar_resultado(False)
+            raise
+        self._registrar_resultado(True)
+        with self._lock:
+            self._respuestas[base] = {
+                "rates": rates,
+                "etag": resp.headers.get("ETag"),
+                "proxima": float(datos.get("time_next_update_unix") or 0),
+            }
+        return rates
+
+    def descargar(self, base, timeout=TIMEOUT):
+        """Devuelve el diccionario completo de tasas de `base` (unidades de cada moneda por 1 `base`)."""
+        previa = self._previa(base)
+        # El proveedor publica cuándo habrá datos nuevos: antes de eso no hace falta ir a la red
+        if previa and time.time() < previa["proxima"]:
+            return previa["rates"]
+        self._comprobar_circuito()
+
+        for intento in range(REINTENTOS + 1):
+            try:
+                resp = self._pedir(base, timeout, previa)
+                break
+            except (self._requests.exceptions.ConnectionError, self._requests.exceptions.Timeout, ErrorProveedor):
+                if intento == REINTENTOS:
+                    self._registrar_resultado(False)
+                    raise
+                espera = BACKOFF_BASE * (2 ** intento)
+                time.sleep(espera + random.uniform(0, espera))
+        return self._procesar(base, resp, previa)
+
+    async def descargar_async(self, base, timeout=TIMEOUT):
+        """Como `descargar`, sin bloquear el bucle de eventos (la petición va en un hilo)."""
+        return await asyncio.to_thread(self.descargar, base, timeout)
+
+    async def cerrar(self):
+        self.sesion.close()
+
+
+class ProveedorERAsync(ProveedorER):
+    """
+    Mismo cliente (ETag, `time_next_update_unix`, reintentos y circuit breaker) sobre httpx.AsyncClient, para el modo ASGI: una descarga lenta no ocupa ningún hilo.
+    """
+
+    def _conectar(self):
+        super()._conectar()
+        import httpx
+
+        self._httpx = httpx
+        self.cliente = httpx.AsyncClient(
+            headers=dict(self.sesion.headers),
+            limits=httpx.Limits(max_connections=self.pool, max_keepalive_connections=self.pool),
+        )
+
+    async def _pedir_async(self, base, timeout, previa):
+        resp = await self.cliente.get(self.api_url.format(base), headers=self._cabeceras(previa), timeout=timeout)
+        if resp.status_code >= 500:
+            raise ErrorProveedor(f"HTTP {resp.status_code} del proveedor para {base}")
+        return resp
+
+    async def descargar_async(self, base, timeout=TIMEOUT):
+        previa = self._previa(base)
+        if previa and time.time() < previa["proxima"]:
+            return previa["rates"]
+        self._comprobar_circuito()
+
+        for intento in range(REINTENTOS + 1):
+            try:
+                resp = await self._pedir_async(base, timeout, previa)
+                break
+            except (self._httpx.TransportError, ErrorProveedor):
+                if intento == REINTENTOS:
+                    self._registrar_resultado(False)
+                    raise
+                espera = BACKOFF_BASE * (2 ** intento)
+                await asyncio.sleep(espera + random.uniform(0, espera))
+        return self._procesar(base, resp, previa)
+
+    async def cerrar(self):
+        await self.cliente.aclose()
+        self.sesion.close()
+
+
+class ProveedorFalso:
+    """Proveedor local sin red para pruebas y benchmarks, con latencia y tasa de fallos configurables."""
+
+    def __init__(self, rates_usd=None, latencia=0.0, tasa_fallos=0.0):
+        self.rates_usd = rates_usd or {"USD": 1.0, "EUR": 0.92}
+        self.latencia = latencia
+        self.tasa_fallos = tasa_fallos
+        self.llamadas = 0
+
+    def _tasas(self, base):
+        self.llamadas += 1
+        if random.random() < self.tasa_fallos:
+            raise ErrorProveedor("Fallo simulado del proveedor")
+        if base not in self.rates_usd:
+            raise ErrorProveedor(f"Moneda base desconocida: {base}")
+        por_base = self.rates_usd[base]
+        return {codigo: valor / por_base for codigo, valor in self.rates_usd.items()}
+
+    def descargar(self, base, timeout=TIMEOUT):
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self._tasas(base)
+
+    async def descargar_async(self, base, timeout=TIMEOUT):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return self._tasas(base)
+
+    async def cerrar(self):
+        pass
@@ -0,0 +1,178 @@
+"""
+Recursos estáticos con huella de contenido.
+
+    python -m tucambio.recursos
+
+descarga a static/vendor/ los recursos que hoy se piden a CDNs externos, copia esos
+recursos y los locales a static/dist/ con el hash del contenido en el nombre (más
+sus variantes .gz y, si está instalado brotli, .br) y escribe static/dist/manifest.json.
+Al arrancar, las apps solo leen ese manifiesto; si no existe siguen usando las URLs externas.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from . import pagina
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+DIR_STATIC = os.path.join(RAIZ, "static")
+DIR_VENDOR = os.path.join(DIR_STATIC, "vendor")
+DIR_DIST = os.path.join(DIR_STATIC, "dist")
+MANIFIESTO = os.path.join(DIR_DIST, "manifest.json")
+URL_DIST = "/activos/"
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+# nombre lógico -> URL externa de la que se descarga (y que se usa si no hay build)
+EXTERNOS = {
+    "choices.min.css": "https://cdn.jsdelivr.net/npm/choices.js/public/assets/styles/choices.min.css",
+    "choices.min.js": "https://cdn.jsdelivr.net/npm/choices.js/public/assets/scripts/choices.min.js",
+    "fondo-app.jpg": "https://images.unsplash.com/photo-1464983953574-0892a716854b?auto=format&fit=crop&w=1400&q=80",
+    "fondo-web.jpg": "https://images.unsplash.com/photo-1506744038136-46273834b3fb?auto=format&fit=crop&w=1200&q=80",
+}
+# nombre lógico -> ruta local dentro de static/
+LOCALES = {
+    "manifest.webmanifest": "manifest.webmanifest",
+    "conversor.js": "conversor.js",
+}
+TIPOS_COMPRIMIBLES = (".css", ".js", ".json", ".webmanifest", ".svg", ".html")
+
+# nombre lógico -> nombre con huella (p. ej. "choices.min.3f2a9c1d0e.js")
+_manifiesto = {}
+
+
+def _con_huella(nombre, contenido):
+    raiz, extension = os.path.splitext(nombre)
+    return f"{raiz}.{hashlib.sha256(contenido).hexdigest()[:10]}{extension}"
+
+
+def descargar_externos():
+    """Descarga a static/vendor/ los recursos externos que aún no estén ahí (los que fallen seguirán siendo externos)."""
+    import requests
+
+    os.makedirs(DIR_VENDOR, exist_ok=True)
+    for nombre, url_externa in EXTERNOS.items():
+        destino = os.path.join(DIR_VENDOR, nombre)
+        if os.path.exists(destino):
+            continue
+        try:
+            resp = requests.get(url_externa, timeout=30)
+            resp.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"No se pudo descargar {nombre}: {e}")
+            continue
+        with open(destino, "wb") as f:
+            f.write(resp.content)
+
+
+def construir():
+    """Genera static/dist/ (archivos con huella y variantes comprimidas) y su manifest.json."""
+    os.makedirs(DIR_DIST, exist_ok=True)
+    origenes = {nombre: os.path.join(DIR_VENDOR, nombre) for nombre in EXTERNOS}
+    origenes.update({nombre: os.path.join(DIR_STATIC, ruta) for nombre, ruta in LOCALES.items()})
+    manifiesto = {}
+    for nombre, ruta in origenes.items():
+        if not os.path.exists(ruta):
+            continue
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        final = _con_huella(nombre, contenido)
+        variantes = {"": contenido}
+        if nombre.endswith(TIPOS_COMPRIMIBLES):
+            variantes[".gz"] = gzip.compress(contenido, compresslevel=9, mtime=0)
+            if pagina.brotli is not None:
+                variantes[".br"] = pagina.brotli.compress(contenido)
+        for sufijo, datos in variantes.items():
+            with open(os.path.join(DIR_DIST, final + sufijo), "wb") as f:
+                f.write(datos)
+        manifiesto[nombre] = final
+    with open(MANIFIESTO, "w") as f:
+        json.dump(manifiesto, f, indent=2, sort_keys=True)
+    return manifiesto
+
+
+def cargar():
+    """Lee static/dist/manifest.json (si existe) para resolver los nombres lógicos de los recursos."""
+    _manifiesto.clear()
+    if os.path.exists(MANIFIESTO):
+        with open(MANIFIESTO) as f:
+            _manifiesto.update(json.load(f))
+    return dict(_manifiesto)
+
+
+def url(nombre):
+    """URL de un recurso: la versión local con huella si se construyó, si no la externa (o la de /static/)."""
+    if nombre in _manifiesto:
+        return URL_DIST + _manifiesto[nombre]
+    if nombre in EXTERNOS:
+        return EXTERNOS[nombre]
+    return "/static/" + LOCALES.get(nombre, nombre)
+
+
+def nombre_cache_sw():
+    """CACHE_NAME del service worker: cambia en cuanto cambia cualquier recurso con huella."""
+    huella = hashlib.sha256(json.dumps(_manifiesto, sort_keys=True).encode()).hexdigest()[:10]
+    return f"conv-{huella}"
+
+
+def generar_sw(urls_extra=("/", "/tasas.json")):
+    """Código de static/sw.js con CACHE_NAME y URLS_TO_CACHE generados a partir del manifiesto."""
+    with open(os.path.join(DIR_STATIC, "sw.js")) as f:
+        codigo = f.read()
+    urls = list(urls_extra) + [url(nombre) for nombre in sorted(set(EXTERNOS) | set(LOCALES)) if not nombre.endswith(".jpg")]
+    codigo = re.sub(r"const CACHE_NAME = .*?;", f"const CACHE_NAME = {json.dumps(nombre_cache_sw())};", codigo, count=1)
+    codigo = re.sub(
+        r"const URLS_TO_CACHE = \[.*?\];", f"const URLS_TO_CACHE = {json.dumps(urls, indent=2)};", codigo, count=1, flags=re.S
+    )
+    return codigo
+
+
+def ruta_dist(nombre_final, codificacion=""):
+    """Ruta en disco de un archivo de static/dist/ (con sufijo .gz/.br para sus variantes), o None si no es nuestro."""
+    if nombre_final not in _manifiesto.values():
+        return None
+    ruta = os.path.join(DIR_DIST, nombre_final + codificacion)
+    return ruta if os.path.exists(ruta) else None
+
+
+def registrar_rutas(app):
+    """Añade a `app` la ruta de los recursos con huella (caché inmutable) y /sw.js generado desde el manifiesto."""
+    from flask import abort, request
+
+    servidos = {}
+
+    @app.route(URL_DIST + "<nombre>")
+    def activo(nombre):
+        if nombre not in servidos:
+            ruta = ruta_dist(nombre)
+            if ruta is None:
+                abort(404)
+            variantes = {}
+            for codificacion, sufijo in (("identity", ""), ("gzip", ".gz"), ("br", ".br")):
+                ruta_variante = ruta_dist(nombre, sufijo)
+                if ruta_variante:
+                    with open(ruta_variante, "rb") as f:
+                        variantes[codificacion] = f.read()
+            # La huella del nombre ya identifica el contenido
+            servidos[nombre] = {"variantes": variantes, "etag": nombre.rsplit(".", 2)[-2]}
+        mimetype = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+        if nombre.endswith(".webmanifest"):
+            mimetype = "application/manifest+json"
+        return pagina.responder(servidos[nombre], request, app.response_class, mimetype=mimetype, cache_control=CACHE_INMUTABLE)
+
+    @app.route("/sw.js")
+    def service_worker():
+        if "sw.js" not in servidos:
+            servidos["sw.js"] = pagina.preparar(generar_sw())
+        resp = pagina.responder(
+            servidos["sw.js"], request, app.response_class, mimetype="application/javascript", cache_control="no-cache"
+        )
+        resp.headers["Service-Worker-Allowed"] = "/"
+        return resp
+
+
+if __name__ == "__main__":
+    descargar_externos()
+    print(json.dumps(construir(), indent=2))
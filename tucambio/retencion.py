@@ -0,0 +1,188 @@
+"""
+Retención del historial: mantiene `historial` pequeño y caliente archivando las filas
+antiguas en ficheros mensuales comprimidos (formato columnar de tucambio.exportar,
+legibles con exportar.leer_columnar).
+
+    python -m tucambio retencion --dias 90 --filas 1000000
+    python -m tucambio retencion --vacuum-completo      # una vez, para activar auto_vacuum en una base antigua
+
+Políticas (variables de entorno; sin ninguna, el programador no archiva nada):
+TUCAMBIO_RETENCION_DIAS (archivar lo que tenga más días), TUCAMBIO_RETENCION_FILAS
+(dejar como mucho esas filas), TUCAMBIO_ARCHIVO (directorio de los ficheros, por defecto
+archivo/ junto a la base) y TUCAMBIO_RETENCION_INTERVALO (segundos entre pasadas).
+
+Cada lote se escribe en su fichero, se sincroniza a disco y se borra de `historial` en
+una transacción corta, con una pausa entre lotes para que entren los escritores; después
+se devuelven las páginas libres poco a poco con incremental_vacuum. Los acumulados de
+/estadisticas no se tocan: siguen contando las conversiones archivadas (si en una base
+antigua aún no estaban completos, la pasada los termina de rellenar antes de archivar).
+"""
+import os
+import random
+import threading
+import time
+
+from . import database, estadisticas, exportar, metricas
+
+DIAS = int(os.environ["TUCAMBIO_RETENCION_DIAS"]) if os.environ.get("TUCAMBIO_RETENCION_DIAS") else None
+MAX_FILAS = int(os.environ["TUCAMBIO_RETENCION_FILAS"]) if os.environ.get("TUCAMBIO_RETENCION_FILAS") else None
+DIRECTORIO = os.environ.get("TUCAMBIO_ARCHIVO")  # None: archivo/ junto a la base de datos
+INTERVALO = int(os.environ.get("TUCAMBIO_RETENCION_INTERVALO", 3600))
+COMPROBACION = 60  # segundos entre intentos de cada proceso de tomar el turno
+TURNO = 300  # segundos de turno, renovado en cada lote
+LOTE = 5000  # filas por transacción
+PAUSA = 0.05  # segundos entre lotes
+PAGINAS_VACUUM = 1000  # páginas por paso de incremental_vacuum
+TRABAJO = "retencion"
+
+_ARCHIVADAS = metricas.contador("tucambio_retencion_filas_total", "Filas del historial archivadas y borradas.")
+
+_hilo = None
+_hilo_pid = None
+_hilo_lock = threading.Lock()
+_detener = threading.Event()
+
+
+def directorio():
+    return DIRECTORIO or os.path.join(os.path.dirname(os.path.abspath(database.DB_PATH)), "archivo")
+
+
+def _anexar(ruta, confirmado, datos):
+    """
+    Recorta el fichero a los `confirmado` bytes (lo de una pasada que no llegó a confirmarse), le añade `datos` (con cabecera si está vacío) y lo sincroniza a disco. Devuelve el tamaño nuevo.
+    """
+    with open(ruta, "r+b" if os.path.exists(ruta) else "w+b") as f:
+        f.truncate(confirmado)
+        f.seek(confirmado)
+        if confirmado == 0:
+            f.write(exportar.cabecera_columnar())
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _nombre_archivo(carpeta, mes):
+    """
+    Fichero del mes al que añadir filas: historial-AAAA-MM.tcol o, si ese se empezó con otras columnas (la cabecera no coincide con la actual) o ya no está entero en disco, el siguiente historial-AAAA-MM.N.tcol que sí sirva.
+    """
+    cabecera = exportar.cabecera_columnar()
+    n = 0
+    while True:
+        nombre = f"historial-{mes}.tcol" if n == 0 else f"historial-{mes}.{n}.tcol"
+        confirmado, filas = database.archivo_confirmado(nombre)
+        if confirmado == 0:
+            return nombre
+        ruta = os.path.join(carpeta, nombre)
+        try:
+            with open(ruta, "rb") as f:
+                if os.fstat(f.fileno()).st_size < confirmado:
+                    # Alargarlo con ceros hasta lo confirmado lo dejaría ilegible
+                    print(f"Aviso: {ruta} tiene menos de los {confirmado} bytes confirmados; el archivo del mes sigue en otro fichero")
+                elif f.read(len(cabecera)) == cabecera:
+                    return nombre
+        except FileNotFoundError:
+            print(f"Aviso: falta {ruta} ({filas} filas archivadas); el archivo del mes sigue en otro fichero")
+        n += 1
+
+
+def _archivar_lote(filas, carpeta):
+    """Añade `filas` a los ficheros de su mes y las borra de `historial` confirmando los ficheros en la misma transacción."""
+    por_mes = {}
+    for fila in filas:
+        por_mes.setdefault(time.strftime("%Y-%m", time.gmtime(fila[6])), []).append(fila)
+    archivos = {}
+    for mes, filas_mes in por_mes.items():
+        nombre = _nombre_archivo(carpeta, mes)
+        confirmado, filas_previas = database.archivo_confirmado(nombre)
+        tamano = _anexar(os.path.join(carpeta, nombre), confirmado, exportar.grupo_columnar(filas_mes))
+        archivos[nombre] = (tamano, filas_previas + len(filas_mes))
+    database.confirmar_archivado(filas[0][0], filas[-1][0], archivos)
+    return list(archivos)
+
+
+def aplicar(dias=DIAS, max_filas=MAX_FILAS, carpeta=None, renovar=None):
+    """
+    Archiva y borra lo que sobre según las políticas y libera espacio. Devuelve un resumen con las filas archivadas, los ficheros tocados y las páginas liberadas.
+    """
+    carpeta = carpeta or directorio()
+    antes_de = None
+    if dias is not None:
+        antes_de = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - dias * 86400))
+    # Lo archivado ya no se puede sumar a los acumulados de /estadisticas: antes hay que
+    # terminar de rellenarlos con el historial anterior a su creación (por tramos cortos)
+    pendiente_hasta, relleno_hasta = database.estado_volumen()
+    while relleno_hasta < pendiente_hasta:
+        relleno_hasta, pendiente_hasta = database.rellenar_volumen(estadisticas.LOTE_RELLENO)
+        if renovar:
+            renovar()
+        time.sleep(PAUSA)
+    limite = database.limite_retencion(antes_de, max_filas)
+    archivadas = 0
+    ficheros = set()
+    while limite:
+        filas = database.filas_para_archivar(limite, LOTE)
+        if not filas:
+            break
+        os.makedirs(carpeta, exist_ok=True)
+        ficheros.update(_archivar_lote(filas, carpeta))
+        archivadas += len(filas)
+        _ARCHIVADAS.inc(len(filas))
+        if renovar:
+            renovar()
+        time.sleep(PAUSA)
+    liberadas = 0
+    while True:
+        paso = database.vacuum_incremental(PAGINAS_VACUUM)
+        liberadas += paso
+        if paso < PAGINAS_VACUUM:
+            break
+        time.sleep(PAUSA)
+    return {"archivadas": archivadas, "ficheros": sorted(ficheros), "paginas_liberadas": liberadas}
+
+
+# --- PROGRAMADOR ---
+def _bucle():
+    """Cada COMPROBACION segundos intenta tomar el turno; solo un proceso ejecuta la pasada, como mucho una vez por INTERVALO."""
+    dueno = f"{os.getpid()}-{threading.get_ident()}"
+    _detener.wait(random.uniform(0, COMPROBACION))  # repartir los intentos de los workers
+    while not _detener.is_set():
+        try:
+            if database.tomar_turno_trabajo(TRABAJO, dueno, TURNO, INTERVALO):
+                try:
+                    resumen = aplicar(renovar=lambda: database.renovar_turno_trabajo(TRABAJO, dueno, TURNO))
+                    if resumen["archivadas"]:
+                        print(f"Retención: {resumen}")
+                finally:
+                    database.terminar_turno_trabajo(TRABAJO, dueno)
+        except Exception as e:
+            print(f"Error en la retención del historial: {e}")
+        _detener.wait(COMPROBACION)
+    database.cerrar_conexion()
+
+
+def iniciar():
+    """Arranca el hilo de retención en este proceso si hay alguna política configurada (una sola vez por proceso)."""
+    global _hilo, _hilo_pid
+    if DIAS is None and MAX_FILAS is None:
+        return
+    with _hilo_lock:
+        if _hilo is None or _hilo_pid != os.getpid() or not _hilo.is_alive():
+            _detener.clear()
+            _hilo = threading.Thread(target=_bucle, name="retencion-historial", daemon=True)
+            _hilo_pid = os.getpid()
+            _hilo.start()
+
+
+def _tras_fork():
+    """En el proceso hijo: cerrojo y evento propios; la pasada la sigue haciendo el proceso que arrancó el hilo."""
+    global _hilo_lock, _detener
+    _hilo_lock = threading.Lock()
+    _detener = threading.Event()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def detener():
+    _detener.set()
@@ -0,0 +1,111 @@
+"""
+Arranque de producción: gunicorn con la app precargada en el proceso maestro.
+
+    python -m tucambio serve --workers 4 --frontend web    # tucambio.asgi con workers de uvicorn
+    python -m tucambio serve --gthread --hilos 8           # tucambio.wsgi con workers de hilos
+
+Por defecto cada worker es un bucle de eventos (tucambio.asgi): /convertir, /historial,
+/health, /metrics y /tasas/stream son nativos, así que miles de flujos SSE abiertos no
+ocupan ningún hilo, y el resto de rutas (página, recursos, /sw.js, /tasas.json, lotes,
+matriz, estadísticas, exportación...) lo atiende la app Flask de la interfaz elegida en
+un pool de TUCAMBIO_HILOS hilos. Con --gthread todo lo sirve Flask en hilos y cada flujo
+SSE ocupa uno, así que los flujos por worker se limitan (ver eventos.MAX_FLUJOS).
+
+El maestro crea la app, crea la base de datos y deja la tabla de tasas en memoria
+antes de crear los workers, que la heredan ya caliente (copy-on-write). Cada módulo con
+estado (tasas, escritor_historial, proveedor, database...) rehace sus cerrojos, hilos y
+conexiones en el hijo con os.register_at_fork.
+
+Recarga sin cortar peticiones: `kill -HUP <pid del maestro>` sustituye los workers de
+forma escalonada (los viejos terminan lo que tienen en curso). Como la app está precargada,
+para cargar código nuevo `kill -USR2` arranca un maestro nuevo junto al viejo y después
+`kill -QUIT` al viejo lo retira cuando el nuevo ya atiende.
+
+Variables de entorno: HOST, PORT, WEB_CONCURRENCY (workers), TUCAMBIO_HILOS (hilos por
+worker), TUCAMBIO_MAX_FLUJOS (flujos SSE por worker con --gthread; por defecto la mitad de
+los hilos), TUCAMBIO_TIMEOUT y TUCAMBIO_TIMEOUT_RECARGA (segundos) y TUCAMBIO_METRICAS_DIR
+(dónde juntan los workers sus métricas; por defecto un directorio temporal nuevo por arranque).
+"""
+import os
+import shutil
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 5000))
+HILOS = int(os.environ.get("TUCAMBIO_HILOS", 4))
+TIMEOUT = int(os.environ.get("TUCAMBIO_TIMEOUT", 30))
+TIMEOUT_RECARGA = int(os.environ.get("TUCAMBIO_TIMEOUT_RECARGA", 30))  # lo que espera un worker viejo a terminar
+
+
+def workers_por_defecto():
+    """WEB_CONCURRENCY, o 2 × núcleos + 1 (el valor recomendado por gunicorn)."""
+    return int(os.environ.get("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1))
+
+
+def precargar(frontend="clasico", asgi=True):
+    """Crea la app en el maestro (con la base de datos lista) y calienta la tabla de tasas antes del fork."""
+    from . import conversion, tasas
+
+    if asgi:
+        from . import asgi as modulo_asgi
+
+        modulo_asgi.montar_frontend(frontend)
+        app = modulo_asgi.app
+    else:
+        from .wsgi import crear_app
+
+        app = crear_app(frontend)
+    if tasas.obtener_tabla(conversion.CODIGOS_MONEDAS) is None:
+        print("Aviso: arranque sin tabla de tasas; los workers la descargarán")
+    return app
+
+
+class Servidor(BaseApplication):
+    """Aplicación de gunicorn configurada desde código en lugar de desde la línea de órdenes."""
+
+    def __init__(self, frontend, asgi, opciones):
+        self.frontend = frontend
+        self.asgi = asgi
+        self.opciones = opciones
+        super().__init__()
+
+    def load_config(self):
+        for clave, valor in self.opciones.items():
+            self.cfg.set(clave, valor)
+
+    def load(self):
+        return precargar(self.frontend, self.asgi)
+
+
+def servir(frontend="clasico", workers=None, hilos=HILOS, host=HOST, puerto=PORT, asgi=True):
+    """Arranca gunicorn con la app precargada y la interfaz `frontend`: con workers de uvicorn (`asgi`) o de hilos."""
+    from . import asgi as modulo_asgi, eventos
+
+    if asgi:
+        modulo_asgi.HILOS_WSGI = hilos
+    elif eventos.MAX_FLUJOS is None:
+        # Que los flujos SSE nunca se queden con todos los hilos del worker
+        eventos.MAX_FLUJOS = max(1, hilos // 2)
+    opciones = {
+        "bind": f"{host}:{puerto}",
+        "workers": workers or workers_por_defecto(),
+        "worker_class": "uvicorn.workers.UvicornWorker" if asgi else "gthread",
+        "threads": hilos,
+        "preload_app": True,
+        "timeout": TIMEOUT,
+        "graceful_timeout": TIMEOUT_RECARGA,
+        "keepalive": 5,
+    }
+    from . import metricas
+
+    temporal = None
+    if not metricas.DIRECTORIO:
+        # Cada worker vuelca aquí sus métricas y /metrics las suma todas
+        temporal = metricas.DIRECTORIO = tempfile.mkdtemp(prefix="tucambio-metricas-")
+    try:
+        Servidor(frontend, asgi, opciones).run()
+    finally:
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
@@ -0,0 +1,80 @@
+// Conversión en el navegador a partir de la instantánea de tasas de /tasas.json.
+// Las tasas vienen respecto a una moneda pivote: origen→destino = tasas[destino] / tasas[origen],
+// igual que en el servidor (tasas.construir_matriz).
+const Conversor = (() => {
+  let instantanea = null;
+
+  function cargar() {
+    return fetch('/tasas.json')
+      .then(response => response.json())
+      .then(datos => { instantanea = datos; return datos; });
+  }
+
+  function actualizar(datos) {
+    instantanea = datos;
+  }
+
+  function disponible() {
+    return instantanea !== null;
+  }
+
+  function tasa(origen, destino) {
+    const tasas = instantanea && instantanea.tasas;
+    if (!tasas || !tasas[origen] || !tasas[destino]) return null;
+    return tasas[destino] / tasas[origen];
+  }
+
+  // Mismo formato que el servidor: separador de miles "," y punto decimal
+  function formatear(valor, decimales) {
+    return valor.toLocaleString('en-US', { minimumFractionDigits: decimales, maximumFractionDigits: decimales });
+  }
+
+  function decimalesDe(moneda) {
+    return instantanea.sin_decimales.includes(moneda) ? 0 : 2;
+  }
+
+  // Redondeo a `decimales` con la mitad hacia arriba sobre el número tal como se escribe
+  // (1.005 -> 1.01), igual que conversion.REDONDEO en el servidor. Lo que JavaScript ya
+  // escribe con exponente (< 1e-6) redondea a 0
+  function redondear(valor, decimales) {
+    const redondeado = Number(Math.round(Number(`${valor}e${decimales}`)) + `e-${decimales}`);
+    return Number.isNaN(redondeado) ? 0 : redondeado;
+  }
+
+  // Misma regla que el servidor (conversion.leer_cantidad): la cantidad se redondea a la
+  // unidad mínima de la moneda de origen antes de convertirla, y es la que se devuelve
+  function convertir(cantidad, origen, destino) {
+    const t = tasa(origen, destino);
+    if (t === null || !(cantidad > 0)) return null;
+    cantidad = redondear(cantidad, decimalesDe(origen));
+    if (!(cantidad > 0)) return null;
+    const decimales = decimalesDe(destino);
+    const valor = redondear(cantidad * t, decimales);
+    return {
+      cantidad: cantidad,
+      resultado: `${formatear(valor, decimales)} ${instantanea.nombres[destino] || destino}`,
+      tasa: formatear(t, 6),
+    };
+  }
+
+  // Recibe por /tasas/stream la instantánea al conectar y luego solo las tasas que cambian
+  function suscribir(alCambiar) {
+    if (!('EventSource' in window)) return null;
+    const fuente = new EventSource('/tasas/stream');
+    fuente.addEventListener('tasas', (e) => {
+      instantanea = JSON.parse(e.data);
+      alCambiar();
+    });
+    fuente.addEventListener('diff', (e) => {
+      const cambios = JSON.parse(e.data);
+      if (!instantanea) return;
+      Object.assign(instantanea.tasas, cambios.tasas);
+      instantanea.version = cambios.version;
+      instantanea.timestamp = cambios.timestamp;
+      alCambiar();
+    });
+    return fuente;
+  }
+
+  return { cargar, actualizar, suscribir, disponible, tasa, convertir, formatear, get instantanea() { return instantanea; } };
+})();
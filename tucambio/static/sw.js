@@ -0,0 +1,77 @@
+const CACHE_NAME = 'conv-1.0.0';
+const URLS_TO_CACHE = [
+  '/',
+  '/static/manifest.webmanifest',
+  'https://cdn.jsdelivr.net/npm/choices.js/public/assets/styles/choices.min.css',
+  'https://cdn.jsdelivr.net/npm/choices.js/public/assets/scripts/choices.min.js'
+];
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(
+    caches.open(CACHE_NAME).then((cache) => cache.addAll(URLS_TO_CACHE))
+  );
+});
+
+self.addEventListener('activate', (event) => {
+  event.waitUntil(
+    caches.keys().then(keys => Promise.all(keys.map(k => k !== CACHE_NAME ? caches.delete(k) : null)))
+  );
+});
+
+self.addEventListener('fetch', (event) => {
+  const req = event.request;
+  const url = new URL(req.url);
+  // El flujo SSE de tasas va directo a la red, sin pasar por la caché
+  if (url.pathname === '/tasas/stream') {
+    return;
+  }
+  // Conversiones e historial: siempre a la red (un POST no se puede cachear);
+  // sin conexión se responde con un error JSON y la página convierte en local
+  if (url.pathname.startsWith('/convertir')) {
+    event.respondWith(
+      fetch(req).catch(() => new Response(
+        JSON.stringify({ error: 'Sin conexión.' }),
+        { status: 503, headers: { 'Content-Type': 'application/json' } }
+      ))
+    );
+    return;
+  }
+  // Páginas: primero la red, para que cada despliegue se vea en cuanto se publica (/sw.js
+  // no cambia si solo cambia el HTML); la copia guardada solo se usa sin conexión
+  if (req.mode === 'navigate') {
+    event.respondWith(
+      fetch(req).then((res) => {
+        if (res.ok) {
+          const copia = res.clone();
+          event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.put(req, copia)));
+        }
+        return res;
+      }).catch(() => caches.match(req).then((res) => res || caches.match('/')))
+    );
+    return;
+  }
+  // Instantánea de tasas: stale-while-revalidate (responde al momento con la copia
+  // guardada y la renueva en segundo plano)
+  if (url.pathname === '/tasas.json') {
+    event.respondWith(
+      caches.open(CACHE_NAME).then((cache) =>
+        cache.match(req).then((guardada) => {
+          const red = fetch(req).then((res) => {
+            if (res.ok) cache.put(req, res.clone());
+            return res;
+          });
+          if (guardada) {
+            event.waitUntil(red.catch(() => null));
+            return guardada;
+          }
+          return red;
+        })
+      )
+    );
+    return;
+  }
+  // Cache-first para estáticos (los de /activos/ llevan huella en el nombre)
+  event.respondWith(
+    caches.match(req).then(res => res || fetch(req))
+  );
+});
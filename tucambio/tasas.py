@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import database, historico, metricas, proveedor
+
+# --- MOTOR DE TASAS CRUZADAS ---
+# Una sola descarga por moneda base trae todas sus tasas; el resto de pares
+# se obtienen por triangulación (A→B = A→base / B→base) sin volver a la API.
+MONEDA_PIVOTE = "USD"
+CACHE_TTL = 20 * 60  # 20 min en segundos
+REFRESCO_ANTICIPADO = 2 * 60  # refrescar en segundo plano 2 min antes de caducar
+REINTENTO_ERROR = 30  # segundos entre reintentos si la API falla
+ESPERA_MAXIMA = 5  # segundos que un hilo espera a la descarga que ya hizo otro
+TURNO_ESCRITOR = 30  # segundos que un proceso se reserva para descargar y publicar una tabla
+
+# base -> tabla de `construir_tabla`: {"rates", "matriz", "codigos", "filas", "version", "timestamp"}
+TASAS_CACHE = {}
+
+# Single-flight: como mucho una descarga en curso por base; el resto de hilos comparte su resultado.
+# base -> {"hecho": threading.Event(), "ok": bool}
+_refrescos_lock = threading.Lock()
+_vuelos = {}
+_refrescadores = {}
+_codigos_refresco = {}  # base -> monedas de su hilo de refresco (para rearrancarlo tras un fork)
+_ultimo_intento = {}
+
+# Aviso a quien espera cambios de tasas (p. ej. los flujos SSE de /tasas/stream)
+_cambio = threading.Condition()
+# Funciones sin argumentos a las que se llama tras cada publicación (p. ej. el aviso al bucle de asgi.py)
+_oyentes = []
+
+# Lecturas de la tabla en memoria para /metrics: hit (fresca), stale (caducada, servida igualmente) y miss (sin tabla)
+_LECTURAS = {
+    resultado: metricas.contador("tucambio_tasas_cache_total", "Lecturas de la tabla de tasas en memoria.", resultado=resultado)
+    for resultado in ("hit", "stale", "miss")
+}
+
+# Cliente del proveedor de tasas (se crea con la primera descarga); se puede sustituir
+# por un proveedor.ProveedorFalso en pruebas
+PROVEEDOR = None
+
+
+def configurar_proveedor(nuevo):
+    """Sustituye el proveedor de tasas (p. ej. por uno local para pruebas o benchmarks)."""
+    global PROVEEDOR
+    PROVEEDOR = nuevo
+
+
+def descargar_tasas(base=MONEDA_PIVOTE, timeout=proveedor.TIMEOUT):
+    """Descarga el diccionario completo de tasas de `base` (unidades de cada moneda por 1 `base`)."""
+    global PROVEEDOR
+    if PROVEEDOR is None:
+        PROVEEDOR = proveedor.ProveedorER()
+    inicio = time.perf_counter()
+    try:
+        rates = PROVEEDOR.descargar(base, timeout=timeout)
+    except Exception:
+        registrar_descarga(base, inicio, error=True)
+        raise
+    registrar_descarga(base, inicio)
+    return rates
+
+
+def registrar_descarga(base, inicio, error=False):
+    """Anota para /metrics la duración de una descarga del proveedor empezada en `inicio` (time.perf_counter()) y si falló."""
+    metricas.histograma("tucambio_proveedor_segundos", "Duración de las descargas de tasas del proveedor.", base=base).desde(inicio)
+    if error:
+        metricas.contador("tucambio_proveedor_errores_total", "Descargas de tasas del proveedor que fallaron.", base=base).inc()
+
+
+def construir_matriz(rates, codigos):
+    """Rellena la matriz N×N de tasas cruzadas para `codigos` a partir de un único diccionario de tasas."""
+    matriz = {}
+    for origen in codigos:
+        por_base_origen = rates.get(origen)
+        if not por_base_origen:
+            continue
+        for destino in codigos:
+            por_base_destino = rates.get(destino)
+            if por_base_destino:
+                # origen→base = 1 / rates[origen]; destino→base = 1 / rates[destino]
+                matriz[(origen, destino)] = por_base_destino / por_base_origen
+    return matriz
+
+
+def construir_tabla(rates, codigos, timestamp):
+    """
+    Tabla lista para servir: tasas, matriz cruzada, filas de la matriz en el orden de `codigos` y una versión que solo cambia si cambian las tasas (para ETag).
+    """
+    codigos = list(codigos)
+    matriz = construir_matriz(rates, codigos)
+    filas = {origen: [matriz.get((origen, destino)) for destino in codigos] for origen in codigos}
+    version = hashlib.sha1(json.dumps([rates.get(c) for c in codigos]).encode()).hexdigest()[:16]
+    return {
+        "rates": rates,
+        "matriz": matriz,
+        "codigos": codigos,
+        "filas": filas,
+        "version": version,
+        "timestamp": timestamp,
+    }
+
+
+def actualizar_tabla(codigos, base=MONEDA_PIVOTE):
+    """Descarga las tasas de `base` y guarda en caché la tabla completa con su matriz cruzada."""
+    rates = descargar_tasas(base)
+    tabla = construir_tabla(rates, codigos, time.time())
+    _publicar(base, tabla)
+    return tabla
+
+
+def _publicar(base, tabla):
+    """Deja `tabla` como la vigente de `base` y despierta a quien espere un cambio de tasas."""
+    with _cambio:
+        TASAS_CACHE[base] = tabla
+        _cambio.notify_all()
+    for oyente in _oyentes:
+        oyente()
+
+
+def al_publicar(oyente):
+    """Registra `oyente` para que se le llame (desde el hilo que publica) cada vez que cambia una tabla."""
+    if oyente not in _oyentes:
+        _oyentes.append(oyente)
+
+
+def esperar_cambio(version, base=MONEDA_PIVOTE, timeout=None):
+    """
+    Bloquea hasta que la tabla de `base` tenga una versión distinta de `version` (o pase `timeout`) y devuelve la tabla vigente, o None si aún no hay ninguna.
+    """
+    def cambiada():
+        tabla = TASAS_CACHE.get(base)
+        return tabla is not None and tabla["version"] != version
+
+    with _cambio:
+        _cambio.wait_for(cambiada, timeout)
+        return TASAS_CACHE.get(base)
+
+
+def _tabla_guardada(codigos, base):
+    """Tabla de `base` publicada en el almacén compartido (historial.db), o None."""
+    guardada = database.cargar_tasas(base)
+    if guardada is None:
+        return None
+    rates, timestamp = guardada
+    return construir_tabla(rates, codigos, timestamp)
+
+
+def _adoptar(tabla, base):
+    """Pone en memoria `tabla` si es más reciente que la que ya hay."""
+    actual = TASAS_CACHE.get(base)
+    if tabla is not None and (actual is None or tabla["timestamp"] > actual["timestamp"]):
+        _publicar(base, tabla)
+
+
+def adoptar_si_fresca(codigos, base=MONEDA_PIVOTE):
+    """
+    Adopta la tabla que otro proceso publicó en el almacén compartido si aún no toca refrescarla. Devuelve (adoptada, tabla guardada o None).
+    """
+    guardada = _tabla_guardada(codigos, base)
+    if guardada and edad_tabla(guardada) < CACHE_TTL - REFRESCO_ANTICIPADO:
+        _adoptar(guardada, base)
+        return True, guardada
+    return False, guardada
+
+
+def publicar_descarga(codigos, base, rates, escritor):
+    """
+    Pone en memoria la tabla de unas tasas recién descargadas, la guarda en el almacén para los demás procesos y la añade a la serie histórica.
+    """
+    tabla = construir_tabla(rates, codigos, time.time())
+    _publicar(base, tabla)
+    try:
+        database.guardar_tasas(base, rates, tabla["timestamp"], escritor)
+        historico.guardar(base, rates, tabla["timestamp"], tabla["codigos"])
+    except database.Error as e:
+        print(f"Error del almacén de tasas: {e}")
+    return tabla
+
+
+def _sincronizar(codigos, base):
+    """
+    Actualiza la tabla de `base` a través del almacén compartido: si otro proceso ya publicó una tabla fresca se adopta; si no, este proceso toma el turno de escritor, descarga y publica. Devuelve True si la memoria queda con una tabla fresca.
+    """
+    escritor = str(os.getpid())
+    try:
+        adoptada, guardada = adoptar_si_fresca(codigos, base)
+        if adoptada:
+            return True
+        turno = database.tomar_turno_tasas(base, escritor, TURNO_ESCRITOR)
+    except database.Error as e:
+        print(f"Error del almacén de tasas: {e}")
+        actualizar_tabla(codigos, base)
+        return True
+
+    if not turno:
+        # Otro proceso está descargando: esperar (acotado) a que publique
+        limite = time.time() + ESPERA_MAXIMA
+        while time.time() < limite:
+            time.sleep(0.2)
+            nueva = _tabla_guardada(codigos, base)
+            if nueva and (guardada is None or nueva["timestamp"] > guardada["timestamp"]):
+                _adoptar(nueva, base)
+                return True
+        _adoptar(guardada, base)
+        return False
+
+    try:
+        rates = descargar_tasas(base)
+    except Exception:
+        database.liberar_turno_tasas(base, escritor)
+        raise
+    publicar_descarga(codigos, base, rates, escritor)
+    return True
+
+
+def calentar(codigos, base=MONEDA_PIVOTE):
+    """Carga en memoria la última tabla publicada para que el proceso responda nada más arrancar."""
+    try:
+        database.init_tasas()
+        _adoptar(_tabla_guardada(codigos, base), base)
+    except database.Error as e:
+        print(f"Error del almacén de tasas: {e}")
+    return TASAS_CACHE.get(base)
+
+
+# Cuerpo de /tasas.json ya serializado, por (versión, timestamp) de la tabla y monedas sin decimales
+_INSTANTANEA = {}
+
+
+def instantanea_json(tabla, monedas, sin_decimales):
+    """
+    Instantánea de la tabla para convertir en el navegador: tasas respecto a la moneda pivote, nombres y monedas sin decimales. Se serializa una sola vez por tabla.
+    """
+    clave = (tabla["version"], tabla["timestamp"], tuple(sin_decimales))
+    # Se devuelve la variable local: otro hilo con otra tabla puede vaciar la caché entretanto
+    texto = _INSTANTANEA.get(clave)
+    if texto is None:
+        rates = tabla["rates"]
+        texto = json.dumps({
+            "version": tabla["version"],
+            "timestamp": int(tabla["timestamp"]),
+            "tasas": {m["codigo"]: rates[m["codigo"]] for m in monedas if rates.get(m["codigo"])},
+            "nombres": {m["codigo"]: m["nombre"] for m in monedas},
+            "sin_decimales": list(sin_decimales),
+        })
+        _INSTANTANEA.clear()
+        _INSTANTANEA[clave] = texto
+    return texto
+
+
+def edad_tabla(tabla):
+    """Segundos transcurridos desde que se descargó la tabla."""
+    return time.time() - tabla["timestamp"]
+
+
+def _refrescar(codigos, base, esperar=False):
+    """
+    Refresca la tabla de `base` con single-flight: si ya hay una descarga en curso no se lanza otra; con `esperar` el hilo aguarda (como mucho ESPERA_MAXIMA) el resultado de la que está en vuelo. Si la descarga falla se conserva la última tabla.
+    """
+    with _refrescos_lock:
+        vuelo = _vuelos.get(base)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos[base] = {"hecho": threading.Event(), "ok": False}
+            _ultimo_intento[base] = time.time()
+    if not lider:
+        if esperar:
+            vuelo["hecho"].wait(ESPERA_MAXIMA)
+        return vuelo["ok"]
+    try:
+        vuelo["ok"] = _sincronizar(codigos, base)
+    except Exception as e:
+        print(f"Error de API: {e}")
+    finally:
+        with _refrescos_lock:
+            del _vuelos[base]
+        vuelo["hecho"].set()
+    return vuelo["ok"]
+
+
+def _refrescar_en_segundo_plano(codigos, base):
+    """Lanza un refresco sin bloquear, como mucho uno cada REINTENTO_ERROR segundos por base."""
+    with _refrescos_lock:
+        if base in _vuelos or time.time() - _ultimo_intento.get(base, 0) < REINTENTO_ERROR:
+            return
+    threading.Thread(target=_refrescar, args=(codigos, base), daemon=True).start()
+
+
+def obtener_tabla(codigos, base=MONEDA_PIVOTE):
+    """
+    Devuelve la tabla de `base` desde memoria (stale-while-revalidate): si está caducada se sirve igualmente y se lanza un refresco en segundo plano. Solo bloquea en el arranque en frío, cuando aún no hay ninguna tabla, y entonces todos los hilos comparten una única descarga.
+    """
+    tabla = TASAS_CACHE.get(base)
+    if tabla is None:
+        _LECTURAS["miss"].inc()
+        _refrescar(codigos, base, esperar=True)
+        return TASAS_CACHE.get(base)
+    if edad_tabla(tabla) >= CACHE_TTL:
+        _LECTURAS["stale"].inc()
+        _refrescar_en_segundo_plano(codigos, base)
+    else:
+        _LECTURAS["hit"].inc()
+    return tabla
+
+
+def contar_lectura(tabla):
+    """Cuenta para /metrics una lectura de la tabla en memoria: miss si no hay, stale si está caducada, hit si no."""
+    if tabla is None:
+        _LECTURAS["miss"].inc()
+    elif edad_tabla(tabla) >= CACHE_TTL:
+        _LECTURAS["stale"].inc()
+    else:
+        _LECTURAS["hit"].inc()
+
+
+def _edad_pivote():
+    tabla = TASAS_CACHE.get(MONEDA_PIVOTE)
+    return None if tabla is None else edad_tabla(tabla)
+
+
+metricas.indicador("tucambio_tasas_edad_segundos", "Edad de la tabla de tasas en memoria (la del worker más atrasado).", _edad_pivote, "maximo")
+
+
+def _bucle_refresco(codigos, base):
+    """Mantiene fresca la tabla de `base`, refrescándola antes de que caduque."""
+    while True:
+        tabla = TASAS_CACHE.get(base)
+        if tabla is None or edad_tabla(tabla) >= CACHE_TTL - REFRESCO_ANTICIPADO:
+            if not _refrescar(codigos, base, esperar=True):
+                time.sleep(REINTENTO_ERROR)
+                continue
+            tabla = TASAS_CACHE[base]
+        time.sleep(max(1, CACHE_TTL - REFRESCO_ANTICIPADO - edad_tabla(tabla)))
+
+
+def _arrancar_refrescador(codigos, base):
+    with _refrescos_lock:
+        hilo = _refrescadores.get(base)
+        if hilo is not None and hilo.is_alive():
+            return hilo
+        hilo = threading.Thread(target=_bucle_refresco, args=(list(codigos), base), name=f"refresco-tasas-{base}", daemon=True)
+        _refrescadores[base] = hilo
+        _codigos_refresco[base] = list(codigos)
+    hilo.start()
+    return hilo
+
+
+def iniciar_refresco(codigos, base=MONEDA_PIVOTE):
+    """Arranca (una sola vez por proceso) el hilo que refresca la tabla de `base` en segundo plano."""
+    calentar(codigos, base)
+    return _arrancar_refrescador(codigos, base)
+
+
+def _tras_fork():
+    """
+    En el proceso hijo de un fork (p. ej. un worker de gunicorn con la app precargada): cerrojos nuevos, porque el padre pudo bifurcarse con alguno tomado; ninguna descarga en vuelo, porque su hilo no existe aquí; y los hilos de refresco que tenía el padre, otra vez en marcha. La tabla en memoria se hereda tal cual.
+    """
+    global _refrescos_lock, _cambio
+    _refrescos_lock = threading.Lock()
+    _cambio = threading.Condition()
+    _vuelos.clear()
+    _refrescadores.clear()
+    for base, codigos in list(_codigos_refresco.items()):
+        _arrancar_refrescador(codigos, base)
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def tasa_cruzada(tabla, moneda_origen, moneda_destino):
+    """Tasa origen→destino desde la matriz, o calculada al vuelo si el par no está precalculado."""
+    tasa = tabla["matriz"].get((moneda_origen, moneda_destino))
+    if tasa is None:
+        rates = tabla["rates"]
+        if rates.get(moneda_origen) and rates.get(moneda_destino):
+            tasa = rates[moneda_destino] / rates[moneda_origen]
+    return tasa
+
+
+def obtener_tasa(moneda_origen, moneda_destino, codigos, base=MONEDA_PIVOTE):
+    """Obtiene la tasa de cualquier par desde memoria; solo va a la API una vez por TTL y moneda base."""
+    return obtener_tasa_con_edad(moneda_origen, moneda_destino, codigos, base)[0]
+
+
+def obtener_tasa_con_edad(moneda_origen, moneda_destino, codigos, base=MONEDA_PIVOTE):
+    """Como `obtener_tasa`, pero devuelve también la edad en segundos de la tasa servida: (tasa, edad)."""
+    tabla = obtener_tabla(codigos, base)
+    if tabla is None:
+        return None, None
+    return tasa_cruzada(tabla, moneda_origen, moneda_destino), edad_tabla(tabla)
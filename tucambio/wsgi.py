@@ -0,0 +1,380 @@
+import json
+import time
+from decimal import Decimal
+
+from flask import Blueprint, Flask, Response, jsonify, render_template_string, request
+
+from . import (
+    conversion, escritor_historial, estadisticas, eventos, exportar, frontends, historial_reciente, historico, metricas,
+    pagina, recursos, retencion, tasas,
+)
+from .conversion import (
+    MONEDAS, MONEDA_IDX, CODIGOS_MONEDAS, MONEDAS_SIN_DECIMALES, a_unidades, formatear_importe, leer_cantidad,
+    presentar_fila, resultado_unidades, validar_conversion,
+)
+from .database import init_db, guardar_conversiones, obtener_pagina_historial, COLUMNAS_HISTORIAL
+
+# --- APP WSGI (FLASK) ---
+# crear_app() monta la API común, los recursos estáticos, el flujo de tasas y la página
+# principal de la interfaz elegida. Nada de esto ocurre al importar el módulo: la base
+# de datos, la tabla de tasas y el hilo escritor se preparan al crear la app.
+MAX_LOTE = 10000  # conversiones como máximo por petición a /convertir/lote
+
+def _obtener_historial_con_banderas(limite=5):
+    """Obtiene el historial reciente (desde memoria, con lo recién encolado incluido) con las banderas para el frontend."""
+    return historial_reciente.obtener(limite)
+
+def _leer_par(texto):
+    """(origen, destino) de un par como "EUR-JPY" o "EUR/JPY", o (None, None) si no es válido."""
+    origen, _, destino = (texto or "").upper().replace("/", "-").partition("-")
+    if origen not in MONEDA_IDX or destino not in MONEDA_IDX:
+        return None, None
+    return origen, destino
+
+def _leer_ventana(rango):
+    """(hasta, desde) de los parámetros `hasta` (por defecto ahora) y `desde` (por defecto `rango` segundos antes)."""
+    hasta = historico.leer_momento(request.args.get("hasta"))
+    if hasta is None:
+        hasta = time.time()
+    desde = historico.leer_momento(request.args.get("desde"))
+    if desde is None:
+        desde = hasta - rango
+    return hasta, desde
+
+def _leer_lote():
+    """Lee el cuerpo de /convertir/lote: un array JSON, o NDJSON (un objeto por línea) si así lo indica el Content-Type."""
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = []
+        for linea in request.get_data(as_text=True).splitlines():
+            if linea.strip():
+                try:
+                    items.append(json.loads(linea))
+                except ValueError:
+                    items.append(None)
+        return items
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("conversiones")
+    return data if isinstance(data, list) else None
+
+# --- RUTAS ---
+# La API es la misma para todas las interfaces; cada una solo aporta su página principal.
+api = Blueprint("api", __name__)
+
+@api.route("/convertir", methods=["POST"])
+def convertir():
+    try:
+        # Validar la entrada
+        cantidad, moneda_origen, moneda_destino, error = validar_conversion(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Obtener tasa (siempre desde memoria) y calcular resultado
+        tabla = tasas.obtener_tabla(CODIGOS_MONEDAS)
+        respuesta, fila = conversion.convertir(cantidad, moneda_origen, moneda_destino, tabla) if tabla else (None, None)
+        if respuesta is None:
+            return jsonify({"error": "No se pudo obtener la tasa de cambio."}), 500
+
+        # Guardar en historial (en segundo plano, sin esperar al disco)
+        try:
+            escritor_historial.encolar_conversion(*fila)
+        except Exception as e:
+            print(f"Error guardando historial: {e}")
+
+        return jsonify(respuesta)
+    
+    except Exception as e:
+        print(f"Error en /convertir: {e}")
+        return jsonify({"error": "Error interno del servidor."}), 500
+
+@api.route("/convertir/lote", methods=["POST"])
+def convertir_lote():
+    """
+    Convierte muchas cantidades de una vez. La tasa de cada par distinto se busca una sola vez, los resultados se calculan por par y el historial se guarda en una única transacción. Devuelve un resultado o un error por elemento, en el mismo orden.
+    """
+    items = _leer_lote()
+    if items is None:
+        return jsonify({"error": "Se esperaba una lista de conversiones."}), 400
+    if len(items) > MAX_LOTE:
+        return jsonify({"error": f"Como máximo {MAX_LOTE} conversiones por lote."}), 400
+
+    resultados = [None] * len(items)
+    por_par = {}
+    for i, item in enumerate(items):
+        cantidad, moneda_origen, moneda_destino, error = validar_conversion(item)
+        if error:
+            resultados[i] = {"error": error}
+        else:
+            indices, cantidades = por_par.setdefault((moneda_origen, moneda_destino), ([], []))
+            indices.append(i)
+            cantidades.append(cantidad)
+
+    filas_historial = []
+    edad_tasa = None
+    for (moneda_origen, moneda_destino), (indices, cantidades) in por_par.items():
+        tasa, edad_tasa = tasas.obtener_tasa_con_edad(moneda_origen, moneda_destino, CODIGOS_MONEDAS)
+        if tasa is None:
+            for i in indices:
+                resultados[i] = {"error": "No se pudo obtener la tasa de cambio."}
+            continue
+        tasa_str = f"{float(tasa):,.6f}"
+        for i, cantidad in zip(indices, cantidades):
+            resultado = resultado_unidades(moneda_destino, cantidad, tasa)
+            resultados[i] = {"cantidad": float(cantidad), "resultado": formatear_importe(moneda_destino, resultado), "tasa": tasa_str}
+            filas_historial.append((a_unidades(moneda_origen, cantidad), moneda_origen, moneda_destino, resultado, float(tasa)))
+
+    if filas_historial:
+        # Escritas en el acto y, con su id y la misma fecha, también en el búfer de recientes
+        entradas = [historial_reciente.entrada(fila) for fila in filas_historial]
+        try:
+            ids = guardar_conversiones(filas_historial, [historial_reciente.fecha(e) for e in entradas])
+        except Exception as e:
+            print(f"Error guardando historial: {e}")
+        else:
+            historial_reciente.anotar_escritas(entradas, ids)
+
+    return jsonify({
+        "resultados": resultados,
+        "errores": sum(1 for r in resultados if "error" in r),
+        "edad_tasa": None if edad_tasa is None else int(edad_tasa),
+    })
+
+def _respuesta_de_tabla(tabla, etag, generar_cuerpo):
+    """Respuesta JSON cacheable ligada a la versión de la tabla de tasas (ETag + Last-Modified, 304 si no cambió)."""
+    resp = Response(mimetype="application/json")
+    resp.set_etag(etag)
+    resp.last_modified = int(tabla["timestamp"])
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max(0, int(tasas.CACHE_TTL - tasas.edad_tabla(tabla)))
+    if request.if_none_match.contains(etag):
+        resp.status_code = 304
+        return resp
+    resp.set_data(generar_cuerpo())
+    return resp.make_conditional(request)
+
+# Cuerpo de /matriz/tasas precalculado una vez por versión de la tabla
+_MATRIZ_TASAS = {}
+# Por versión de la tabla: la fila de /matriz de cada base con todo lo que no depende de la
+# cantidad ya calculado (tasa en Decimal y los trozos de JSON de cada moneda) y los cuerpos
+# ya servidos por (base, cantidad), como mucho MAX_CUERPOS_MATRIZ
+_MATRIZ_FILAS = {}
+MAX_CUERPOS_MATRIZ = 1024
+
+
+def _cache_matriz(tabla):
+    """({base: fila}, {(base, cantidad): cuerpo}) de la versión de `tabla`; los de otras versiones se descartan."""
+    version = tabla["version"]
+    # Se devuelve la variable local: otro hilo con otra versión puede vaciar la caché entretanto
+    cache = _MATRIZ_FILAS.get(version)
+    if cache is None:
+        cache = ({}, {})
+        _MATRIZ_FILAS.clear()
+        _MATRIZ_FILAS[version] = cache
+    return cache
+
+
+def _fila_matriz(filas, tabla, base):
+    """[(moneda, tasa, tasa en Decimal, JSON antes del valor, JSON tras el resultado)] de `base`, calculada una vez por versión."""
+    fila = filas.get(base)
+    if fila is None:
+        fila = filas[base] = [
+            (codigo, tasa, Decimal(str(tasa)), f'{{"codigo": {json.dumps(codigo)}, "valor": ', f', "tasa": "{tasa:,.6f}"}}')
+            for codigo, tasa in zip(tabla["codigos"], tabla["filas"][base])
+            if tasa is not None
+        ]
+    return fila
+
+
+@api.route("/matriz")
+def matriz():
+    """
+    Una cantidad convertida a todas las monedas soportadas. La fila de la base se prepara una vez por versión de la tabla y para cada cantidad solo se multiplican y formatean los importes; los cuerpos ya servidos se reutilizan.
+    """
+    base = request.args.get("base", "USD")
+    if base not in MONEDA_IDX:
+        return jsonify({"error": "Moneda no válida."}), 400
+    cantidad, error = leer_cantidad(request.args.get("cantidad", 1), base)
+    if error:
+        return jsonify({"error": error}), 400
+    tabla = tasas.obtener_tabla(CODIGOS_MONEDAS)
+    if tabla is None:
+        return jsonify({"error": "No se pudo obtener la tasa de cambio."}), 500
+
+    def cuerpo():
+        filas, cuerpos = _cache_matriz(tabla)
+        texto = cuerpos.get((base, cantidad))
+        if texto is not None:
+            return texto
+        valor_base = float(cantidad)
+        # Mismo texto que json.dumps de {"codigo", "valor", "resultado", "tasa"} por moneda
+        conversiones = ", ".join(
+            f"{antes}{valor_base * tasa!r}, \"resultado\": {json.dumps(formatear_importe(codigo, a_unidades(codigo, cantidad * tasa_decimal)))}{despues}"
+            for codigo, tasa, tasa_decimal, antes, despues in _fila_matriz(filas, tabla, base)
+        )
+        texto = (
+            f'{{"base": {json.dumps(base)}, "cantidad": {valor_base!r}, '
+            f'"version": {json.dumps(tabla["version"])}, "conversiones": [{conversiones}]}}'
+        )
+        if len(cuerpos) >= MAX_CUERPOS_MATRIZ:
+            cuerpos.clear()
+        cuerpos[(base, cantidad)] = texto
+        return texto
+
+    return _respuesta_de_tabla(tabla, f"{tabla['version']}-{base}-{cantidad}", cuerpo)
+
+@api.route("/matriz/tasas")
+def matriz_tasas():
+    """Matriz completa N×N de tasas cruzadas entre todas las monedas soportadas (fila = origen, columna = destino)."""
+    tabla = tasas.obtener_tabla(CODIGOS_MONEDAS)
+    if tabla is None:
+        return jsonify({"error": "No se pudo obtener la tasa de cambio."}), 500
+
+    def cuerpo():
+        version = tabla["version"]
+        # Se devuelve la variable local: otro hilo con otra versión puede vaciar la caché entretanto
+        texto = _MATRIZ_TASAS.get(version)
+        if texto is None:
+            texto = json.dumps({
+                "codigos": tabla["codigos"],
+                "tasas": [tabla["filas"][codigo] for codigo in tabla["codigos"]],
+                "version": version,
+            })
+            _MATRIZ_TASAS.clear()
+            _MATRIZ_TASAS[version] = texto
+        return texto
+
+    return _respuesta_de_tabla(tabla, tabla["version"], cuerpo)
+
+@api.route("/tasas.json")
+def tasas_json():
+    """Instantánea de tasas para convertir en el navegador (y sin conexión, desde el service worker)."""
+    tabla = tasas.obtener_tabla(CODIGOS_MONEDAS)
+    if tabla is None:
+        return jsonify({"error": "No se pudo obtener la tasa de cambio."}), 500
+    etag = f"{tabla['version']}-{int(tabla['timestamp'])}"
+    return _respuesta_de_tabla(tabla, etag, lambda: tasas.instantanea_json(tabla, MONEDAS, MONEDAS_SIN_DECIMALES))
+
+@api.route("/tasas/historico")
+def tasas_historico():
+    """
+    Evolución de la tasa de un par (`par=EUR-JPY`) entre `desde` y `hasta` (timestamp unix o fecha ISO; por defecto la última semana), en velas OHLC por `intervalo` "hora" (por defecto) o "dia", o "crudo" para las instantáneas tal cual.
+    """
+    origen, destino = _leer_par(request.args.get("par"))
+    if origen is None:
+        return jsonify({"error": "Par no válido (p. ej. par=EUR-JPY)."}), 400
+    intervalo = request.args.get("intervalo", "hora")
+    if intervalo != "crudo" and intervalo not in historico.INTERVALOS:
+        return jsonify({"error": "Intervalo no válido (hora, dia o crudo)."}), 400
+    try:
+        hasta, desde = _leer_ventana(historico.RANGO_POR_DEFECTO)
+    except ValueError:
+        return jsonify({"error": "Fecha no válida."}), 400
+    return jsonify(historico.consultar(origen, destino, desde, hasta, intervalo, tasas.MONEDA_PIVOTE))
+
+@api.route("/estadisticas")
+def get_estadisticas():
+    """
+    Pares más usados, volumen y tasa media entre `desde` y `hasta` (timestamp unix o fecha ISO; por defecto la última semana), desde los acumulados por `periodo` "hora" o "dia". Con `par` la serie es solo de ese par.
+    """
+    periodo = request.args.get("periodo")
+    if periodo is not None and periodo not in estadisticas.PERIODOS:
+        return jsonify({"error": "Periodo no válido (hora o dia)."}), 400
+    origen = destino = None
+    if request.args.get("par"):
+        origen, destino = _leer_par(request.args["par"])
+        if origen is None:
+            return jsonify({"error": "Par no válido (p. ej. par=EUR-JPY)."}), 400
+    try:
+        hasta, desde = _leer_ventana(estadisticas.RANGO_POR_DEFECTO)
+        limite = max(1, min(int(request.args.get("limite", 10)), estadisticas.MAX_PARES))
+    except ValueError:
+        return jsonify({"error": "Parámetros no válidos."}), 400
+    return jsonify(estadisticas.consultar(desde, hasta, periodo, limite, origen, destino))
+
+@api.route("/historial")
+def get_historial():
+    """
+    Sin parámetros devuelve las últimas conversiones con banderas (para el frontend). Con `before_id`, `limite`, `origen`, `destino` o `campos` devuelve una página del historial paginada por cursor.
+    """
+    if not request.args:
+        historial_con_banderas = _obtener_historial_con_banderas()
+        return jsonify(historial_con_banderas)
+
+    campos = request.args.get("campos")
+    columnas = campos.split(",") if campos else COLUMNAS_HISTORIAL
+    moneda_origen = request.args.get("origen")
+    moneda_destino = request.args.get("destino")
+    if any(m and m not in MONEDA_IDX for m in (moneda_origen, moneda_destino)):
+        return jsonify({"error": "Moneda no válida."}), 400
+    try:
+        filas, siguiente = obtener_pagina_historial(
+            limite=request.args.get("limite", 20),
+            before_id=request.args.get("before_id"),
+            moneda_origen=moneda_origen,
+            moneda_destino=moneda_destino,
+            columnas=columnas,
+            presentar=presentar_fila,
+        )
+    except ValueError:
+        return jsonify({"error": "Parámetros no válidos."}), 400
+    return jsonify({"historial": filas, "before_id": siguiente})
+
+
+@api.route("/historial/export")
+def exportar_historial():
+    """
+    Descarga el historial completo (o filtrado por `origen`, `destino`, `desde` y `hasta`) en `formato` csv (por defecto), ndjson o columnar, en streaming y con memoria constante.
+    """
+    formato = request.args.get("formato", "csv")
+    if formato not in exportar.FORMATOS:
+        return jsonify({"error": "Formato no válido (csv, ndjson o columnar)."}), 400
+    moneda_origen = request.args.get("origen")
+    moneda_destino = request.args.get("destino")
+    if any(m and m not in MONEDA_IDX for m in (moneda_origen, moneda_destino)):
+        return jsonify({"error": "Moneda no válida."}), 400
+    try:
+        desde = historico.leer_momento(request.args.get("desde"))
+        hasta = historico.leer_momento(request.args.get("hasta"))
+    except ValueError:
+        return jsonify({"error": "Fecha no válida."}), 400
+    tipo, extension = exportar.FORMATOS[formato]
+    resp = Response(exportar.exportar(formato, moneda_origen, moneda_destino, desde, hasta), content_type=tipo)
+    resp.headers["Content-Disposition"] = f"attachment; filename=historial.{extension}"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+@api.route("/health")
+def health():
+    return "OK", 200
+
+
+def crear_app(frontend="clasico", servicios=True):
+    """
+    Crea la app Flask con la interfaz `frontend` (ver tucambio.frontends.FRONTENDS). Con `servicios=False` no arranca los hilos de fondo (refresco de tasas, escritor del historial y retención), porque los pone en marcha quien la sirve (asgi.py).
+    """
+    plantilla = frontends.plantilla(frontend)
+    init_db()
+    if servicios:
+        # Refrescar la tabla de tasas en segundo plano para que las peticiones solo lean memoria
+        tasas.iniciar_refresco(CODIGOS_MONEDAS)
+        escritor_historial.iniciar()
+        retencion.iniciar()
+
+    app = Flask(__name__)
+    recursos.cargar()
+    recursos.registrar_rutas(app)
+    eventos.registrar_rutas(app)
+    metricas.registrar_rutas(app)
+    app.register_blueprint(api)
+
+    # Página principal renderizada una sola vez (el historial lo carga el navegador desde /historial)
+    with app.app_context():
+        html = render_template_string(plantilla, monedas=MONEDAS, historial=[], MONEDA_IDX=MONEDA_IDX, activo=recursos.url)
+    indice = pagina.preparar(html)
+
+    @app.route("/")
+    def index():
+        return pagina.responder(indice, request, app.response_class)
+
+    return app